@@ -2,10 +2,14 @@ import os
 from flask import Flask, jsonify, request, redirect
 from flask_cors import CORS
 from dotenv import load_dotenv
+from .api.serialization import JSONProvider
+from .api.metrics_routes import metrics_routes
 
 load_dotenv()
 
 app = Flask(__name__)
+# Every response encodes datetimes as ISO 8601
+app.json = JSONProvider(app)
 
 # Configuration
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-secret-key')
@@ -42,6 +46,8 @@ if os.environ.get('FLASK_ENV') == 'production' and not os.environ.get('ALLOWED_O
 
 CORS(app, supports_credentials=True, origins=allowed_origins)
 
+app.register_blueprint(metrics_routes, url_prefix='/api/metrics')
+
 # Basic routes for testing
 @app.route("/")
 def health_check():
@@ -2,20 +2,21 @@ from flask import Blueprint, jsonify
 from flask_login import login_required, current_user
 from app.models import db, Job, Profile, CoverLetter
 from .aws_helpers import upload_pdf_bytes_to_s3
-from openai import OpenAI
-from reportlab.pdfgen import canvas
+from .llm_cache import cached_chat_completion
+from .ai_task_queue import register_task, wants_async, enqueue_response
+from .entitlements import entitlement_required
+from .ai_usage import UsageMeter
+from .openai_client import get_openai_client
 from io import BytesIO
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet
-from fpdf import FPDF
-import os
 import datetime
 
 ai_cover_letter_routes = Blueprint('ai_cover_letter', __name__)
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
 def generate_pdf(content, title="Cover Letter"):
+    # reportlab takes a while to import; only pay for it when a letter is rendered
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+    from reportlab.lib.styles import getSampleStyleSheet
+
     buffer = BytesIO()
     doc = SimpleDocTemplate(buffer)
     styles = getSampleStyleSheet()
@@ -33,12 +34,19 @@ def generate_pdf(content, title="Cover Letter"):
     buffer.seek(0)
     return buffer
 
-@ai_cover_letter_routes.route('/generate/job/<int:job_id>', methods=['POST'])
-@login_required
-def generate_cover_letter_for_job(job_id):
+def find_generated_cover_letter(user_id, letter_text):
+    """The user's existing cover letter with exactly this text, if a cached generation already produced one"""
+    return CoverLetter.query.filter_by(user_id=user_id, extracted_text=letter_text) \
+        .order_by(CoverLetter.uploaded_at.desc()).first()
+
+# Generators run either inline from the routes at the bottom of this file or
+# from the AI task queue.
+
+@register_task('generate_cover_letter_for_job')
+def run_generate_cover_letter_for_job(user, job_id):
     job = Job.query.get(job_id)
     if not job:
-        return jsonify({"error": "Job not found"}), 404
+        return {"error": "Job not found"}, 404
 
     prompt = f"""
 You are a professional career advisor. Write a tailored cover letter for the following job information:
@@ -54,35 +62,40 @@ Please surround all keywords that should be replaced later (such as job title, s
 Respond only with the cover letter text.
 """
     try:
-        response = client.chat.completions.create(
+        letter_text, cache_hit = cached_chat_completion(
+            get_openai_client(),
             model="gpt-4",
             messages=[{"role": "user", "content": prompt}],
             temperature=0.3,
+            meter=UsageMeter(user.id, 'cover_letter'),
         )
-        letter_text = response.choices[0].message.content.strip()
+        letter_text = letter_text.strip()
+        if cache_hit:
+            existing_cl = find_generated_cover_letter(user.id, letter_text)
+            if existing_cl:
+                return {"message": "Cover letter generated", "cover_letter": existing_cl.to_dict()}, 200
         pdf_buffer = generate_pdf(letter_text, title=f"Cover Letter for {job.title}")
         upload_result = upload_pdf_bytes_to_s3(pdf_buffer, filename=f"cover_letter_job_{job_id}_{datetime.datetime.utcnow().isoformat()}.pdf")
 
         if "url" not in upload_result:
-            return jsonify({"error": upload_result.get("errors", "Upload failed")}), 500
+            return {"error": upload_result.get("errors", "Upload failed")}, 500
         new_cl = CoverLetter(
-            user_id=current_user.id,
+            user_id=user.id,
             file_url=upload_result["url"],
             title=f"Cover Letter for {job.title}",
             extracted_text=letter_text
         )
         db.session.add(new_cl)
         db.session.commit()
-        return jsonify({"message": "Cover letter generated", "cover_letter": new_cl.to_dict()}), 201
+        return {"message": "Cover letter generated", "cover_letter": new_cl.to_dict()}, 201
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return {"error": str(e)}, 500
 
-@ai_cover_letter_routes.route('/generate/profile', methods=['POST'])
-@login_required
-def generate_cover_letter_from_profile():
-    profile = current_user.profile
+@register_task('generate_cover_letter_from_profile')
+def run_generate_cover_letter_from_profile(user):
+    profile = user.profile
     if not profile:
-        return jsonify({"error": "Profile not found"}), 404
+        return {"error": "Profile not found"}, 404
     prompt = f"""
 You are a professional career advisor. Write a general-purpose cover letter based on the following candidate profile:
 
@@ -99,12 +112,18 @@ Please surround all keywords that should be replaced later (such as job title, s
 Respond only with the cover letter text.
 """
     try:
-        response = client.chat.completions.create(
+        letter_text, cache_hit = cached_chat_completion(
+            get_openai_client(),
             model="gpt-4",
             messages=[{"role": "user", "content": prompt}],
             temperature=0.3,
+            meter=UsageMeter(user.id, 'cover_letter'),
         )
-        letter_text = response.choices[0].message.content.strip()
+        letter_text = letter_text.strip()
+        if cache_hit:
+            existing_cl = find_generated_cover_letter(user.id, letter_text)
+            if existing_cl:
+                return {"message": "Cover letter generated", "cover_letter": existing_cl.to_dict()}, 200
         pdf_buffer = generate_pdf(letter_text, title="General Cover Letter")
         upload_result = upload_pdf_bytes_to_s3(
             pdf_buffer,
@@ -112,15 +131,33 @@ Respond only with the cover letter text.
         )
 
         if "url" not in upload_result:
-            return jsonify({"error": upload_result.get("errors", "Upload failed")}), 500
+            return {"error": upload_result.get("errors", "Upload failed")}, 500
         new_cl = CoverLetter(
-            user_id=current_user.id,
+            user_id=user.id,
             file_url=upload_result["url"],
             title="Cover Letter from Profile",
             extracted_text=letter_text
         )
         db.session.add(new_cl)
         db.session.commit()
-        return jsonify({"message": "Cover letter generated", "cover_letter": new_cl.to_dict()}), 201
+        return {"message": "Cover letter generated", "cover_letter": new_cl.to_dict()}, 201
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return {"error": str(e)}, 500
+
+@ai_cover_letter_routes.route('/generate/job/<int:job_id>', methods=['POST'])
+@login_required
+@entitlement_required('cover_letter')
+def generate_cover_letter_for_job(job_id):
+    if wants_async():
+        return enqueue_response('generate_cover_letter_for_job', current_user.id, job_id=job_id)
+    body, status = run_generate_cover_letter_for_job(current_user, job_id)
+    return jsonify(body), status
+
+@ai_cover_letter_routes.route('/generate/profile', methods=['POST'])
+@login_required
+@entitlement_required('cover_letter')
+def generate_cover_letter_from_profile():
+    if wants_async():
+        return enqueue_response('generate_cover_letter_from_profile', current_user.id)
+    body, status = run_generate_cover_letter_from_profile(current_user)
+    return jsonify(body), status
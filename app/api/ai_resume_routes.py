@@ -1,94 +1,164 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, jsonify, request, Response, stream_with_context
 from flask_login import login_required, current_user
-from app.models import Resume, ResumeScore, ResumeJobMatch, Job, db
-from openai import OpenAI
+from app.models import Resume, ResumeScore, ResumeJobMatch, Job, AIUsageRecord, db
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import os
-import fitz
-import boto3
-import re
 import json
-from docx import Document
-from io import BytesIO
+import time
+from .storage import storage
+from .serialization import json_response
+from .document_helpers import extract_text, hash_bytes
+from .llm_cache import cached_chat_completion, cache_stats
+from .job_routes import apply_job_filters
+from .ai_task_queue import register_task, wants_async, enqueue_response
+from .entitlements import entitlement_required, entitlements_for, quota_reached, remaining_quota
+from .openai_client import get_openai_client
+from .ai_usage import UsageMeter, period_bounds, usage_store
+from sqlalchemy.orm import joinedload
 
 ai_resume_routes = Blueprint('ai_resume', __name__)
 
-client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+MAX_BATCH_JOBS = 200
+MAX_BATCH_CANDIDATES = int(os.getenv('AI_MATCH_MAX_CANDIDATES', 20))
+AI_MATCH_CONCURRENCY = int(os.getenv('AI_MATCH_CONCURRENCY', 5))
 
-s3 = boto3.client(
-    's3',
-    aws_access_key_id=os.getenv('S3_KEY'),
-    aws_secret_access_key=os.getenv('S3_SECRET'),
-    region_name='us-east-1'
-)
+def is_json(content):
+    try:
+        json.loads(content)
+        return True
+    except ValueError:
+        return False
+
+def get_resume_text(resume):
+    """Return the resume's text, extracting and caching it on the row if it isn't stored yet"""
+    if resume.extracted_text is not None:
+        return resume.extracted_text, None
+
+    with storage.open(resume.file_url) as file_bytes:
+        if not file_bytes:
+            return None, "Failed to download resume file"
+        text, error = extract_text(file_bytes, resume.file_url.rsplit('.', 1)[-1])
+        if error:
+            return None, error
+        file_hash = hash_bytes(file_bytes)
+
+    resume.extracted_text = text
+    resume.content_hash = file_hash
+    db.session.commit()
+    return text, None
 
-def get_file_bytes_from_s3(s3_url):
-    match = re.match(r"https://(.+)\.s3\.amazonaws\.com/(.+)", s3_url)
-    if not match:
+def copy_known_score(resume):
+    """
+    Copy the latest gpt-4 score of another of the owner's resumes with
+    identical content onto this one, if this resume has none yet. Returns the
+    new ResumeScore or None.
+    """
+    if not resume.content_hash:
+        return None
+    if ResumeScore.query.filter_by(resume_id=resume.id, ai_model="gpt-4").first():
+        return None
+    known = ResumeScore.query.join(Resume) \
+        .filter(Resume.user_id == resume.user_id, Resume.content_hash == resume.content_hash,
+                Resume.id != resume.id, ResumeScore.ai_model == "gpt-4") \
+        .order_by(ResumeScore.evaluated_at.desc(), ResumeScore.id.desc()).first()
+    if not known:
         return None
-    bucket_name, key = match.groups()
-    obj = s3.get_object(Bucket=bucket_name, Key=key)
-    return obj['Body'].read()
-
-def extract_text_from_pdf_bytes(pdf_bytes, max_pages=3):
-    text = ""
-    with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
-        for page in doc[:max_pages]:
-            text += page.get_text()
-    return text
-
-def extract_text_from_docx_bytes(docx_bytes):
-    doc = Document(BytesIO(docx_bytes))
-    full_text = []
-    for para in doc.paragraphs:
-        full_text.append(para.text)
-    return '\n'.join(full_text)
-
-def extract_resume_text(file_url):
-    file_bytes = get_file_bytes_from_s3(file_url)
-    if not file_bytes:
-        return None, "Failed to download resume file"
-    ext = file_url.rsplit('.', 1)[-1].lower()
-    if ext == 'pdf':
-        text = extract_text_from_pdf_bytes(file_bytes)
-    elif ext == 'docx':
-        text = extract_text_from_docx_bytes(file_bytes)
-    else:
-        return None, f"Unsupported file type: {ext}"
-    return text, None
 
-@ai_resume_routes.route('/chat', methods=['POST'])
-@login_required
-def chat_with_ai():
-    data = request.get_json()
-    messages = data.get('messages')
+    score = ResumeScore(
+        resume_id=resume.id,
+        ai_model=known.ai_model,
+        score_overall=known.score_overall,
+        score_format=known.score_format,
+        score_skills=known.score_skills,
+        score_experience=known.score_experience,
+        strengths=known.strengths,
+        weaknesses=known.weaknesses,
+        suggestions=known.suggestions,
+    )
+    db.session.add(score)
+    db.session.commit()
+    return score
+
+def build_match_prompt(job, resume_text):
+    return f"""
+You are a recruitment AI assistant. Given the resume text and the job description below,
+analyze the candidate's fit for the job. Return a JSON with:
+- match_score: a float from 0 to 1, indicating the suitability
+- match_summary: a brief summary highlighting strengths and weaknesses for this job.
 
-    if not messages or not isinstance(messages, list):
-        return jsonify({'error': 'Invalid or missing messages'}), 400
+Job Title: {job.title}
+Job Description: {job.description}
+
+Resume Text:
+{resume_text[:3000]}
 
+Respond ONLY with a valid JSON object.
+"""
+
+def request_job_match(prompt, meter):
+    """Run a match prompt through the model. Returns (match_score, match_summary),
+    either of which is None if the model left it out."""
+    started = time.perf_counter()
+    response = get_openai_client().chat.completions.create(
+        model="gpt-4",
+        messages=[
+            {"role": "system", "content": "You are a helpful AI recruitment assistant."},
+            {"role": "user", "content": prompt}
+        ],
+        temperature=0.3,
+    )
+    meter.record("gpt-4", time.perf_counter() - started, response.usage)
+
+    content = response.choices[0].message.content
+    if '```json' in content:
+        content = content.split('```json')[1].split('```')[0]
+    elif '```' in content:
+        content = content.split('```')[1]
+
+    ai_result = json.loads(content)
+    return ai_result.get("match_score"), ai_result.get("match_summary")
+
+# Task handlers: shared by the endpoints below and the background task queue,
+# so they take the user explicitly and return (body, status_code).
+
+@register_task('chat')
+def run_chat(user, messages):
     try:
-        response = client.chat.completions.create(
+        started = time.perf_counter()
+        response = get_openai_client().chat.completions.create(
             model="gpt-4",
             messages=messages,
             temperature=0.7,
         )
+        UsageMeter(user.id, 'ai_chat').record("gpt-4", time.perf_counter() - started, response.usage)
         ai_reply = response.choices[0].message.content
-        return jsonify({'reply': ai_reply}), 200
+        return {'reply': ai_reply}, 200
 
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return {'error': str(e)}, 500
 
-@ai_resume_routes.route('/resumes/<int:resume_id>/analyze', methods=['POST'])
-@login_required
-def analyze_resume(resume_id):
+@register_task('analyze_resume')
+def run_analyze_resume(user, resume_id):
     resume = Resume.query.get(resume_id)
-    if not resume or resume.user_id != current_user.id:
-        return jsonify({"error": "Resume not found or permission denied"}), 404
+    if not resume or resume.user_id != user.id:
+        return {"error": "Resume not found or permission denied"}, 404
 
-    text, error = extract_resume_text(resume.file_url)
+    text, error = get_resume_text(resume)
     if error:
-        return jsonify({"error": error}), 400
+        return {"error": error}, 400
     if not text.strip():
-        return jsonify({"error": "No text extracted from resume file"}), 400
+        return {"error": "No text extracted from resume file"}, 400
+
+    # Identical content uploaded before has already been analyzed
+    known_score = copy_known_score(resume)
+    if known_score:
+        analysis_data = {
+            field: getattr(known_score, field) for field in (
+                "score_overall", "score_format", "score_skills", "score_experience",
+                "strengths", "weaknesses", "suggestions"
+            )
+        }
+        return {"analysis": analysis_data, "score_id": known_score.id}, 200
 
     prompt = f"""
 You are an expert HR professional and AI resume analyst.
@@ -109,17 +179,26 @@ Resume text:
 """
 
     try:
-        response = client.chat.completions.create(
+        analysis_json_str, cache_hit = cached_chat_completion(
+            get_openai_client(),
             model="gpt-4",
             messages=[
                 {"role": "system", "content": "You are a helpful assistant that analyzes resumes and returns JSON."},
                 {"role": "user", "content": prompt}
             ],
             temperature=0.3,
+            validate=is_json,
+            meter=UsageMeter(user.id, 'resume_analysis'),
         )
-        analysis_json_str = response.choices[0].message.content
         analysis_data = json.loads(analysis_json_str)
 
+        # A cached analysis of unchanged text reuses the score row it already produced
+        if cache_hit:
+            latest_score = ResumeScore.query.filter_by(resume_id=resume.id, ai_model="gpt-4") \
+                .order_by(ResumeScore.evaluated_at.desc(), ResumeScore.id.desc()).first()
+            if latest_score:
+                return {"analysis": analysis_data, "score_id": latest_score.id}, 200
+
         new_score = ResumeScore(
             resume_id=resume.id,
             ai_model="gpt-4",
@@ -135,69 +214,37 @@ Resume text:
         db.session.add(new_score)
         db.session.commit()
 
-        return jsonify({"analysis": analysis_data, "score_id": new_score.id}), 200
+        return {"analysis": analysis_data, "score_id": new_score.id}, 200
 
     except json.JSONDecodeError:
-        return jsonify({"error": "Failed to parse AI analysis JSON"}), 500
+        return {"error": "Failed to parse AI analysis JSON"}, 500
 
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return {"error": str(e)}, 500
 
-@ai_resume_routes.route('/resumes/<int:resume_id>/jobs/<int:job_id>/match', methods=['POST'])
-@login_required
-def match_resume_to_job(resume_id, job_id):
+@register_task('match_resume_to_job')
+def run_match_resume_to_job(user, resume_id, job_id):
     resume = Resume.query.get(resume_id)
-    if not resume or resume.user_id != current_user.id:
-        return jsonify({"error": "Resume not found or permission denied"}), 404
+    if not resume or resume.user_id != user.id:
+        return {"error": "Resume not found or permission denied"}, 404
 
     job = Job.query.get(job_id)
     if not job:
-        return jsonify({"error": "Job not found"}), 404
+        return {"error": "Job not found"}, 404
 
-    resume_text, error = extract_resume_text(resume.file_url)
+    resume_text, error = get_resume_text(resume)
     if error:
-        return jsonify({"error": error}), 400
+        return {"error": error}, 400
     if not resume_text.strip() or len(resume_text.strip()) < 20:
-        return jsonify({"error": "Resume text too short or empty"}), 400
-
-    prompt = f"""
-You are a recruitment AI assistant. Given the resume text and the job description below,
-analyze the candidate's fit for the job. Return a JSON with:
-- match_score: a float from 0 to 1, indicating the suitability
-- match_summary: a brief summary highlighting strengths and weaknesses for this job.
-
-Job Title: {job.title}
-Job Description: {job.description}
-
-Resume Text:
-{resume_text[:3000]}
-
-Respond ONLY with a valid JSON object.
-"""
+        return {"error": "Resume text too short or empty"}, 400
 
     try:
-        response = client.chat.completions.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": "You are a helpful AI recruitment assistant."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.3,
+        match_score, match_summary = request_job_match(
+            build_match_prompt(job, resume_text), UsageMeter(user.id, 'job_match')
         )
 
-        content = response.choices[0].message.content
-        if '```json' in content:
-            content = content.split('```json')[1].split('```')[0]
-        elif '```' in content:
-            content = content.split('```')[1]
-
-        ai_result = json.loads(content)
-
-        match_score = ai_result.get("match_score")
-        match_summary = ai_result.get("match_summary")
-
         if match_score is None or match_summary is None:
-            return jsonify({"error": "AI response missing required fields"}), 500
+            return {"error": "AI response missing required fields"}, 500
 
         existing_match = ResumeJobMatch.query.filter_by(resume_id=resume_id, job_id=job_id).first()
         if existing_match:
@@ -214,14 +261,271 @@ Respond ONLY with a valid JSON object.
 
         db.session.commit()
 
-        return jsonify({
+        return {
             "resume_id": resume_id,
             "job_id": job_id,
             "match_score": match_score,
             "match_summary": match_summary
-        }), 200
+        }, 200
 
     except Exception as e:
         db.session.rollback()
-        return jsonify({"error": f"AI analysis failed: {str(e)}"}), 500
+        return {"error": f"AI analysis failed: {str(e)}"}, 500
+
+@ai_resume_routes.route('/chat', methods=['POST'])
+@login_required
+@entitlement_required('ai_chat')
+def chat_with_ai():
+    data = request.get_json()
+    messages = data.get('messages')
+
+    if not messages or not isinstance(messages, list):
+        return jsonify({'error': 'Invalid or missing messages'}), 400
+
+    if wants_async():
+        return enqueue_response('chat', current_user.id, messages=messages)
+    body, status = run_chat(current_user, messages)
+    return jsonify(body), status
+
+@ai_resume_routes.route('/chat/stream', methods=['POST'])
+@login_required
+@entitlement_required('ai_chat')
+def stream_chat_with_ai():
+    """
+    Same as /chat but streams the reply as server-sent events: a 'data' event
+    per token delta, then a 'done' event. If the client disconnects the
+    upstream completion is closed instead of running to the end.
+    """
+    data = request.get_json()
+    messages = data.get('messages')
+
+    if not messages or not isinstance(messages, list):
+        return jsonify({'error': 'Invalid or missing messages'}), 400
+
+    meter = UsageMeter(current_user.id, 'ai_chat')
+
+    def generate():
+        started = time.perf_counter()
+        usage = None
+        try:
+            stream = get_openai_client().chat.completions.create(
+                model="gpt-4",
+                messages=messages,
+                temperature=0.7,
+                stream=True,
+                stream_options={"include_usage": True},
+            )
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+            return
+
+        try:
+            for chunk in stream:
+                if chunk.usage is not None:
+                    usage = chunk.usage  # sent in a final chunk without choices
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    yield f"data: {json.dumps({'delta': delta})}\n\n"
+            yield "event: done\ndata: {}\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+        finally:
+            # Runs on normal completion and on GeneratorExit when the client goes away
+            stream.close()
+            meter.record("gpt-4", time.perf_counter() - started, usage)
+
+    return Response(generate(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@ai_resume_routes.route('/resumes/<int:resume_id>/analyze', methods=['POST'])
+@login_required
+@entitlement_required('resume_analysis')
+def analyze_resume(resume_id):
+    if wants_async():
+        return enqueue_response('analyze_resume', current_user.id, resume_id=resume_id)
+    body, status = run_analyze_resume(current_user, resume_id)
+    return jsonify(body), status
+
+@ai_resume_routes.route('/resumes/<int:resume_id>/jobs/<int:job_id>/match', methods=['POST'])
+@login_required
+@entitlement_required('job_match')
+def match_resume_to_job(resume_id, job_id):
+    if wants_async():
+        return enqueue_response('match_resume_to_job', current_user.id, resume_id=resume_id, job_id=job_id)
+    body, status = run_match_resume_to_job(current_user, resume_id, job_id)
+    return jsonify(body), status
 
+@ai_resume_routes.route('/resumes/<int:resume_id>/jobs/match', methods=['POST'])
+@login_required
+@entitlement_required('job_match')
+def batch_match_resume_to_jobs(resume_id):
+    """
+    Rank one resume against many jobs. Takes either {"job_ids": [...]} or
+    {"filters": {...}} (the job listing filters), keeps the jobs most similar
+    to the resume by local vector similarity, scores them with the model
+    concurrently and streams newline-delimited JSON:
+    one line per job as it is scored, then a final line with the ranking.
+    """
+    resume = Resume.query.get(resume_id)
+    if not resume or resume.user_id != current_user.id:
+        return jsonify({"error": "Resume not found or permission denied"}), 404
+
+    data = request.get_json() or {}
+    job_ids = data.get('job_ids')
+    if job_ids is not None:
+        if not isinstance(job_ids, list) or not all(isinstance(i, int) for i in job_ids):
+            return jsonify({"error": "job_ids must be a list of integers"}), 400
+        jobs = Job.query.filter(Job.id.in_(job_ids[:MAX_BATCH_JOBS])).all() if job_ids else []
+    else:
+        try:
+            query = apply_job_filters(Job.query, data.get('filters') or {})
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        jobs = query.order_by(Job.created_at.desc(), Job.id.desc()).limit(MAX_BATCH_JOBS).all()
+
+    if not jobs:
+        return jsonify({"error": "No jobs to match"}), 404
+
+    resume_text, error = get_resume_text(resume)
+    if error:
+        return jsonify({"error": error}), 400
+    if not resume_text.strip() or len(resume_text.strip()) < 20:
+        return jsonify({"error": "Resume text too short or empty"}), 400
+
+    try:
+        max_candidates = max(1, min(int(data.get('max_candidates', MAX_BATCH_CANDIDATES)), MAX_BATCH_CANDIDATES))
+    except (TypeError, ValueError):
+        return jsonify({"error": "max_candidates must be an integer"}), 400
+    # Every candidate is a billed call, so never score more than the quota has left
+    remaining = remaining_quota(current_user.id, 'job_match')
+    if remaining == 0:
+        return quota_reached('job_match', entitlements_for(current_user.id).get('job_match'))
+    if remaining is not None:
+        max_candidates = min(max_candidates, remaining)
+    from .semantic_matcher import score_jobs  # loads numpy
+    similarities = score_jobs(resume_text, jobs)
+    ranked_jobs = sorted(zip(similarities, jobs), key=lambda pair: pair[0], reverse=True)
+    candidates = [job for _, job in ranked_jobs[:max_candidates]]
+    # Build prompts up front so worker threads never touch the ORM session
+    prompts = {job.id: build_match_prompt(job, resume_text) for job in candidates}
+    meter = UsageMeter(current_user.id, 'job_match')
+
+    def generate():
+        results = {}
+        with ThreadPoolExecutor(max_workers=AI_MATCH_CONCURRENCY) as executor:
+            futures = {executor.submit(request_job_match, prompt, meter): job_id for job_id, prompt in prompts.items()}
+            for future in as_completed(futures):
+                job_id = futures[future]
+                try:
+                    match_score, match_summary = future.result()
+                    if match_score is None or match_summary is None:
+                        raise ValueError("AI response missing required fields")
+                    match_score = float(match_score)
+                except Exception as e:
+                    yield json.dumps({"job_id": job_id, "error": f"AI analysis failed: {str(e)}"}) + "\n"
+                    continue
+                results[job_id] = (match_score, match_summary)
+                yield json.dumps({"job_id": job_id, "match_score": match_score, "match_summary": match_summary}) + "\n"
+
+        # Upsert every scored match in a single transaction
+        try:
+            existing = {
+                match.job_id: match
+                for match in ResumeJobMatch.query.filter(
+                    ResumeJobMatch.resume_id == resume_id,
+                    ResumeJobMatch.job_id.in_(list(results))
+                ).all()
+            } if results else {}
+            for job_id, (match_score, match_summary) in results.items():
+                if job_id in existing:
+                    existing[job_id].match_score = match_score
+                    existing[job_id].match_summary = match_summary
+                else:
+                    db.session.add(ResumeJobMatch(
+                        resume_id=resume_id,
+                        job_id=job_id,
+                        match_score=match_score,
+                        match_summary=match_summary
+                    ))
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            yield json.dumps({"error": f"Failed to save matches: {str(e)}"}) + "\n"
+            return
+
+        ranked = sorted(results.items(), key=lambda item: item[1][0], reverse=True)
+        yield json.dumps({
+            "resume_id": resume_id,
+            "ranked": [
+                {"job_id": job_id, "match_score": match_score, "match_summary": match_summary}
+                for job_id, (match_score, match_summary) in ranked
+            ]
+        }) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@ai_resume_routes.route('/resumes/<int:resume_id>/best-matches', methods=['GET'])
+@login_required
+def best_matches_for_resume(resume_id):
+    """Instant job recommendations from local vector similarity, no model call"""
+    resume = Resume.query.get(resume_id)
+    if not resume or resume.user_id != current_user.id:
+        return jsonify({"error": "Resume not found or permission denied"}), 404
+
+    resume_text, error = get_resume_text(resume)
+    if error:
+        return jsonify({"error": error}), 400
+    if not resume_text.strip():
+        return jsonify({"error": "No text extracted from resume file"}), 400
+
+    try:
+        k = max(1, min(int(request.args.get('k', 20)), 100))
+    except ValueError:
+        return jsonify({"error": "k must be an integer"}), 400
+
+    from .semantic_matcher import best_matching_job_ids  # loads numpy
+    ranked = best_matching_job_ids(resume_text, k)
+    jobs_by_id = {
+        job.id: job
+        for job in Job.query.options(joinedload(Job.company)).filter(Job.id.in_([job_id for job_id, _ in ranked])).all()
+    } if ranked else {}
+
+    return json_response({
+        "resume_id": resume_id,
+        "matches": [
+            {"job": jobs_by_id[job_id].to_dict(), "similarity": similarity}
+            for job_id, similarity in ranked if job_id in jobs_by_id
+        ]
+    })
+
+@ai_resume_routes.route('/cache/stats', methods=['GET'])
+@login_required
+def llm_cache_stats():
+    return jsonify(cache_stats()), 200
+
+@ai_resume_routes.route('/usage', methods=['GET'])
+@login_required
+def ai_usage():
+    """The current user's quotas and this month's model calls and tokens per feature"""
+    entitlements = entitlements_for(current_user.id)
+    quotas = {
+        feature: {**limits, 'used': usage_store.used(current_user.id, feature, limits['period'])}
+        for feature, limits in entitlements.to_dict().items() if limits['limit'] is not None
+    }
+    month_start, _ = period_bounds('month')
+    rows = db.session.query(
+        AIUsageRecord.feature,
+        db.func.count(),
+        db.func.sum(db.case((AIUsageRecord.cache_hit.is_(True), 1), else_=0)),
+        db.func.coalesce(db.func.sum(AIUsageRecord.total_tokens), 0),
+    ).filter(
+        AIUsageRecord.user_id == current_user.id,
+        AIUsageRecord.created_at >= month_start,
+    ).group_by(AIUsageRecord.feature).all()
+    month = {
+        feature: {'calls': calls, 'cache_hits': cache_hits, 'total_tokens': total_tokens}
+        for feature, calls, cache_hits, total_tokens in rows
+    }
+    return jsonify({'quotas': quotas, 'month': month}), 200
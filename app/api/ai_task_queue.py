@@ -0,0 +1,172 @@
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from flask import current_app, jsonify, request, url_for
+from app.models import db, AITask, User
+
+logger = logging.getLogger(__name__)
+
+AI_TASK_WORKERS = int(os.getenv('AI_TASK_WORKERS', 4))
+# A running task whose worker hasn't finished it this long after claiming it
+# (the process crashed or was frozen) is handed to another worker
+AI_TASK_LEASE = int(os.getenv('AI_TASK_LEASE', 300))  # seconds
+AI_TASK_MAX_ATTEMPTS = int(os.getenv('AI_TASK_MAX_ATTEMPTS', 3))
+AI_TASK_SWEEP_INTERVAL = int(os.getenv('AI_TASK_SWEEP_INTERVAL', 60))  # seconds
+# Serverless platforms freeze the process as soon as the response is sent, so
+# a background thread would never finish the task. Run tasks before replying
+# there instead; the 202 response then already carries the result.
+AI_TASK_INLINE = os.getenv('AI_TASK_INLINE', '1' if os.getenv('VERCEL') else '').lower() in ('1', 'true', 'yes')
+
+TASK_HANDLERS = {}
+
+_executor = None
+_executor_lock = threading.Lock()
+_queued = set()  # ids submitted to this process's executor and not started yet
+
+
+def register_task(kind):
+    """Register a handler(user, **payload) -> (body, status_code) that can run in the background"""
+    def decorator(handler):
+        TASK_HANDLERS[kind] = handler
+        return handler
+    return decorator
+
+
+def wants_async():
+    return request.args.get('async', '').lower() in ('1', 'true', 'yes')
+
+
+def start_task_workers(app):
+    """
+    Start this process's task executor and the sweeper that recovers tasks
+    left behind by dead workers. Call once per worker process at startup
+    (gunicorn.conf.py does); enqueueing a task also starts them.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=AI_TASK_WORKERS, thread_name_prefix='ai-task')
+            threading.Thread(target=_sweep_forever, args=(app,), name='ai-task-sweeper', daemon=True).start()
+        return _executor
+
+
+def _sweep_forever(app):
+    while True:
+        try:
+            with app.app_context():
+                for task_id in recover_tasks():
+                    _submit(app, task_id)
+        except Exception:
+            logger.exception("AI task sweep failed")
+        time.sleep(AI_TASK_SWEEP_INTERVAL)
+
+
+def _submit(app, task_id):
+    with _executor_lock:
+        if task_id in _queued:
+            return
+        _queued.add(task_id)
+    _executor.submit(run_task, app, task_id)
+
+
+def recover_tasks():
+    """
+    Put running tasks whose lease expired back to pending, failing those that
+    have used up AI_TASK_MAX_ATTEMPTS. Returns the ids to submit: the tasks
+    reclaimed here, plus tasks pending for longer than a sweep interval, whose
+    enqueueing worker died before running them. The atomic claim in run_task
+    keeps a task that is still queued elsewhere from running twice.
+    """
+    now = datetime.now(timezone.utc)
+    expired = db.and_(AITask.status == 'running', AITask.started_at < now - timedelta(seconds=AI_TASK_LEASE))
+    try:
+        AITask.query.filter(expired, AITask.attempts >= AI_TASK_MAX_ATTEMPTS).update({
+            "status": "failed",
+            "result": json.dumps({"error": "Task did not finish"}),
+            "status_code": 500,
+            "finished_at": now,
+        }, synchronize_session=False)
+        reclaimable = [task_id for (task_id,) in db.session.query(AITask.id).filter(expired).all()]
+        reclaimed = []
+        for task_id in reclaimable:
+            # Another worker's sweep may have taken it meanwhile
+            if AITask.query.filter(AITask.id == task_id, expired).update({"status": "pending"}, synchronize_session=False):
+                reclaimed.append(task_id)
+        db.session.commit()
+        orphaned = db.session.query(AITask.id).filter(
+            AITask.status == 'pending',
+            AITask.created_at < now - timedelta(seconds=AI_TASK_SWEEP_INTERVAL),
+            AITask.id.notin_(reclaimed),
+        ).all()
+        return reclaimed + [task_id for (task_id,) in orphaned]
+    finally:
+        db.session.remove()
+
+
+def enqueue_task(kind, user_id, **payload):
+    task = AITask(id=uuid.uuid4().hex, user_id=user_id, kind=kind, status='pending', payload=json.dumps(payload))
+    db.session.add(task)
+    db.session.commit()
+
+    app = current_app._get_current_object()
+    if AI_TASK_INLINE:
+        run_task(app, task.id)
+        return AITask.query.get(task.id)
+    start_task_workers(app)
+    _submit(app, task.id)
+    return task
+
+
+def enqueue_response(kind, user_id, **payload):
+    """202 response for an endpoint called with ?async=true"""
+    task = enqueue_task(kind, user_id, **payload)
+    return jsonify({
+        "task_id": task.id,
+        "status": task.status,
+        "status_url": url_for('ai_tasks.get_task', task_id=task.id),
+        "events_url": url_for('ai_tasks.task_events', task_id=task.id),
+    }), 202
+
+
+def run_task(app, task_id):
+    with _executor_lock:
+        _queued.discard(task_id)
+    with app.app_context():
+        try:
+            # Claim the task atomically so it runs exactly once across workers
+            claimed = AITask.query.filter_by(id=task_id, status='pending').update(
+                {"status": "running", "started_at": datetime.now(timezone.utc), "attempts": AITask.attempts + 1},
+                synchronize_session=False
+            )
+            db.session.commit()
+            if not claimed:
+                return
+
+            task = AITask.query.get(task_id)
+            attempt = task.attempts
+            handler = TASK_HANDLERS.get(task.kind)
+            try:
+                if handler is None:
+                    raise ValueError(f"Unknown task kind: {task.kind}")
+                body, status_code = handler(User.query.get(task.user_id), **json.loads(task.payload or '{}'))
+            except Exception as e:
+                db.session.rollback()
+                body, status_code = {"error": str(e)}, 500
+
+            # Only the holder of the current lease records a result
+            finished = AITask.query.filter_by(id=task_id, status='running', attempts=attempt).update({
+                "result": json.dumps(body, default=str),
+                "status_code": status_code,
+                "status": 'succeeded' if status_code < 400 else 'failed',
+                "finished_at": datetime.now(timezone.utc),
+            }, synchronize_session=False)
+            db.session.commit()
+            if not finished:
+                logger.warning("Discarded the result of AI task %s: its lease expired", task_id)
+        finally:
+            db.session.remove()
@@ -0,0 +1,53 @@
+from flask import Blueprint, jsonify, Response, stream_with_context
+from flask_login import login_required, current_user
+from app.models import db, AITask
+import time
+from .serialization import dumps, json_response
+
+ai_task_routes = Blueprint('ai_tasks', __name__)
+
+EVENT_POLL_INTERVAL = 0.5  # seconds
+EVENT_STREAM_TIMEOUT = 25  # seconds; clients reconnect to keep following the task
+
+
+def get_own_task(task_id):
+    task = AITask.query.get(task_id)
+    if not task or task.user_id != current_user.id:
+        return None
+    return task
+
+
+@ai_task_routes.route('/<task_id>', methods=['GET'])
+@login_required
+def get_task(task_id):
+    task = get_own_task(task_id)
+    if not task:
+        return jsonify({"error": "Task not found"}), 404
+    return json_response(task.to_dict())
+
+
+@ai_task_routes.route('/<task_id>/events', methods=['GET'])
+@login_required
+def task_events(task_id):
+    """Server-sent events: a 'status' event whenever the task changes state, ending when it finishes"""
+    task = get_own_task(task_id)
+    if not task:
+        return jsonify({"error": "Task not found"}), 404
+
+    def generate():
+        last_status = None
+        deadline = time.time() + EVENT_STREAM_TIMEOUT
+        while time.time() < deadline:
+            db.session.expire_all()
+            task = AITask.query.get(task_id)
+            if task.status != last_status:
+                last_status = task.status
+                yield f"event: status\ndata: {dumps(task.to_dict())}\n\n"
+                if task.status in ('succeeded', 'failed'):
+                    return
+            else:
+                yield ": keepalive\n\n"
+            time.sleep(EVENT_POLL_INTERVAL)
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
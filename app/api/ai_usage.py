@@ -0,0 +1,160 @@
+import logging
+import math
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from sqlalchemy.exc import SQLAlchemyError
+from app.models import db, AIUsageRecord
+
+logger = logging.getLogger(__name__)
+
+# Requests per minute per user and feature, for plans that don't set rate_limit
+AI_RATE_LIMIT = int(os.getenv('AI_RATE_LIMIT', 10))
+RATE_WINDOW = 60  # seconds
+# How long a worker trusts its own quota counts before re-reading ai_usage_records
+AI_USAGE_SYNC_INTERVAL = float(os.getenv('AI_USAGE_SYNC_INTERVAL', 30))  # seconds
+
+PERIODS = ('day', 'month')
+
+
+def period_bounds(period, now=None):
+    now = now or datetime.now(timezone.utc)
+    if period == 'day':
+        start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        return start, start + timedelta(days=1)
+    start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    end = (start + timedelta(days=32)).replace(day=1)
+    return start, end
+
+
+class SlidingWindowCounter:
+    """
+    Approximate sliding-window rate limiter: a key's count for the current
+    fixed window plus the previous window's count, weighted by how much of
+    the previous window the sliding window still covers. Two integers per
+    key, per process.
+    """
+
+    def __init__(self, window=RATE_WINDOW):
+        self.window = window
+        self.windows = {}  # key -> (window index, count, previous window's count)
+        self.swept = 0
+        self.lock = threading.Lock()
+
+    def hit(self, key, limit, now=None):
+        """
+        Count a request for `key` if that keeps it within `limit`. Returns 0
+        when the request is allowed, otherwise the seconds until one would be.
+        """
+        now = time.time() if now is None else now
+        index, offset = divmod(now, self.window)
+        with self.lock:
+            if index > self.swept:
+                self.windows = {k: v for k, v in self.windows.items() if v[0] >= index - 1}
+                self.swept = index
+            current = previous = 0
+            entry = self.windows.get(key)
+            if entry is not None:
+                if entry[0] == index:
+                    current, previous = entry[1], entry[2]
+                elif entry[0] == index - 1:
+                    previous = entry[1]
+            if previous * (1 - offset / self.window) + current + 1 <= limit:
+                self.windows[key] = (index, current + 1, previous)
+                return 0
+        if current + 1 > limit:
+            # Not before the next window, once this window's weight has decayed enough
+            wait = self.window - offset + self.window * max(0.0, 1 - (limit - 1) / current) if current else self.window
+        else:
+            wait = self.window * (1 - (limit - current - 1) / previous) - offset
+        return max(1, math.ceil(wait))
+
+
+class UsageStore:
+    """
+    Billed model calls per user, feature and quota period. Counts are kept in
+    memory and re-read from ai_usage_records once they are older than
+    AI_USAGE_SYNC_INTERVAL, so calls made by other workers are picked up. If
+    the table can't be read the in-memory count is used.
+    """
+
+    def __init__(self, sync_interval=AI_USAGE_SYNC_INTERVAL):
+        self.sync_interval = sync_interval
+        self.entries = {}  # (user_id, feature, period) -> [period start, count, synced at]
+        self.lock = threading.Lock()
+
+    def used(self, user_id, feature, period):
+        period_start, _ = period_bounds(period)
+        key = (user_id, feature, period)
+        with self.lock:
+            entry = self.entries.get(key)
+        if entry is not None and entry[0] == period_start and entry[2] + self.sync_interval > time.monotonic():
+            return entry[1]
+
+        count = self.load(user_id, feature, period_start)
+        if count is None:
+            return entry[1] if entry is not None and entry[0] == period_start else 0
+        with self.lock:
+            self.entries[key] = [period_start, count, time.monotonic()]
+        return count
+
+    def load(self, user_id, feature, since):
+        table = AIUsageRecord.__table__
+        try:
+            with db.engine.connect() as conn:
+                return conn.execute(
+                    db.select(db.func.count()).select_from(table).where(
+                        table.c.user_id == user_id,
+                        table.c.feature == feature,
+                        table.c.cache_hit.is_(False),
+                        table.c.created_at >= since,
+                    )
+                ).scalar()
+        except SQLAlchemyError:
+            logger.warning("Could not read AI usage for user %s; using in-memory counts", user_id)
+            return None
+
+    def add(self, user_id, feature, amount=1):
+        with self.lock:
+            for period in PERIODS:
+                entry = self.entries.get((user_id, feature, period))
+                if entry is not None and entry[0] == period_bounds(period)[0]:
+                    entry[1] += amount
+
+
+rate_limiter = SlidingWindowCounter()
+usage_store = UsageStore()
+
+
+class UsageMeter:
+    """
+    Records the model calls made for one user and feature. Create it while the
+    app context is active; record() can then be called from worker threads.
+    """
+
+    def __init__(self, user_id, feature):
+        self.user_id = user_id
+        self.feature = feature
+        self.engine = db.engine
+
+    def record(self, model, latency, usage=None, cache_hit=False):
+        """Store one call. `usage` is the OpenAI response's usage; `latency` is in seconds."""
+        values = {
+            'user_id': self.user_id,
+            'feature': self.feature,
+            'model': model,
+            'prompt_tokens': getattr(usage, 'prompt_tokens', None),
+            'completion_tokens': getattr(usage, 'completion_tokens', None),
+            'total_tokens': getattr(usage, 'total_tokens', None),
+            'latency_ms': int(latency * 1000),
+            'cache_hit': cache_hit,
+        }
+        try:
+            # Own connection, so metering never commits or rolls back the caller's session
+            with self.engine.begin() as conn:
+                conn.execute(AIUsageRecord.__table__.insert().values(**values))
+        except SQLAlchemyError:
+            logger.exception("Could not record AI usage for user %s", self.user_id)
+        if not cache_hit:
+            usage_store.add(self.user_id, self.feature)
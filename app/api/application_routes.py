@@ -1,6 +1,9 @@
 from flask import Blueprint, jsonify, request
 from flask_login import login_required, current_user
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
 from app.models import db, Application, Job
+from .serialization import APPLICATION_SCHEMA, requested_fields, json_response
 
 application_routes = Blueprint('applications', __name__)
 
@@ -9,20 +12,26 @@ application_routes = Blueprint('applications', __name__)
 @application_routes.route('/', methods=['GET'])
 @login_required
 def get_applications():
-    applications = Application.query.filter_by(user_id=current_user.id).all()
-    return jsonify({'applications': [app.to_dict() for app in applications]}), 200
+    try:
+        fields = APPLICATION_SCHEMA.resolve(requested_fields())
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    rows = APPLICATION_SCHEMA.query(fields).filter(Application.user_id == current_user.id).all()
+    return json_response({'applications': APPLICATION_SCHEMA.serialize_rows(rows, fields)})
 
 
 # Get a specific application by ID (must belong to current user)
 @application_routes.route('/<int:id>', methods=['GET'])
 @login_required
 def get_application(id):
-    application = Application.query.get_or_404(id)
+    application = Application.query.options(
+        joinedload(Application.job).joinedload(Job.company)
+    ).get_or_404(id)
 
     if application.user_id != current_user.id:
         return jsonify({'error': 'Unauthorized'}), 403
 
-    return jsonify(application.to_dict()), 200
+    return json_response(application.to_dict(include_job=True))
 
 
 # Create a new application (login required)
@@ -54,9 +63,14 @@ def create_application():
     )
 
     db.session.add(new_app)
-    db.session.commit()
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # A concurrent request created the same application first
+        db.session.rollback()
+        return jsonify({'error': 'You have already applied for this job'}), 400
 
-    return jsonify(new_app.to_dict()), 201
+    return json_response(new_app.to_dict(), 201)
 
 
 # Update an application (only if owned by current user)
@@ -78,7 +92,7 @@ def update_application(id):
 
     db.session.commit()
 
-    return jsonify(application.to_dict()), 200
+    return json_response(application.to_dict())
 
 
 # Delete an application (only if owned by current user)
@@ -1,18 +1,18 @@
-import boto3
-import botocore
 import os
 import uuid
 from io import BytesIO
+from .storage import storage
 
-BUCKET_NAME = os.environ.get("S3_BUCKET")
-S3_LOCATION = f"https://{BUCKET_NAME}.s3.amazonaws.com/"
-ALLOWED_EXTENSIONS = {"pdf","docx"}
+# Files go to the backend chosen by STORAGE_BACKEND (see storage.py); these
+# helpers keep their S3 names from before local storage existed.
 
-s3 = boto3.client(
-    "s3",
-    aws_access_key_id=os.environ.get("S3_KEY"),
-    aws_secret_access_key=os.environ.get("S3_SECRET")
-)
+PRESIGNED_URL_EXPIRY = int(os.environ.get("S3_PRESIGNED_URL_EXPIRY", 300))  # seconds
+ALLOWED_EXTENSIONS = {"pdf","docx"}
+CONTENT_TYPES = {
+    "doc": "application/msword",
+    "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "pdf": "application/pdf",
+}
 
 
 def get_unique_filename(filename):
@@ -21,65 +21,69 @@ def get_unique_filename(filename):
     return f"{unique_filename}.{ext}"
 
 
-def upload_file_to_s3(file, acl="public-read"):
-    unique_filename = get_unique_filename(file.filename)
+def content_addressed_key(content_hash, filename):
+    """Key for a file stored under the SHA-256 of its bytes"""
+    ext = filename.rsplit(".", 1)[1].lower()
+    return f"{content_hash}.{ext}"
+
+
+def content_type_for(filename):
+    return CONTENT_TYPES.get(filename.rsplit(".", 1)[-1].lower(), "application/octet-stream")
+
+
+def object_url(key):
+    return storage.url(key)
+
+
+def upload_file_to_s3(file, acl="public-read", key=None):
+    unique_filename = key or get_unique_filename(file.filename)
 
     content_type = file.content_type
     if not content_type or content_type == 'application/octet-stream':
-        ext = unique_filename.rsplit(".", 1)[1].lower()
-        if ext == 'doc':
-            content_type = 'application/msword'
-        elif ext == 'docx':
-            content_type = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
-        elif ext == 'pdf':
-            content_type = 'application/pdf'
-        else:
-            content_type = 'application/octet-stream'
+        content_type = content_type_for(unique_filename)
 
     try:
-        s3.upload_fileobj(
-            file,
-            BUCKET_NAME,
-            unique_filename,
-            ExtraArgs={
-                "ContentType": content_type,
-                # "ACL": acl
-            }
-        )
+        url = storage.save(file, unique_filename, content_type)
     except Exception as e:
         return {"errors": str(e)}
 
-    return {"url": f"{S3_LOCATION}{unique_filename}"}
+    return {"url": url}
 
 
 def upload_pdf_bytes_to_s3(pdf_buffer, filename, acl="public-read"):
     unique_filename = get_unique_filename(filename)
 
     try:
-        s3.upload_fileobj(
-            pdf_buffer,
-            BUCKET_NAME,
-            unique_filename,
-            ExtraArgs={
-                "ContentType": "application/pdf",
-                # "ACL": acl
-            }
-        )
+        url = storage.save(pdf_buffer, unique_filename, "application/pdf")
     except Exception as e:
         return {"errors": str(e)}
 
-    return {"url": f"{S3_LOCATION}{unique_filename}"}
-
+    return {"url": url}
 
 
 def remove_file_from_s3(file_url):
-    key = file_url.rsplit("/", 1)[1]
-    print(key)
     try:
-        s3.delete_object(
-            Bucket=BUCKET_NAME,
-            Key=key
-        )
+        if not storage.delete(file_url):
+            return {"errors": f"Not a stored file: {file_url}"}
     except Exception as e:
         return {"errors": str(e)}
     return True
+
+
+def stored_object_size(key):
+    """Size in bytes of a stored file, or None if it doesn't exist"""
+    return storage.size(key)
+
+
+def presigned_upload(key, content_type, max_size, expires_in=PRESIGNED_URL_EXPIRY):
+    """
+    Presigned POST ({"url": ..., "fields": {...}}) for the client to upload one
+    object straight to S3. S3 rejects any other key or content type and
+    anything larger than max_size.
+    """
+    return storage.presigned_upload(key, content_type, max_size, expires_in)
+
+
+def presigned_download_url(file_url, expires_in=PRESIGNED_URL_EXPIRY):
+    """Short-lived GET URL for a stored file, or None if the URL isn't one of ours"""
+    return storage.download_url(file_url, expires_in)
@@ -1,6 +1,7 @@
 from flask import Blueprint, jsonify, request
 from flask_login import login_required
 from app.models import db, Company
+from .serialization import json_response
 
 company_routes = Blueprint('companies', __name__)
 
@@ -10,7 +11,7 @@ company_routes = Blueprint('companies', __name__)
 @login_required
 def get_companies():
     companies = Company.query.all()
-    return jsonify({'companies': [company.to_dict() for company in companies]}), 200
+    return json_response({'companies': [company.to_dict() for company in companies]})
 
 
 # Get a single company by id (login required)
@@ -18,7 +19,7 @@ def get_companies():
 @login_required
 def get_company(id):
     company = Company.query.get_or_404(id)
-    return jsonify(company.to_dict()), 200
+    return json_response(company.to_dict())
 
 
 # Create a new company (login required)
@@ -46,7 +47,7 @@ def create_company():
     db.session.add(company)
     db.session.commit()
 
-    return jsonify(company.to_dict()), 201
+    return json_response(company.to_dict(), 201)
 
 
 # Update a company by id (login required)
@@ -70,7 +71,7 @@ def update_company(id):
 
     db.session.commit()
 
-    return jsonify(company.to_dict()), 200
+    return json_response(company.to_dict())
 
 
 # Delete a company by id (login required)
@@ -1,17 +1,70 @@
-from flask import Blueprint, request, jsonify
+from datetime import datetime, timedelta, timezone
+from flask import Blueprint, request
 from flask_login import login_required, current_user
-from app.models import db, Conversation
+from app.models import db, Conversation, Message
+from .pagination_helper import get_page_size, encode_cursor, decode_cursor, keyset_before, keyset_after
+from .serialization import MESSAGE_SCHEMA, json_response
+from .inbox_helper import inbox_query, serialize_inbox_row, visible_conversations_filter
+from .message_events import publish_to_users
+from .membership_helper import as_utc
 
 conversation_routes = Blueprint('conversations', __name__)
 
+SYNC_START = datetime(1970, 1, 1, tzinfo=timezone.utc)  # sync cursor for a conversation with no messages yet
+# updated_at is set when the writing transaction starts, so a change can commit
+# after newer ones have already been synced. Sync cursors never point later than
+# this far back, and the changes inside the window are sent again next poll.
+SYNC_WINDOW = 30  # seconds, longer than any transaction that writes messages
+
+
+def sync_position(position):
+    """The sync cursor position for `position`, held back to the start of SYNC_WINDOW"""
+    horizon = datetime.now(timezone.utc) - timedelta(seconds=SYNC_WINDOW)
+    if as_utc(position[0]) > horizon:
+        return horizon, 0
+    return position
+
+
+def parse_timestamp(value):
+    """An ISO 8601 timestamp as an aware UTC datetime; naive ones are taken as UTC. Raises ValueError."""
+    if not isinstance(value, str):
+        raise ValueError('Invalid timestamp')
+    if value.endswith(('Z', 'z')):
+        value = value[:-1] + '+00:00'
+    return as_utc(datetime.fromisoformat(value)).astimezone(timezone.utc)
+
+
 @conversation_routes.route('/')
 @login_required
 def get_conversations():
-    conversations = Conversation.query.filter(
-        (Conversation.user_1_id == current_user.id) | 
-        (Conversation.user_2_id == current_user.id)
-    ).all()
-    return jsonify([c.to_dict() for c in conversations])
+    conversations = Conversation.query.filter(visible_conversations_filter(current_user.id)).all()
+    return json_response([c.to_dict() for c in conversations])
+
+
+@conversation_routes.route('/inbox')
+@login_required
+def get_inbox():
+    """
+    The current user's conversations, most recent activity first, each with
+    the other participant, the latest message and the unread count.
+    Keyset-paginated with ?cursor=<next_cursor>.
+    """
+    limit = get_page_size(request.args.get('limit'))
+    query, activity = inbox_query(current_user.id)
+    if request.args.get('cursor'):
+        try:
+            cursor = decode_cursor(request.args['cursor'])
+        except ValueError as e:
+            return {'error': str(e)}, 400
+        query = query.filter(keyset_before(activity, Conversation.id, cursor))
+
+    # Fetch one extra row to know whether another page exists
+    rows = query.order_by(activity.desc(), Conversation.id.desc()).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = encode_cursor(rows[-1][-1], rows[-1][0]) if has_more else None
+
+    return json_response({'conversations': [serialize_inbox_row(row) for row in rows], 'next_cursor': next_cursor})
 
 @conversation_routes.route('/', methods=['POST'])
 @login_required
@@ -22,7 +75,7 @@ def create_or_get_conversation():
         return {'error': 'Missing user_id'}, 400
 
     conversation = Conversation.get_or_create(current_user.id, user_b_id)
-    return jsonify(conversation.to_dict())
+    return json_response(conversation.to_dict())
 
 @conversation_routes.route('/<int:conversation_id>')
 @login_required
@@ -30,12 +83,118 @@ def get_conversation_detail(conversation_id):
     conversation = Conversation.query.get_or_404(conversation_id)
     if current_user.id not in [conversation.user_1_id, conversation.user_2_id]:
         return {'error': 'Unauthorized'}, 403
-    return jsonify({
+    return json_response({
         **conversation.to_dict(),
         'messages': [m.to_dict() for m in conversation.messages]
     })
 
 
+@conversation_routes.route('/<int:conversation_id>/messages')
+@login_required
+def get_conversation_messages(conversation_id):
+    """
+    Message history, newest first, keyset-paginated on (sent_at, id) with
+    ?before=<next_cursor>.
+
+    With ?since=<sync_cursor> it instead returns, oldest change first, only the
+    messages created, edited, recalled or read after that cursor. Every
+    response carries a sync_cursor to pass as ?since= on the next poll.
+    Changes from the last SYNC_WINDOW seconds come back on every poll, so
+    clients replace messages they already have by id.
+    """
+    conversation = Conversation.query.get_or_404(conversation_id)
+    if current_user.id not in [conversation.user_1_id, conversation.user_2_id]:
+        return {'error': 'Unauthorized'}, 403
+
+    limit = get_page_size(request.args.get('limit'))
+    fields = MESSAGE_SCHEMA.resolve()
+    # The keyset columns ride along after the serialized ones
+    query = MESSAGE_SCHEMA.query(fields).add_columns(Message.sent_at, Message.updated_at, Message.id) \
+        .filter(Message.conversation_id == conversation_id)
+
+    try:
+        if request.args.get('since'):
+            since = decode_cursor(request.args['since'])
+            if since[0] is None:
+                raise ValueError('Invalid cursor')
+            query = query.filter(keyset_after(Message.updated_at, Message.id, since)) \
+                .order_by(Message.updated_at, Message.id)
+        else:
+            since = None
+            if request.args.get('before'):
+                query = query.filter(keyset_before(Message.sent_at, Message.id, decode_cursor(request.args['before'])))
+            query = query.order_by(Message.sent_at.desc(), Message.id.desc())
+    except ValueError as e:
+        return {'error': str(e)}, 400
+
+    # Fetch one extra row to know whether another page exists
+    rows = query.limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    if since:
+        next_cursor = None
+        position = (rows[-1][-2], rows[-1][-1]) if rows else since
+        # While more pages are waiting the client pages on from the last row
+        sync_cursor = encode_cursor(*(position if has_more else sync_position(position)))
+    else:
+        next_cursor = encode_cursor(rows[-1][-3], rows[-1][-1]) if has_more else None
+        latest = db.session.query(Message.updated_at, Message.id) \
+            .filter(Message.conversation_id == conversation_id) \
+            .order_by(Message.updated_at.desc(), Message.id.desc()).first()
+        sync_cursor = encode_cursor(*sync_position(latest)) if latest else encode_cursor(SYNC_START, 0)
+
+    return json_response({
+        'messages': MESSAGE_SCHEMA.serialize_rows(rows, fields),
+        'next_cursor': next_cursor,
+        'sync_cursor': sync_cursor,
+        'has_more': has_more,
+    })
+
+
+@conversation_routes.route('/<int:conversation_id>/read', methods=['PATCH'])
+@login_required
+def mark_conversation_read(conversation_id):
+    """
+    Mark the other participant's unread messages as read in one UPDATE: all of
+    them, or only those up to {"up_to_id": ...} or {"up_to": <ISO timestamp>}.
+    A timestamp without an offset is taken as UTC.
+    Sends a single conversation.read event.
+    """
+    conversation = Conversation.query.get_or_404(conversation_id)
+    user_id = current_user.id
+    participants = [conversation.user_1_id, conversation.user_2_id]
+    if user_id not in participants:
+        return {'error': 'Unauthorized'}, 403
+
+    data = request.get_json(silent=True) or {}
+    query = Message.query.filter(
+        Message.conversation_id == conversation_id,
+        Message.sender_id != user_id,
+        Message.read_at.is_(None),
+    )
+    try:
+        if data.get('up_to_id') is not None:
+            query = query.filter(Message.id <= int(data['up_to_id']))
+        if data.get('up_to'):
+            up_to = parse_timestamp(data['up_to'])
+            query = query.filter(Message.sent_at <= up_to)
+    except (TypeError, ValueError):
+        return {'error': 'up_to_id must be an integer and up_to an ISO 8601 timestamp'}, 400
+
+    read_at = datetime.now(timezone.utc)
+    # updated_at is bumped by its onupdate default so ?since= syncs pick these up
+    updated = query.update({Message.read_at: read_at}, synchronize_session=False)
+    db.session.commit()
+
+    if updated:
+        publish_to_users(participants, {
+            'type': 'conversation.read', 'conversation_id': conversation_id, 'reader_id': user_id,
+            'up_to_id': data.get('up_to_id'), 'read_at': read_at, 'count': updated,
+        })
+    return {'conversation_id': conversation_id, 'read_count': updated, 'read_at': read_at.isoformat()}, 200
+
+
 @conversation_routes.route('/<int:conversation_id>/delete', methods=['PATCH'])
 @login_required
 def delete_conversation(conversation_id):
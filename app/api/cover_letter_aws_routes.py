@@ -113,34 +113,44 @@
 from flask import Blueprint, request, jsonify
 from flask_login import login_required, current_user
 from app.models import db, CoverLetter
-from .aws_helpers import upload_file_to_s3, remove_file_from_s3
+from .aws_helpers import (
+    remove_file_from_s3, get_unique_filename, content_type_for, object_url,
+    stored_object_size, presigned_upload, presigned_download_url, PRESIGNED_URL_EXPIRY
+)
+from .upload_helper import (
+    MAX_FILE_SIZE, FileTooLarge, parse_upload, content_hash, store_upload, release_file,
+    issue_upload_token, read_upload_token, read_direct_upload
+)
+from .serialization import COVER_LETTER_SCHEMA, requested_fields, json_response
 
 cover_letter_routes = Blueprint('cover_letters', __name__)
 
 ALLOWED_EXTENSIONS = {"pdf", "docx"}
 MAX_COVER_LETTERS_PER_USER = 10
-MAX_FILE_SIZE = 10 * 1024 * 1024  # 10 MB
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def file_size_within_limit(file):
-    file.seek(0, 2)
-    size = file.tell()
-    file.seek(0)
-    return size <= MAX_FILE_SIZE
-
 @cover_letter_routes.route('/all', methods=['GET'])
 @login_required
 def get_all_cover_letters():
-    cover_letters = CoverLetter.query.order_by(CoverLetter.uploaded_at.desc()).all()
-    return jsonify({"cover_letters": [cl.to_dict() for cl in cover_letters]}), 200
+    try:
+        fields = COVER_LETTER_SCHEMA.resolve(requested_fields())
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    rows = COVER_LETTER_SCHEMA.query(fields).order_by(CoverLetter.uploaded_at.desc()).all()
+    return json_response({"cover_letters": COVER_LETTER_SCHEMA.serialize_rows(rows, fields)})
 
 @cover_letter_routes.route('', methods=['GET'])
 @login_required
 def get_user_cover_letters():
-    cover_letters = CoverLetter.query.filter_by(user_id=current_user.id).order_by(CoverLetter.uploaded_at.desc()).all()
-    return jsonify({"cover_letters": [cl.to_dict() for cl in cover_letters]}), 200
+    try:
+        fields = COVER_LETTER_SCHEMA.resolve(requested_fields())
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    rows = COVER_LETTER_SCHEMA.query(fields).filter(CoverLetter.user_id == current_user.id) \
+        .order_by(CoverLetter.uploaded_at.desc()).all()
+    return json_response({"cover_letters": COVER_LETTER_SCHEMA.serialize_rows(rows, fields)})
 
 @cover_letter_routes.route('/<int:cover_letter_id>', methods=['GET'])
 @login_required
@@ -148,7 +158,7 @@ def get_cover_letter_by_id(cover_letter_id):
     cl = CoverLetter.query.get(cover_letter_id)
     if not cl or cl.user_id != current_user.id:
         return jsonify({"error": "Cover letter not found or no permission"}), 404
-    return jsonify({"cover_letter": cl.to_dict()}), 200
+    return json_response({"cover_letter": cl.to_dict()})
 
 @cover_letter_routes.route('', methods=['POST'])
 @login_required
@@ -157,36 +167,129 @@ def upload_cover_letter():
     if existing_count >= MAX_COVER_LETTERS_PER_USER:
         return jsonify({"error": f"You can only upload up to {MAX_COVER_LETTERS_PER_USER} cover letters."}), 400
 
-    if 'file' not in request.files:
+    try:
+        form, files = parse_upload(MAX_FILE_SIZE)
+    except FileTooLarge as e:
+        return jsonify({"error": str(e)}), 400
+
+    if 'file' not in files:
         return jsonify({"error": "No file part"}), 400
 
-    file = request.files['file']
+    file = files['file']
     if file.filename == '':
         return jsonify({"error": "No selected file"}), 400
 
     if not allowed_file(file.filename):
         return jsonify({"error": "File type not allowed. Only PDF and DOCX are supported."}), 400
 
-    if not file_size_within_limit(file):
-        return jsonify({"error": f"File size must be less than {MAX_FILE_SIZE // (1024 * 1024)}MB"}), 400
-
-    upload_result = upload_file_to_s3(file)
+    upload_result = store_upload(file)
     if 'url' not in upload_result:
         return jsonify({"error": upload_result.get('errors', 'Upload failed')}), 500
 
     file_url = upload_result['url']
-    title = request.form.get('title')
+    title = form.get('title')
 
     new_cover_letter = CoverLetter(
         user_id=current_user.id,
         file_url=file_url,
-        title=title
+        title=title,
+        content_hash=content_hash(file)
     )
 
     db.session.add(new_cover_letter)
     db.session.commit()
 
-    return jsonify({"message": "Cover letter uploaded", "cover_letter": new_cover_letter.to_dict()}), 201
+    return json_response({"message": "Cover letter uploaded", "cover_letter": new_cover_letter.to_dict()}, 201)
+
+@cover_letter_routes.route('/upload-url', methods=['POST'])
+@login_required
+def create_cover_letter_upload_url():
+    """
+    Start a direct upload: a presigned POST the client sends the file to
+    itself, and an upload_token to pass to /upload-complete once it's done.
+    """
+    existing_count = CoverLetter.query.filter_by(user_id=current_user.id).count()
+    if existing_count >= MAX_COVER_LETTERS_PER_USER:
+        return jsonify({"error": f"You can only upload up to {MAX_COVER_LETTERS_PER_USER} cover letters."}), 400
+
+    data = request.get_json() or {}
+    filename = data.get('filename') or ''
+    if not allowed_file(filename):
+        return jsonify({"error": "File type not allowed. Only PDF and DOCX are supported."}), 400
+
+    key = get_unique_filename(filename)
+    try:
+        upload = presigned_upload(key, content_type_for(filename), MAX_FILE_SIZE)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+    return jsonify({
+        "upload": upload,
+        "upload_token": issue_upload_token('cover_letter', current_user.id, key),
+        "expires_in": PRESIGNED_URL_EXPIRY,
+    }), 200
+
+@cover_letter_routes.route('/upload-complete', methods=['POST'])
+@login_required
+def complete_cover_letter_upload():
+    data = request.get_json() or {}
+    key = read_upload_token(data.get('upload_token'), 'cover_letter', current_user.id)
+    if key is None:
+        return jsonify({"error": "Invalid or expired upload token"}), 400
+
+    file_url = object_url(key)
+    # Completing the same upload twice returns the row the first call created
+    existing = CoverLetter.query.filter_by(user_id=current_user.id, file_url=file_url).first()
+    if existing:
+        return json_response({"message": "Cover letter uploaded", "cover_letter": existing.to_dict()})
+
+    existing_count = CoverLetter.query.filter_by(user_id=current_user.id).count()
+    if existing_count >= MAX_COVER_LETTERS_PER_USER:
+        return jsonify({"error": f"You can only upload up to {MAX_COVER_LETTERS_PER_USER} cover letters."}), 400
+
+    try:
+        size = stored_object_size(key)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    if size is None:
+        return jsonify({"error": "File has not been uploaded"}), 400
+    if size > MAX_FILE_SIZE:
+        # Only reachable with a store that doesn't enforce the POST policy
+        remove_file_from_s3(file_url)
+        return jsonify({"error": f"File size must be less than {MAX_FILE_SIZE // (1024 * 1024)}MB"}), 400
+
+    try:
+        file_hash, _ = read_direct_upload(file_url)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+    new_cover_letter = CoverLetter(
+        user_id=current_user.id,
+        file_url=file_url,
+        title=data.get('title'),
+        content_hash=file_hash
+    )
+    db.session.add(new_cover_letter)
+    db.session.commit()
+
+    return json_response({"message": "Cover letter uploaded", "cover_letter": new_cover_letter.to_dict()}, 201)
+
+@cover_letter_routes.route('/<int:cover_letter_id>/download-url', methods=['GET'])
+@login_required
+def get_cover_letter_download_url(cover_letter_id):
+    """Short-lived presigned URL the client downloads the file from directly"""
+    cover_letter = CoverLetter.query.get(cover_letter_id)
+    if not cover_letter or cover_letter.user_id != current_user.id:
+        return jsonify({"error": "Cover letter not found or no permission"}), 404
+
+    try:
+        url = presigned_download_url(cover_letter.file_url)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    if url is None:
+        return jsonify({"error": "File is not in storage"}), 500
+
+    return jsonify({"url": url, "expires_in": PRESIGNED_URL_EXPIRY}), 200
 
 @cover_letter_routes.route('/<int:cover_letter_id>', methods=['PUT'])
 @login_required
@@ -196,28 +299,37 @@ def update_cover_letter(cover_letter_id):
     if not cl or cl.user_id != current_user.id:
         return jsonify({"error": "Cover letter not found or no permission"}), 404
 
-    title = request.form.get('title')
+    try:
+        form, files = parse_upload(MAX_FILE_SIZE)
+    except FileTooLarge as e:
+        return jsonify({"error": str(e)}), 400
+
+    title = form.get('title')
     if title:
         cl.title = title
 
-    if 'file' in request.files:
-        file = request.files['file']
+    replaced_file = None
+    if 'file' in files:
+        file = files['file']
         if file.filename == '':
             return jsonify({"error": "No selected file"}), 400
         if not allowed_file(file.filename):
             return jsonify({"error": "File type not allowed. Only PDF and DOCX are supported."}), 400
-        if not file_size_within_limit(file):
-            return jsonify({"error": f"File size must be less than {MAX_FILE_SIZE // (1024 * 1024)}MB"}), 400
 
-        remove_file_from_s3(cl.file_url)
-        upload_result = upload_file_to_s3(file)
-        if 'url' not in upload_result:
-            return jsonify({"error": upload_result.get('errors', 'Upload failed')}), 500
+        file_hash = content_hash(file)
+        if file_hash != cl.content_hash:
+            upload_result = store_upload(file)
+            if 'url' not in upload_result:
+                return jsonify({"error": upload_result.get('errors', 'Upload failed')}), 500
 
-        cl.file_url = upload_result['url']
+            replaced_file = (cl.file_url, cl.content_hash)
+            cl.file_url = upload_result['url']
+            cl.content_hash = file_hash
 
     db.session.commit()
-    return jsonify({"message": "Cover letter updated", "cover_letter": cl.to_dict()}), 200
+    if replaced_file:
+        release_file(*replaced_file)
+    return json_response({"message": "Cover letter updated", "cover_letter": cl.to_dict()})
 
 @cover_letter_routes.route('/<int:cover_letter_id>', methods=['DELETE'])
 @login_required
@@ -227,9 +339,9 @@ def delete_cover_letter(cover_letter_id):
     if not cl or cl.user_id != current_user.id:
         return jsonify({"error": "Cover letter not found or no permission"}), 404
 
-    remove_file_from_s3(cl.file_url)
-
+    stored_file = (cl.file_url, cl.content_hash)
     db.session.delete(cl)
     db.session.commit()
+    release_file(*stored_file)
 
     return jsonify({"message": "Cover letter deleted"}), 200
@@ -0,0 +1,22 @@
+import sys
+
+# Under gevent workers gunicorn monkey-patches threading, so a thread is just
+# another greenlet and CPU-bound work (text extraction, embedding, building the
+# job index) would stall every open stream in the process until it finished.
+# run_cpu_bound hands such work to gevent's pool of real OS threads instead;
+# the calling greenlet waits and the event loop keeps serving the rest.
+
+
+def _on_event_loop():
+    if 'gevent' not in sys.modules:
+        return False
+    from gevent import monkey
+    return monkey.is_module_patched('threading')
+
+
+def run_cpu_bound(fn, *args):
+    """fn(*args), off the event loop when running under gevent. fn must not touch the database."""
+    if not _on_event_loop():
+        return fn(*args)
+    import gevent
+    return gevent.get_hub().threadpool.apply(fn, args)
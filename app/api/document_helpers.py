@@ -0,0 +1,44 @@
+import hashlib
+from io import BytesIO
+from .cpu_bound import run_cpu_bound
+
+
+def hash_bytes(file_bytes):
+    """SHA-256 hex digest used to tell whether a document's content changed"""
+    return hashlib.sha256(file_bytes).hexdigest()
+
+
+# fitz and docx are imported on first extraction rather than with the routes
+
+def extract_text_from_pdf_bytes(pdf_bytes, max_pages=3):
+    import fitz
+
+    text = ""
+    # A memoryview lets fitz read a memory-mapped file in place instead of copying it
+    with memoryview(pdf_bytes) as view, fitz.open(stream=view, filetype="pdf") as doc:
+        for page in doc[:max_pages]:
+            text += page.get_text()
+    return text
+
+
+def extract_text_from_docx_bytes(docx_bytes):
+    from docx import Document
+
+    doc = Document(BytesIO(docx_bytes))
+    full_text = []
+    for para in doc.paragraphs:
+        full_text.append(para.text)
+    return '\n'.join(full_text)
+
+
+def extract_text(file_bytes, ext):
+    """Extract plain text from a pdf/docx document (bytes or an mmap). Returns (text, error)."""
+    return run_cpu_bound(_extract_text, file_bytes, ext.lower())
+
+
+def _extract_text(file_bytes, ext):
+    if ext == 'pdf':
+        return extract_text_from_pdf_bytes(file_bytes), None
+    if ext == 'docx':
+        return extract_text_from_docx_bytes(file_bytes), None
+    return None, f"Unsupported file type: {ext}"
@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
 from flask_login import login_required, current_user
 from app.models import db, EducationExperience
+from .serialization import json_response
 from datetime import datetime
 
 education_routes = Blueprint('education_experiences', __name__)
@@ -23,14 +24,14 @@ def create_education_experience():
 
     db.session.add(edu)
     db.session.commit()
-    return jsonify(edu.to_dict()), 201
+    return json_response(edu.to_dict(), 201)
 
 
 @education_routes.route('/', methods=['GET'])
 @login_required
 def get_all_my_educations():
     educations = EducationExperience.query.filter_by(user_id=current_user.id).all()
-    return jsonify({'education_experiences': [e.to_dict() for e in educations]}), 200
+    return json_response({'education_experiences': [e.to_dict() for e in educations]})
 
 
 @education_routes.route('/<int:id>', methods=['GET'])
@@ -39,7 +40,7 @@ def get_education_by_id(id):
     edu = EducationExperience.query.get_or_404(id)
     if edu.user_id != current_user.id:
         return jsonify({'error': 'Unauthorized'}), 403
-    return jsonify(edu.to_dict()), 200
+    return json_response(edu.to_dict())
 
 
 @education_routes.route('/<int:id>', methods=['PUT'])
@@ -64,7 +65,7 @@ def update_education(id):
         edu.end_date = parse_date(data['end_date'])
 
     db.session.commit()
-    return jsonify(edu.to_dict()), 200
+    return json_response(edu.to_dict())
 
 
 @education_routes.route('/<int:id>', methods=['DELETE'])
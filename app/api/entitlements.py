@@ -0,0 +1,197 @@
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime, timezone
+from functools import wraps
+from flask import jsonify
+from flask_login import current_user
+from .membership_helper import get_membership
+from .ai_usage import AI_RATE_LIMIT, PERIODS, period_bounds, rate_limiter, usage_store
+
+# SubscriptionPlan.feature_flags is a JSON object keyed by feature name. Each
+# value is one of:
+#   true / false                        feature on or off, no quota
+#   10                                  on, at most 10 model calls per month
+#   {"enabled": true, "limit": 10, "period": "day", "rate_limit": 5}
+# rate_limit is requests per minute (AI_RATE_LIMIT when not set). Replies
+# served from the LLM cache don't count against the quota. Features a plan
+# doesn't mention are allowed without a quota. The AI endpoints check
+# resume_analysis, job_match, cover_letter and ai_chat.
+DEFAULT_PERIOD = 'month'
+# Flags applied to users without a valid membership
+FREE_PLAN_FLAGS = os.getenv('FREE_PLAN_FLAGS', '{}')
+MAX_COMPILED_PLANS = 256
+
+
+class Entitlement:
+    __slots__ = ('enabled', 'limit', 'period', 'rate_limit')
+
+    def __init__(self, enabled=True, limit=None, period=DEFAULT_PERIOD, rate_limit=None):
+        self.enabled = enabled
+        self.limit = limit
+        self.period = period
+        self.rate_limit = rate_limit if rate_limit is not None else AI_RATE_LIMIT
+
+
+UNLIMITED = Entitlement()
+
+
+def parse_entitlement(name, value):
+    """Entitlement for one flag value. Raises ValueError if it is malformed."""
+    if isinstance(value, bool):
+        return Entitlement(enabled=value)
+    if isinstance(value, int):
+        if value < 0:
+            raise ValueError(f"{name}: limit must not be negative")
+        return Entitlement(limit=value)
+    if isinstance(value, dict):
+        unknown = set(value) - {'enabled', 'limit', 'period', 'rate_limit'}
+        if unknown:
+            raise ValueError(f"{name}: unknown keys {', '.join(sorted(unknown))}")
+        enabled = value.get('enabled', True)
+        limit = value.get('limit')
+        period = value.get('period', DEFAULT_PERIOD)
+        rate_limit = value.get('rate_limit')
+        if not isinstance(enabled, bool):
+            raise ValueError(f"{name}: enabled must be true or false")
+        if limit is not None and (isinstance(limit, bool) or not isinstance(limit, int) or limit < 0):
+            raise ValueError(f"{name}: limit must be a non-negative integer")
+        if period not in PERIODS:
+            raise ValueError(f"{name}: period must be one of {', '.join(PERIODS)}")
+        if rate_limit is not None and (isinstance(rate_limit, bool) or not isinstance(rate_limit, int) or rate_limit < 1):
+            raise ValueError(f"{name}: rate_limit must be a positive integer")
+        return Entitlement(enabled, limit, period, rate_limit)
+    raise ValueError(f"{name}: expected true/false, a limit or an object")
+
+
+class Entitlements:
+    """A plan's feature flags compiled into an O(1) lookup table"""
+
+    def __init__(self, entitlements):
+        self.entitlements = entitlements
+
+    @classmethod
+    def compile(cls, raw):
+        """Compile a feature_flags value (JSON text or dict). Raises ValueError if it is malformed."""
+        if not raw:
+            return cls({})
+        flags = json.loads(raw) if isinstance(raw, str) else raw
+        if not isinstance(flags, dict):
+            raise ValueError("feature_flags must be a JSON object")
+        return cls({name: parse_entitlement(name, value) for name, value in flags.items()})
+
+    def get(self, feature):
+        return self.entitlements.get(feature, UNLIMITED)
+
+    def can(self, feature):
+        return self.get(feature).enabled
+
+    def to_dict(self):
+        return {name: {'enabled': e.enabled, 'limit': e.limit, 'period': e.period, 'rate_limit': e.rate_limit}
+                for name, e in self.entitlements.items()}
+
+
+def validate_feature_flags(raw):
+    """Normalised JSON text for a feature_flags value, or raise ValueError"""
+    if raw is None or raw == '':
+        return None
+    if isinstance(raw, str):
+        try:
+            raw = json.loads(raw)
+        except ValueError:
+            raise ValueError("feature_flags must be valid JSON")
+    Entitlements.compile(raw)
+    return json.dumps(raw, sort_keys=True)
+
+
+_compiled = {}
+_compiled_lock = threading.Lock()
+
+
+def compiled_entitlements(raw):
+    """
+    Entitlements for a feature_flags text, compiled once per distinct text (a
+    plan version). Flags that fail validation compile to no restrictions, as
+    they did before flags were enforced.
+    """
+    key = hashlib.sha1((raw or '').encode()).hexdigest()
+    entitlements = _compiled.get(key)
+    if entitlements is None:
+        try:
+            entitlements = Entitlements.compile(raw)
+        except ValueError:
+            entitlements = Entitlements({})
+        with _compiled_lock:
+            if len(_compiled) >= MAX_COMPILED_PLANS:
+                _compiled.clear()
+            _compiled[key] = entitlements
+    return entitlements
+
+
+def entitlements_for(user_id):
+    membership = get_membership(user_id)
+    raw = membership.plan_feature_flags if membership.is_valid else FREE_PLAN_FLAGS
+    return compiled_entitlements(raw)
+
+
+def too_many_requests(body, retry_after):
+    response = jsonify(dict(body, retry_after=retry_after))
+    response.headers['Retry-After'] = str(retry_after)
+    return response, 429
+
+
+def quota_reached(feature, entitlement):
+    _, period_end = period_bounds(entitlement.period)
+    retry_after = int((period_end - datetime.now(timezone.utc)).total_seconds()) + 1
+    return too_many_requests({
+        "error": f"{feature} quota reached",
+        "feature": feature,
+        "limit": entitlement.limit,
+        "period": entitlement.period,
+    }, retry_after)
+
+
+def remaining_quota(user_id, feature):
+    """
+    Model calls the user has left for `feature` this period, or None if it has
+    no quota. Endpoints that make several billed calls per request cap their
+    fan-out to this.
+    """
+    entitlement = entitlements_for(user_id).get(feature)
+    if entitlement.limit is None:
+        return None
+    return max(0, entitlement.limit - usage_store.used(user_id, feature, entitlement.period))
+
+
+def entitlement_required(feature):
+    """
+    Reject the request with 403 when the user's plan turns `feature` off, or
+    with 429 once its quota for the period is used up or the user goes over
+    the feature's rate limit. Both checks happen before the handler makes any
+    model call; the calls themselves are counted by UsageMeter. A handler that
+    makes more than one billed call must also cap them with remaining_quota().
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            user_id = current_user.id
+            entitlement = entitlements_for(user_id).get(feature)
+            if not entitlement.enabled:
+                return jsonify({"error": f"Your plan does not include {feature}", "feature": feature}), 403
+
+            if entitlement.limit is not None:
+                if usage_store.used(user_id, feature, entitlement.period) >= entitlement.limit:
+                    return quota_reached(feature, entitlement)
+
+            retry_after = rate_limiter.hit((user_id, feature), entitlement.rate_limit)
+            if retry_after:
+                return too_many_requests({
+                    "error": f"Too many {feature} requests",
+                    "feature": feature,
+                    "rate_limit": entitlement.rate_limit,
+                }, retry_after)
+
+            return f(*args, **kwargs)
+        return decorated_function
+    return decorator
@@ -0,0 +1,48 @@
+from flask import Blueprint, abort, request, send_from_directory
+from .aws_helpers import CONTENT_TYPES
+from .storage import storage
+from .upload_helper import MAX_FILE_SIZE, FileTooLarge, parse_upload
+
+file_routes = Blueprint('files', __name__)
+
+
+@file_routes.route('/<path:key>', methods=['GET'])
+def get_file(key):
+    """
+    Serve a file stored with STORAGE_BACKEND=local, mounted at LOCAL_STORAGE_URL.
+    Needs the signed token from a /<id>/download-url response; it expires
+    after S3_PRESIGNED_URL_EXPIRY seconds.
+    """
+    if storage.name != 'local' or key.startswith('.'):
+        abort(404)
+    if not storage.verify_download(key, request.args.get('token')):
+        abort(403)
+    ext = key.rsplit('.', 1)[-1].lower()
+    return send_from_directory(storage.root, key, mimetype=CONTENT_TYPES.get(ext))
+
+
+@file_routes.route('/<path:key>', methods=['POST'])
+def upload_file(key):
+    """
+    Direct upload target for STORAGE_BACKEND=local: the form from an
+    /upload-url response, with the file in a `file` part. Like S3 it answers
+    204 and enforces the signed content type and size limit.
+    """
+    if storage.name != 'local' or key.startswith('.'):
+        abort(404)
+    try:
+        form, files = parse_upload(MAX_FILE_SIZE)
+    except FileTooLarge as e:
+        return {'error': str(e)}, 400
+    claims = storage.verify_upload(key, form.get('token'))
+    if claims is None:
+        abort(403)
+    if form.get('Content-Type') != claims['content_type']:
+        return {'error': 'Content-Type does not match the upload policy'}, 400
+    file = files.get('file')
+    if file is None:
+        return {'error': 'No file part'}, 400
+    if not 1 <= file.stream.size <= claims['max_size']:
+        return {'error': 'File size is outside the upload policy'}, 400
+    storage.save(file.stream, key, claims['content_type'])
+    return '', 204
@@ -0,0 +1,84 @@
+from sqlalchemy import and_, case, func, or_
+from app.models import db, Conversation, Message, User
+from .serialization import MESSAGE_SCHEMA
+
+
+def visible_conversations_filter(user_id):
+    """Conversations the user is in and hasn't deleted"""
+    return or_(
+        and_(Conversation.user_1_id == user_id, Conversation.deleted_by_user_1.is_(False)),
+        and_(Conversation.user_2_id == user_id, Conversation.deleted_by_user_2.is_(False)),
+    )
+
+
+def inbox_query(user_id):
+    """
+    One query returning, per visible conversation, the conversation, the other
+    participant, the latest message (picked with row_number over the messages
+    of the user's conversations) and the user's unread count. Rows are
+    (Conversation.id, Conversation.created_at, other user columns...,
+    latest message columns..., unread_count, activity), where activity is the
+    latest message time, or the creation time for an empty conversation.
+    """
+    mine = db.select(Conversation.id).where(visible_conversations_filter(user_id))
+
+    ranked = db.session.query(
+        Message.conversation_id,
+        Message.id,
+        Message.sender_id,
+        MESSAGE_SCHEMA.columns['message_body'].label('message_body'),
+        Message.sent_at,
+        Message.read_at,
+        Message.is_recalled,
+        func.row_number().over(
+            partition_by=Message.conversation_id,
+            order_by=(Message.sent_at.desc(), Message.id.desc())
+        ).label('position'),
+    ).filter(Message.conversation_id.in_(mine)).subquery()
+
+    unread = db.session.query(
+        Message.conversation_id,
+        func.count().label('unread_count'),
+    ).filter(
+        Message.conversation_id.in_(mine),
+        Message.sender_id != user_id,
+        Message.read_at.is_(None),
+    ).group_by(Message.conversation_id).subquery()
+
+    other_user_id = case((Conversation.user_1_id == user_id, Conversation.user_2_id), else_=Conversation.user_1_id)
+    activity = func.coalesce(ranked.c.sent_at, Conversation.created_at)
+
+    query = db.session.query(
+        Conversation.id,
+        Conversation.created_at,
+        User.id, User.username, User.avatar_url, User.role,
+        ranked.c.id, ranked.c.sender_id, ranked.c.message_body, ranked.c.sent_at, ranked.c.read_at,
+        ranked.c.is_recalled,
+        func.coalesce(unread.c.unread_count, 0),
+        activity.label('activity'),
+    ).select_from(Conversation) \
+        .join(User, User.id == other_user_id) \
+        .outerjoin(ranked, and_(ranked.c.conversation_id == Conversation.id, ranked.c.position == 1)) \
+        .outerjoin(unread, unread.c.conversation_id == Conversation.id) \
+        .filter(visible_conversations_filter(user_id))
+    return query, activity
+
+
+def serialize_inbox_row(row):
+    (conversation_id, created_at, other_id, username, avatar_url, role,
+     message_id, sender_id, message_body, sent_at, read_at, is_recalled, unread_count, _) = row
+    return {
+        'id': conversation_id,
+        'created_at': created_at,
+        'other_user': {'id': other_id, 'username': username, 'avatar_url': avatar_url, 'role': role},
+        'last_message': {
+            'id': message_id,
+            'conversation_id': conversation_id,
+            'sender_id': sender_id,
+            'message_body': message_body,
+            'sent_at': sent_at,
+            'read_at': read_at,
+            'is_recalled': is_recalled,
+        } if message_id is not None else None,
+        'unread_count': unread_count,
+    }
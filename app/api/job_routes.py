@@ -1,9 +1,58 @@
 from flask import Blueprint, request, jsonify
 from flask_login import login_required, current_user
+from sqlalchemy.orm import joinedload
 from app.models import db, Job
+from .pagination_helper import get_page_size, encode_cursor, decode_cursor, keyset_before
+from .job_search_helper import ranked_job_ids_query
+from .serialization import JOB_SCHEMA, requested_fields, json_response
 
 job_routes = Blueprint('jobs', __name__)
 
+BOOLEAN_FILTERS = ['is_remote', 'offer_visa_sponsorship']
+
+
+def parse_bool(value):
+    if value.lower() in ('true', '1', 'yes'):
+        return True
+    if value.lower() in ('false', '0', 'no'):
+        return False
+    raise ValueError(f"Invalid boolean value: {value}")
+
+
+def apply_job_filters(query, args):
+    """Apply the job search filters in args (request.args or a dict) to a Job query.
+    Raises ValueError for malformed filter values."""
+    if args.get('location'):
+        query = query.filter(Job.location.ilike(f"%{args['location']}%"))
+
+    for field in BOOLEAN_FILTERS:
+        if args.get(field) not in (None, ''):
+            value = args[field]
+            if not isinstance(value, bool):
+                value = parse_bool(str(value))
+            query = query.filter(getattr(Job, field) == value)
+
+    if args.get('job_type'):
+        query = query.filter(Job.job_type == args['job_type'])
+
+    if args.get('status'):
+        query = query.filter(Job.status == args['status'])
+
+    try:
+        if args.get('company_id') not in (None, ''):
+            query = query.filter(Job.company_id == int(args['company_id']))
+
+        # Salary filters match jobs whose advertised range overlaps the requested one
+        if args.get('salary_min') not in (None, ''):
+            query = query.filter(Job.salary_max >= int(args['salary_min']))
+        if args.get('salary_max') not in (None, ''):
+            query = query.filter(Job.salary_min <= int(args['salary_max']))
+    except (TypeError, ValueError):
+        raise ValueError('company_id, salary_min and salary_max must be integers')
+
+    return query
+
+
 # Create a job 
 @job_routes.route('/', methods=['POST'])
 @login_required
@@ -32,22 +81,77 @@ def create_job():
 
     db.session.add(job)
     db.session.commit()
+    from .semantic_matcher import index_job  # imported here so read-only routes don't load numpy
+    index_job(job)
 
-    return jsonify(job.to_dict()), 201
+    return json_response(job.to_dict(), 201)
 
 
-# Get all jobs
+# Get jobs, newest first, filtered and keyset-paginated on (created_at, id)
 @job_routes.route('/', methods=['GET'])
 def get_jobs():
-    jobs = Job.query.all()
-    return jsonify({'jobs': [job.to_dict() for job in jobs]}), 200
+    limit = get_page_size(request.args.get('limit'))
+
+    try:
+        fields = JOB_SCHEMA.resolve(requested_fields())
+        # The keyset columns ride along after the serialized ones
+        query = JOB_SCHEMA.query(fields).add_columns(Job.created_at, Job.id)
+        query = apply_job_filters(query, request.args)
+        if request.args.get('cursor'):
+            cursor = decode_cursor(request.args['cursor'])
+            query = query.filter(keyset_before(Job.created_at, Job.id, cursor))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    # Fetch one extra row to know whether another page exists
+    rows = query.order_by(Job.created_at.desc(), Job.id.desc()).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = encode_cursor(rows[-1][-2], rows[-1][-1]) if has_more else None
+
+    return json_response({'jobs': JOB_SCHEMA.serialize_rows(rows, fields), 'next_cursor': next_cursor})
+
+
+# Ranked keyword search over title, description and skills
+@job_routes.route('/search', methods=['GET'])
+def search_jobs():
+    limit = get_page_size(request.args.get('limit'))
+    try:
+        offset = max(0, int(request.args.get('offset', 0)))
+    except ValueError:
+        return jsonify({'error': 'offset must be an integer'}), 400
+
+    query = ranked_job_ids_query(request.args.get('q', ''))
+    if query is None:
+        return jsonify({'error': 'Search query is required'}), 400
+
+    try:
+        fields = JOB_SCHEMA.resolve(requested_fields())
+        query = apply_job_filters(query, request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    ranked_ids = [job_id for job_id, _ in query.limit(limit + 1).offset(offset).all()]
+    has_more = len(ranked_ids) > limit
+    ranked_ids = ranked_ids[:limit]
+
+    serialize = JOB_SCHEMA.serializer(fields)
+    jobs_by_id = {
+        row[-1]: serialize(row)
+        for row in JOB_SCHEMA.query(fields).add_columns(Job.id).filter(Job.id.in_(ranked_ids)).all()
+    } if ranked_ids else {}
+
+    return json_response({
+        'jobs': [jobs_by_id[job_id] for job_id in ranked_ids if job_id in jobs_by_id],
+        'next_offset': offset + limit if has_more else None
+    })
 
 
 # Get a single job by id
 @job_routes.route('/<int:id>', methods=['GET'])
 def get_job(id):
-    job = Job.query.get_or_404(id)
-    return jsonify(job.to_dict()), 200
+    job = Job.query.options(joinedload(Job.company)).get_or_404(id)
+    return json_response(job.to_dict())
 
 
 # Update a job
@@ -71,7 +175,9 @@ def update_job(id):
             setattr(job, field, data[field])
 
     db.session.commit()
-    return jsonify(job.to_dict()), 200
+    from .semantic_matcher import index_job
+    index_job(job)
+    return json_response(job.to_dict())
 
 
 # Delete a job
@@ -85,5 +191,7 @@ def delete_job(id):
 
     db.session.delete(job)
     db.session.commit()
+    from .semantic_matcher import unindex_job
+    unindex_job(id)
 
     return jsonify({'message': 'Job deleted successfully'}), 200
@@ -0,0 +1,46 @@
+import re
+from sqlalchemy import func, literal_column, table, column
+from app.models import db, Job
+
+MAX_QUERY_TERMS = 16
+MAX_QUERY_LENGTH = 500
+
+# FTS5 bm25 column weights, in jobs_fts column order: title, description, skills
+BM25_WEIGHTS = (10.0, 1.0, 5.0)
+
+jobs_fts = table('jobs_fts', column('rowid'))
+
+
+def search_terms(text):
+    return re.findall(r'\w+', text.lower())[:MAX_QUERY_TERMS]
+
+
+def fts5_match_expression(terms):
+    """Quote each term so user input can't inject FTS5 operators; the last
+    term is a prefix match so partial words still find results."""
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+
+def ranked_job_ids_query(text):
+    """Return a query of (job id, rank) matching the search text, ordered best first,
+    or None when the text has no searchable terms."""
+    terms = search_terms(text)
+    if not terms:
+        return None
+
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        ts_query = func.websearch_to_tsquery('english', text[:MAX_QUERY_LENGTH])
+        search_vector = literal_column(f'{Job.__table__.fullname}.search_vector')
+        rank = func.ts_rank_cd(search_vector, ts_query).label('rank')
+        return db.session.query(Job.id, rank) \
+            .filter(search_vector.op('@@')(ts_query)) \
+            .order_by(rank.desc(), Job.id.desc())
+
+    rank = func.bm25(literal_column('jobs_fts'), *BM25_WEIGHTS).label('rank')
+    return db.session.query(Job.id, rank) \
+        .join(jobs_fts, jobs_fts.c.rowid == Job.id) \
+        .filter(literal_column('jobs_fts').op('MATCH')(fts5_match_expression(terms))) \
+        .order_by(rank.asc(), Job.id.desc())
@@ -0,0 +1,220 @@
+import hashlib
+import json
+import logging
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from app.models import db, LLMCacheEntry
+from .membership_helper import as_utc
+
+logger = logging.getLogger(__name__)
+
+LLM_CACHE_BACKEND = os.getenv('LLM_CACHE_BACKEND', 'tiered')  # tiered, memory, database or none
+LLM_CACHE_TTL = int(os.getenv('LLM_CACHE_TTL', 24 * 60 * 60))  # seconds
+LLM_CACHE_MAX_ENTRIES = int(os.getenv('LLM_CACHE_MAX_ENTRIES', 1000))  # per process
+LLM_CACHE_MAX_DB_ENTRIES = int(os.getenv('LLM_CACHE_MAX_DB_ENTRIES', 50000))
+DB_PRUNE_PROBABILITY = 0.01  # fraction of writes that also prune the shared table
+
+_stats = {"hits": 0, "memory_hits": 0, "database_hits": 0, "misses": 0, "sets": 0, "evictions": 0}
+_stats_lock = threading.Lock()
+
+
+def _count(*names):
+    with _stats_lock:
+        for name in names:
+            _stats[name] += 1
+
+
+def cache_stats():
+    with _stats_lock:
+        return dict(_stats)
+
+
+def cache_key(model, temperature, messages):
+    payload = json.dumps([model, temperature, messages], sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class MemoryCache:
+    """Per-process LRU with a TTL on every entry"""
+    name = 'memory'
+
+    def __init__(self, max_entries=LLM_CACHE_MAX_ENTRIES, ttl=LLM_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        entry = self.get_entry(key)
+        return entry[0] if entry else None
+
+    def get_entry(self, key):
+        """(value, expires_at as a Unix time), or None on a miss"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.time():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value, expires_at
+
+    def set(self, key, value, expires_at=None):
+        if expires_at is None:
+            expires_at = time.time() + self.ttl
+        with self.lock:
+            self.entries[key] = (expires_at, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                _count('evictions')
+
+
+class DatabaseCache:
+    """Cache table shared by every worker. Uses its own connection so cache
+    writes never commit or roll back the caller's session."""
+    name = 'database'
+
+    def __init__(self, max_entries=LLM_CACHE_MAX_DB_ENTRIES, ttl=LLM_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.table = LLMCacheEntry.__table__
+
+    def get(self, key):
+        entry = self.get_entry(key)
+        return entry[0] if entry else None
+
+    def get_entry(self, key):
+        """(value, expires_at as a Unix time), or None on a miss"""
+        try:
+            with db.engine.connect() as conn:
+                row = conn.execute(
+                    db.select(self.table.c.response, self.table.c.expires_at).where(
+                        self.table.c.key == key,
+                        self.table.c.expires_at > datetime.now(timezone.utc)
+                    )
+                ).first()
+        except SQLAlchemyError:
+            # A cache that can't be read is a miss, never a failed request
+            return None
+        if row is None:
+            return None
+        return row.response, as_utc(row.expires_at).timestamp()
+
+    def set(self, key, value, expires_at=None):
+        if expires_at is None:
+            expires_at = datetime.now(timezone.utc) + timedelta(seconds=self.ttl)
+        else:
+            expires_at = datetime.fromtimestamp(expires_at, timezone.utc)
+        try:
+            with db.engine.begin() as conn:
+                updated = conn.execute(
+                    self.table.update().where(self.table.c.key == key)
+                    .values(response=value, expires_at=expires_at)
+                ).rowcount
+                if not updated:
+                    conn.execute(self.table.insert().values(key=key, response=value, expires_at=expires_at))
+        except IntegrityError:
+            # Another worker stored the same key first
+            pass
+        except SQLAlchemyError:
+            return
+        if random.random() < DB_PRUNE_PROBABILITY:
+            self.prune()
+
+    def prune(self):
+        # Runs inside set(), so a failure is logged rather than failing the request;
+        # engine.begin() has already rolled the transaction back by then
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(self.table.delete().where(self.table.c.expires_at <= datetime.now(timezone.utc)))
+                overflow = conn.execute(db.select(db.func.count()).select_from(self.table)).scalar() - self.max_entries
+                if overflow > 0:
+                    oldest = db.select(self.table.c.key).order_by(self.table.c.expires_at).limit(overflow)
+                    conn.execute(self.table.delete().where(self.table.c.key.in_(oldest.scalar_subquery())))
+        except SQLAlchemyError:
+            logger.exception("Pruning the LLM cache table failed")
+            return
+        if overflow > 0:
+            with _stats_lock:
+                _stats['evictions'] += overflow
+
+
+class TieredCache:
+    """
+    Checks each backend in order; a hit in a later tier is copied into the
+    earlier ones with the time it has left, so it never outlives the original.
+    """
+    name = 'tiered'
+
+    def __init__(self, *tiers):
+        self.tiers = tiers
+
+    def get(self, key):
+        for position, tier in enumerate(self.tiers):
+            entry = tier.get_entry(key)
+            if entry is not None:
+                value, expires_at = entry
+                _count(f'{tier.name}_hits')
+                for earlier in self.tiers[:position]:
+                    earlier.set(key, value, expires_at)
+                return value
+        return None
+
+    def set(self, key, value):
+        for tier in self.tiers:
+            tier.set(key, value)
+
+
+def make_cache(backend):
+    if backend == 'memory':
+        return TieredCache(MemoryCache())
+    if backend == 'database':
+        return TieredCache(DatabaseCache())
+    if backend == 'tiered':
+        return TieredCache(MemoryCache(), DatabaseCache())
+    return None
+
+
+cache = make_cache(LLM_CACHE_BACKEND)
+
+
+def cached_chat_completion(client, model, messages, temperature, validate=None, meter=None):
+    """
+    Run a chat completion, reusing a previous response for the exact same
+    (model, temperature, messages). A response is only stored when
+    validate(content) is truthy, so malformed replies are not replayed.
+    Cache hits and model calls are recorded on `meter` (a UsageMeter) if given.
+    Returns (content, cache_hit).
+    """
+    started = time.perf_counter()
+    key = cache_key(model, temperature, messages)
+    if cache is not None:
+        content = cache.get(key)
+        if content is not None:
+            _count('hits')
+            if meter is not None:
+                meter.record(model, time.perf_counter() - started, cache_hit=True)
+            return content, True
+        _count('misses')
+
+    response = client.chat.completions.create(
+        model=model,
+        messages=messages,
+        temperature=temperature,
+    )
+    if meter is not None:
+        meter.record(model, time.perf_counter() - started, response.usage)
+    content = response.choices[0].message.content
+
+    if cache is not None and (validate is None or validate(content)):
+        cache.set(key, content)
+        _count('sets')
+    return content, False
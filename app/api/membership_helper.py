@@ -1,8 +1,147 @@
+import os
+import threading
+import time
+from datetime import datetime, timezone
 from functools import wraps
-from flask import jsonify
+from flask import jsonify, g, has_request_context
 from flask_login import current_user
-from app.models import UserSubscription
-from sqlalchemy.sql import func
+from sqlalchemy import event
+from sqlalchemy.orm import Session, joinedload, object_session
+from app.models import UserSubscription, SubscriptionPlan
+
+# Other workers only see a subscription change once their copy expires, so keep this short
+MEMBERSHIP_CACHE_TTL = float(os.getenv('MEMBERSHIP_CACHE_TTL', 60))  # seconds
+
+
+def as_utc(value):
+    # SQLite hands back naive datetimes; everything is stored in UTC
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+class Membership:
+    """A user's subscription, detached from the session so it can be cached across requests"""
+
+    def __init__(self, user_id, subscription=None):
+        self.user_id = user_id
+        self.subscription_id = subscription.id if subscription else None
+        self.plan_id = subscription.plan_id if subscription else None
+        self.plan_name = subscription.plan.name if subscription else None
+        self.plan_feature_flags = subscription.plan.feature_flags if subscription else None
+        self.end_date = as_utc(subscription.end_date) if subscription else None
+        self.trial_end_date = as_utc(subscription.trial_end_date) if subscription else None
+
+    def status(self, now=None):
+        """'none', 'expired', 'trialing' or 'active', evaluated at `now`"""
+        if self.subscription_id is None:
+            return 'none'
+        now = now or datetime.now(timezone.utc)
+        if self.end_date is not None and self.end_date <= now:
+            return 'expired'
+        if self.trial_end_date is not None and now < self.trial_end_date:
+            return 'trialing'
+        return 'active'
+
+    @property
+    def is_valid(self):
+        return self.status() in ('active', 'trialing')
+
+
+class MembershipCache:
+    def __init__(self, ttl=MEMBERSHIP_CACHE_TTL):
+        self.ttl = ttl
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    def get(self, user_id):
+        with self.lock:
+            entry = self.entries.get(user_id)
+        if entry is None or entry[0] < time.monotonic():
+            return None
+        return entry[1]
+
+    def set(self, user_id, membership):
+        with self.lock:
+            self.entries[user_id] = (time.monotonic() + self.ttl, membership)
+
+    def invalidate(self, user_id=None):
+        with self.lock:
+            if user_id is None:
+                self.entries.clear()
+            else:
+                self.entries.pop(user_id, None)
+
+
+cache = MembershipCache()
+
+
+def load_membership(user_id):
+    subscription = UserSubscription.query.options(joinedload(UserSubscription.plan)) \
+        .filter_by(user_id=user_id, is_active=True).first()
+    return Membership(user_id, subscription)
+
+
+def get_membership(user_id):
+    """
+    The user's membership, from the per-request memo, then the process cache,
+    then the database.
+    """
+    memo = g.setdefault('memberships', {}) if has_request_context() else {}
+    membership = memo.get(user_id)
+    if membership is None:
+        membership = cache.get(user_id)
+        if membership is None:
+            membership = load_membership(user_id)
+            cache.set(user_id, membership)
+        memo[user_id] = membership
+    return membership
+
+
+# Subscription and plan changes are collected during flush and only evict
+# cached memberships once committed, so a concurrent request can't re-cache
+# the old row between the flush and the commit.
+PENDING_KEY = 'membership_invalidations'
+
+
+def _queue_invalidation(target, user_id):
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(PENDING_KEY, set()).add(user_id)
+
+
+@event.listens_for(UserSubscription, 'after_insert')
+@event.listens_for(UserSubscription, 'after_update')
+@event.listens_for(UserSubscription, 'after_delete')
+def _subscription_changed(mapper, connection, target):
+    _queue_invalidation(target, target.user_id)
+
+
+@event.listens_for(SubscriptionPlan, 'after_update')
+@event.listens_for(SubscriptionPlan, 'after_delete')
+def _plan_changed(mapper, connection, target):
+    _queue_invalidation(target, None)  # None clears every user
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_invalidations(session):
+    pending = session.info.pop(PENDING_KEY, None)
+    if not pending:
+        return
+    memo = g.get('memberships') if has_request_context() else None
+    for user_id in pending:
+        cache.invalidate(user_id)
+        if memo is not None:
+            if user_id is None:
+                memo.clear()
+            else:
+                memo.pop(user_id, None)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_invalidations(session, previous_transaction):
+    session.info.pop(PENDING_KEY, None)
+
 
 def member_required(f):
     @wraps(f)
@@ -10,16 +149,13 @@ def member_required(f):
         if not current_user.is_authenticated:
             return jsonify({"error": "Authentication required"}), 401
 
-        subscription = UserSubscription.query.filter_by(
-            user_id=current_user.id,
-            is_active=True
-        ).first()
-
-        if not subscription:
+        membership = get_membership(current_user.id)
+        status = membership.status()
+        if status == 'none':
             return jsonify({"error": "Membership required"}), 403
-
-        if subscription.end_date and subscription.end_date < func.now():
+        if status == 'expired':
             return jsonify({"error": "Membership expired"}), 403
 
+        g.membership = membership
         return f(*args, **kwargs)
     return decorated_function
@@ -0,0 +1,203 @@
+import json
+import logging
+import os
+import queue
+import select
+import threading
+import time
+from contextlib import contextmanager
+from sqlalchemy import text
+from app.models import db
+from .serialization import dumps
+
+logger = logging.getLogger(__name__)
+
+# 'local' delivers within this process only; 'postgres' relays every event
+# through LISTEN/NOTIFY so subscribers connected to any worker receive it.
+MESSAGE_EVENTS_BACKEND = os.getenv('MESSAGE_EVENTS_BACKEND', 'local')
+SUBSCRIBER_QUEUE_SIZE = 100  # events buffered per connection before it is told to resync
+NOTIFY_CHANNEL = 'jobhatch_message_events'
+NOTIFY_MAX_BYTES = 7900  # Postgres rejects NOTIFY payloads of 8000 bytes or more
+LISTEN_POLL_INTERVAL = 5  # seconds between checks that the listener connection is alive
+
+
+class Subscription:
+    def __init__(self, channel):
+        self.channel = channel
+        self.events = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+
+    def put(self, event):
+        try:
+            self.events.put_nowait(event)
+        except queue.Full:
+            # A consumer this far behind has missed events either way; drop the
+            # backlog and tell it to catch up through the messages ?since= sync
+            while True:
+                try:
+                    self.events.get_nowait()
+                except queue.Empty:
+                    break
+            self.events.put_nowait({'type': 'resync'})
+
+    def get(self, timeout):
+        """Next event, or None after `timeout` seconds without one"""
+        try:
+            return self.events.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class LocalBroker:
+    """In-process fan-out from a channel to every subscription on it"""
+
+    def __init__(self):
+        self.subscriptions = {}
+        self.lock = threading.Lock()
+
+    def subscribe(self, channel):
+        subscription = Subscription(channel)
+        with self.lock:
+            self.subscriptions.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            subscribers = self.subscriptions.get(subscription.channel)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self.subscriptions[subscription.channel]
+
+    def deliver(self, channel, event):
+        with self.lock:
+            subscribers = list(self.subscriptions.get(channel, ()))
+        for subscription in subscribers:
+            subscription.put(event)
+
+    def broadcast(self, event):
+        with self.lock:
+            subscribers = [s for subscribers in self.subscriptions.values() for s in subscribers]
+        for subscription in subscribers:
+            subscription.put(event)
+
+    def connection_count(self):
+        with self.lock:
+            return sum(len(subscribers) for subscribers in self.subscriptions.values())
+
+
+class LocalBackend:
+    name = 'local'
+
+    def __init__(self, broker):
+        self.broker = broker
+
+    def start(self, app):
+        pass
+
+    def publish(self, channel, event):
+        self.broker.deliver(channel, event)
+
+
+class PostgresBackend:
+    """
+    Publishes with pg_notify and runs one LISTEN connection per process that
+    hands every notification to the local broker, so an event reaches
+    subscribers on all workers, including the publishing one.
+    """
+    name = 'postgres'
+
+    def __init__(self, broker):
+        self.broker = broker
+        self.app = None
+        self.lock = threading.Lock()
+
+    def start(self, app):
+        with self.lock:
+            if self.app is not None:
+                return
+            self.app = app
+        threading.Thread(target=self.listen, name='message-events-listener', daemon=True).start()
+
+    def publish(self, channel, event):
+        payload = dumps({'channel': channel, 'event': event})
+        if len(payload.encode()) > NOTIFY_MAX_BYTES:
+            # Too big to relay; subscribers fetch the change through ?since= instead
+            payload = dumps({'channel': channel, 'event': {
+                'type': 'resync', 'conversation_id': event.get('conversation_id'),
+            }})
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(text('SELECT pg_notify(:channel, :payload)'), {'channel': NOTIFY_CHANNEL, 'payload': payload})
+        except Exception:
+            # The write already committed; clients still see it on their next sync
+            logger.exception("Failed to publish message event")
+
+    def listen(self):
+        connected_before = False
+        while True:
+            dbapi_connection = None
+            try:
+                with self.app.app_context():
+                    connection = db.engine.raw_connection()
+                    connection.detach()  # held for the life of the process, keep it out of the pool
+                dbapi_connection = connection.dbapi_connection
+                dbapi_connection.autocommit = True
+                with dbapi_connection.cursor() as cursor:
+                    cursor.execute(f'LISTEN {NOTIFY_CHANNEL}')
+                if connected_before:
+                    # Notifications sent while reconnecting are gone
+                    self.broker.broadcast({'type': 'resync'})
+                connected_before = True
+                while True:
+                    if select.select([dbapi_connection], [], [], LISTEN_POLL_INTERVAL) == ([], [], []):
+                        continue
+                    dbapi_connection.poll()
+                    while dbapi_connection.notifies:
+                        notification = dbapi_connection.notifies.pop(0)
+                        message = json.loads(notification.payload)
+                        self.broker.deliver(message['channel'], message['event'])
+            except Exception:
+                logger.exception("Message event listener lost its connection, reconnecting")
+                if dbapi_connection is not None:
+                    try:
+                        dbapi_connection.close()
+                    except Exception:
+                        pass
+                time.sleep(LISTEN_POLL_INTERVAL)
+
+
+def make_backend(name, broker):
+    if name == 'postgres':
+        return PostgresBackend(broker)
+    return LocalBackend(broker)
+
+
+broker = LocalBroker()
+backend = make_backend(MESSAGE_EVENTS_BACKEND, broker)
+
+
+def user_channel(user_id):
+    return f'user:{user_id}'
+
+
+def publish_to_users(user_ids, event):
+    for user_id in set(user_ids):
+        backend.publish(user_channel(user_id), event)
+
+
+def publish_message_event(event_type, conversation, message=None, **extra):
+    """Send an event about a conversation to both of its participants"""
+    event = {'type': event_type, 'conversation_id': conversation.id, **extra}
+    if message is not None:
+        event['message'] = message.to_dict()
+    publish_to_users([conversation.user_1_id, conversation.user_2_id], event)
+
+
+@contextmanager
+def subscribe(app, user_id):
+    backend.start(app)
+    subscription = broker.subscribe(user_channel(user_id))
+    try:
+        yield subscription
+    finally:
+        broker.unsubscribe(subscription)
@@ -1,10 +1,51 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, Response, current_app
 from flask_login import login_required, current_user
 from app.models import db, Message, Conversation
 from sqlalchemy.sql import func
+from .message_events import subscribe, publish_message_event
+from .serialization import dumps, json_response
+import os
+import time
 
 message_routes = Blueprint('messages', __name__)
 
+KEEPALIVE_INTERVAL = 15  # seconds between comments that keep idle proxies from closing the stream
+# Streams end after this long and EventSource reconnects; must stay under the
+# platform's request limit on Vercel
+MESSAGE_STREAM_TIMEOUT = int(os.getenv('MESSAGE_STREAM_TIMEOUT', 25 if os.getenv('VERCEL') else 300))
+
+
+@message_routes.route('/events', methods=['GET'])
+@login_required
+def message_events():
+    """
+    Server-sent events for every conversation the current user is in:
+    message.created, message.edited, message.recalled and message.read, each
+    carrying the conversation_id and the message, and conversation.read when
+    messages are marked read in bulk. A 'resync' event means
+    events were dropped and the client should catch up with
+    GET /conversations/<id>/messages?since=<sync_cursor>.
+    """
+    app = current_app._get_current_object()
+    user_id = current_user.id
+
+    def generate():
+        with subscribe(app, user_id) as subscription:
+            yield f"retry: 3000\nevent: ready\ndata: {{}}\n\n"
+            deadline = time.monotonic() + MESSAGE_STREAM_TIMEOUT
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                event = subscription.get(min(KEEPALIVE_INTERVAL, remaining))
+                if event is None:
+                    yield ": keepalive\n\n"
+                else:
+                    yield f"event: {event['type']}\ndata: {dumps(event)}\n\n"
+
+    return Response(generate(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @message_routes.route('/', methods=['POST'])
 @login_required
 def send_message():
@@ -27,8 +68,9 @@ def send_message():
     )
     db.session.add(message)
     db.session.commit()
+    publish_message_event('message.created', conversation, message)
 
-    return jsonify(message.to_dict())
+    return json_response(message.to_dict())
 
 @message_routes.route('/<int:message_id>/read', methods=['PATCH'])
 @login_required
@@ -40,7 +82,8 @@ def mark_message_read(message_id):
 
     message.read_at = func.now()
     db.session.commit()
-    return jsonify(message.to_dict())
+    publish_message_event('message.read', conversation, message)
+    return json_response(message.to_dict())
 
 @message_routes.route('/<int:message_id>/recall', methods=['PATCH'])
 @login_required
@@ -56,7 +99,8 @@ def recall_message(message_id):
 
     message.is_recalled = True
     db.session.commit()
-    return jsonify(message.to_dict())
+    publish_message_event('message.recalled', conversation, message)
+    return json_response(message.to_dict())
 
 @message_routes.route('/<int:message_id>/edit', methods=['PATCH'])
 @login_required
@@ -76,4 +120,5 @@ def edit_message(message_id):
     message.message_body = new_body
     message.edited_at = func.now()
     db.session.commit()
-    return jsonify(message.to_dict())
+    publish_message_event('message.edited', message.conversation, message)
+    return json_response(message.to_dict())
@@ -0,0 +1,32 @@
+import hmac
+import os
+from flask import Blueprint, abort, request
+from app.models.db import pool_stats
+from .llm_cache import cache_stats
+from .s3_client import s3_stats
+from .serialization import json_response
+
+metrics_routes = Blueprint('metrics', __name__)
+
+# Bearer token for the metrics endpoint; it is disabled while unset
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+
+
+@metrics_routes.route('', methods=['GET'])
+def get_metrics():
+    """
+    Counters of the worker process that serves the request: database pool
+    checkouts, S3 calls and the LLM cache. Each worker keeps its own; `pid`
+    tells them apart.
+    """
+    if not METRICS_TOKEN:
+        abort(404)
+    supplied = request.headers.get('Authorization', '')
+    if not hmac.compare_digest(supplied.encode(), f"Bearer {METRICS_TOKEN}".encode()):
+        abort(401)
+    return json_response({
+        'pid': os.getpid(),
+        'db_pool': pool_stats(),
+        's3': s3_stats(),
+        'llm_cache': cache_stats(),
+    })
@@ -0,0 +1,15 @@
+import os
+import threading
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_openai_client():
+    """The process-wide OpenAI client, created on first use so routes that never call the model don't import openai"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            from openai import OpenAI
+            _client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+        return _client
@@ -0,0 +1,64 @@
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import and_, or_, func
+from app.models import db
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def get_page_size(value, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    """Parse a ?limit= value, clamped to [1, maximum]"""
+    try:
+        size = int(value)
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(size, maximum))
+
+
+def encode_cursor(timestamp, row_id):
+    """Encode a (timestamp, id) keyset position as an opaque url-safe token"""
+    payload = json.dumps([timestamp.isoformat() if timestamp else None, row_id])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Decode a cursor produced by encode_cursor. Raises ValueError if it is malformed."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        timestamp, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return (datetime.fromisoformat(timestamp) if timestamp else None), int(row_id)
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+
+def comparable_timestamps(column, value):
+    """
+    SQLite stores server-default timestamps as text without fractional seconds
+    while bound datetimes always carry them, so equal instants don't compare
+    equal there. Normalise both sides to the same text form on SQLite.
+    """
+    if db.session.get_bind().dialect.name == 'sqlite':
+        return func.strftime('%Y-%m-%d %H:%M:%f', column), func.strftime('%Y-%m-%d %H:%M:%f', value)
+    return column, value
+
+
+def keyset_before(timestamp_column, id_column, cursor):
+    """Filter for rows that come after the cursor in (timestamp DESC, id DESC) order"""
+    timestamp_column, timestamp = comparable_timestamps(timestamp_column, cursor[0])
+    row_id = cursor[1]
+    return or_(
+        timestamp_column < timestamp,
+        and_(timestamp_column == timestamp, id_column < row_id)
+    )
+
+
+def keyset_after(timestamp_column, id_column, cursor):
+    """Filter for rows that come after the cursor in (timestamp ASC, id ASC) order"""
+    timestamp_column, timestamp = comparable_timestamps(timestamp_column, cursor[0])
+    row_id = cursor[1]
+    return or_(
+        timestamp_column > timestamp,
+        and_(timestamp_column == timestamp, id_column > row_id)
+    )
@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
 from flask_login import login_required, current_user
 from app.models import db, Profile
+from .serialization import json_response
 
 profile_routes = Blueprint('profiles', __name__)
 
@@ -24,7 +25,7 @@ def create_profile():
 
     db.session.add(profile)
     db.session.commit()
-    return jsonify(profile.to_dict()), 201
+    return json_response(profile.to_dict(), 201)
 
 @profile_routes.route('/', methods=['PUT'])
 @login_required
@@ -44,7 +45,7 @@ def update_profile():
             setattr(profile, field, data[field])
 
     db.session.commit()
-    return jsonify(profile.to_dict()), 200
+    return json_response(profile.to_dict())
 
 @profile_routes.route('/me', methods=['GET'])
 @login_required
@@ -52,14 +53,14 @@ def get_my_profile():
     profile = Profile.query.filter_by(user_id=current_user.id).first()
     if not profile:
         return jsonify({'error': 'Profile not found'}), 404
-    return jsonify(profile.to_dict()), 200
+    return json_response(profile.to_dict())
 
 @profile_routes.route('/<int:user_id>', methods=['GET'])
 def get_profile_by_user_id(user_id):
     profile = Profile.query.filter_by(user_id=user_id).first()
     if not profile:
         return jsonify({'error': 'Profile not found'}), 404
-    return jsonify(profile.to_dict()), 200
+    return json_response(profile.to_dict())
 
 @profile_routes.route('/', methods=['DELETE'])
 @login_required
@@ -109,30 +109,48 @@
 from flask import Blueprint, request, jsonify
 from flask_login import login_required, current_user
 from app.models import db, Resume
-from .aws_helpers import upload_file_to_s3, remove_file_from_s3
+from .aws_helpers import (
+    remove_file_from_s3, get_unique_filename, content_type_for, object_url,
+    stored_object_size, presigned_upload, presigned_download_url, PRESIGNED_URL_EXPIRY
+)
+from .document_helpers import extract_text
+from .upload_helper import (
+    MAX_FILE_SIZE, FileTooLarge, parse_upload, content_hash, store_upload, release_file,
+    known_extracted_text, issue_upload_token, read_upload_token, read_direct_upload, upload_contents
+)
+from .serialization import RESUME_SCHEMA, requested_fields, json_response
 
 resume_routes = Blueprint('resumes', __name__)
 
 ALLOWED_EXTENSIONS = {"pdf", "docx"}
 MAX_RESUMES_PER_USER = 10
-MAX_FILE_SIZE = 10 * 1024 * 1024  # 10 MB
 
 def allowed_file(filename):
     """Check if the file has an allowed extension"""
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def file_size_within_limit(file):
-    """Check if the uploaded file size is within the allowed limit"""
-    file.seek(0, 2)  # Move pointer to the end of the file
-    size = file.tell()
-    file.seek(0)  # Reset pointer to the beginning
-    return size <= MAX_FILE_SIZE
+def extract_file_text(file_bytes, filename):
+    try:
+        text, _ = extract_text(file_bytes, filename.rsplit('.', 1)[1])
+    except Exception:
+        # Unparseable files are still stored; extraction is retried on the first AI call
+        text = None
+    return text
+
+def extract_upload_text(file):
+    """Extract the upload's text, leaving it rewound for storage"""
+    with upload_contents(file) as file_bytes:
+        return extract_file_text(file_bytes, file.filename)
 
 @resume_routes.route('/all', methods=['GET'])
 @login_required
 def get_all_resumes():
-    resumes = Resume.query.order_by(Resume.uploaded_at.desc()).all()
-    return jsonify({"resumes": [resume.to_dict() for resume in resumes]}), 200
+    try:
+        fields = RESUME_SCHEMA.resolve(requested_fields())
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    rows = RESUME_SCHEMA.query(fields).order_by(Resume.uploaded_at.desc()).all()
+    return json_response({"resumes": RESUME_SCHEMA.serialize_rows(rows, fields)})
 
 
 @resume_routes.route('/<int:resume_id>', methods=['GET'])
@@ -141,14 +159,19 @@ def get_resume_by_id(resume_id):
     resume = Resume.query.get(resume_id)
     if not resume or resume.user_id != current_user.id:
         return jsonify({"error": "Resume not found or no permission"}), 404
-    return jsonify({"resume": resume.to_dict()}), 200
+    return json_response({"resume": resume.to_dict()})
 
 
 @resume_routes.route('', methods=['GET'])
 @login_required
 def get_user_resumes():
-    resumes = Resume.query.filter_by(user_id=current_user.id).order_by(Resume.uploaded_at.desc()).all()
-    return jsonify({"resumes": [resume.to_dict() for resume in resumes]}), 200
+    try:
+        fields = RESUME_SCHEMA.resolve(requested_fields())
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    rows = RESUME_SCHEMA.query(fields).filter(Resume.user_id == current_user.id) \
+        .order_by(Resume.uploaded_at.desc()).all()
+    return json_response({"resumes": RESUME_SCHEMA.serialize_rows(rows, fields)})
 
 @resume_routes.route('', methods=['POST'])
 @login_required
@@ -158,31 +181,136 @@ def upload_resume():
     if existing_count >= MAX_RESUMES_PER_USER:
         return jsonify({"error": f"You can only upload up to {MAX_RESUMES_PER_USER} resumes."}), 400
 
-    if 'file' not in request.files:
+    try:
+        form, files = parse_upload(MAX_FILE_SIZE)
+    except FileTooLarge as e:
+        return jsonify({"error": str(e)}), 400
+
+    if 'file' not in files:
         return jsonify({"error": "No file part"}), 400
 
-    file = request.files['file']
+    file = files['file']
     if file.filename == '':
         return jsonify({"error": "No selected file"}), 400
 
     if not allowed_file(file.filename):
         return jsonify({"error": f"File type not allowed. Allowed types: {', '.join(ALLOWED_EXTENSIONS)}"}), 400
 
-    if not file_size_within_limit(file):
-        return jsonify({"error": f"File size must be less than {MAX_FILE_SIZE // (1024 * 1024)}MB"}), 400
+    file_hash = content_hash(file)
+    # Text already extracted from an identical file is reused
+    extracted_text = known_extracted_text(file_hash) or extract_upload_text(file)
 
-    upload_result = upload_file_to_s3(file)
+    upload_result = store_upload(file)
     if 'url' not in upload_result:
         return jsonify({"error": upload_result.get('errors', 'Upload failed')}), 500
 
     file_url = upload_result['url']
-    title = request.form.get('title')
+    title = form.get('title')
+
+    new_resume = Resume(
+        user_id=current_user.id,
+        file_url=file_url,
+        title=title,
+        extracted_text=extracted_text,
+        content_hash=file_hash
+    )
+    db.session.add(new_resume)
+    db.session.commit()
+
+    return json_response({"message": "Resume uploaded", "resume": new_resume.to_dict()}, 201)
+
+@resume_routes.route('/upload-url', methods=['POST'])
+@login_required
+def create_resume_upload_url():
+    """
+    Start a direct upload: a presigned POST the client sends the file to
+    itself, and an upload_token to pass to /upload-complete once it's done.
+    """
+    existing_count = Resume.query.filter_by(user_id=current_user.id).count()
+    if existing_count >= MAX_RESUMES_PER_USER:
+        return jsonify({"error": f"You can only upload up to {MAX_RESUMES_PER_USER} resumes."}), 400
+
+    data = request.get_json() or {}
+    filename = data.get('filename') or ''
+    if not allowed_file(filename):
+        return jsonify({"error": f"File type not allowed. Allowed types: {', '.join(ALLOWED_EXTENSIONS)}"}), 400
+
+    key = get_unique_filename(filename)
+    try:
+        upload = presigned_upload(key, content_type_for(filename), MAX_FILE_SIZE)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+    return jsonify({
+        "upload": upload,
+        "upload_token": issue_upload_token('resume', current_user.id, key),
+        "expires_in": PRESIGNED_URL_EXPIRY,
+    }), 200
+
+@resume_routes.route('/upload-complete', methods=['POST'])
+@login_required
+def complete_resume_upload():
+    data = request.get_json() or {}
+    key = read_upload_token(data.get('upload_token'), 'resume', current_user.id)
+    if key is None:
+        return jsonify({"error": "Invalid or expired upload token"}), 400
+
+    file_url = object_url(key)
+    # Completing the same upload twice returns the row the first call created
+    existing = Resume.query.filter_by(user_id=current_user.id, file_url=file_url).first()
+    if existing:
+        return json_response({"message": "Resume uploaded", "resume": existing.to_dict()})
+
+    existing_count = Resume.query.filter_by(user_id=current_user.id).count()
+    if existing_count >= MAX_RESUMES_PER_USER:
+        return jsonify({"error": f"You can only upload up to {MAX_RESUMES_PER_USER} resumes."}), 400
+
+    try:
+        size = stored_object_size(key)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    if size is None:
+        return jsonify({"error": "File has not been uploaded"}), 400
+    if size > MAX_FILE_SIZE:
+        # Only reachable with a store that doesn't enforce the POST policy
+        remove_file_from_s3(file_url)
+        return jsonify({"error": f"File size must be less than {MAX_FILE_SIZE // (1024 * 1024)}MB"}), 400
 
-    new_resume = Resume(user_id=current_user.id, file_url=file_url, title=title)
+    try:
+        file_hash, extracted_text = read_direct_upload(
+            file_url, extract=lambda file_bytes: extract_file_text(file_bytes, key)
+        )
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+    new_resume = Resume(
+        user_id=current_user.id,
+        file_url=file_url,
+        title=data.get('title'),
+        extracted_text=extracted_text,
+        content_hash=file_hash
+    )
     db.session.add(new_resume)
     db.session.commit()
 
-    return jsonify({"message": "Resume uploaded", "resume": new_resume.to_dict()}), 201
+    return json_response({"message": "Resume uploaded", "resume": new_resume.to_dict()}, 201)
+
+@resume_routes.route('/<int:resume_id>/download-url', methods=['GET'])
+@login_required
+def get_resume_download_url(resume_id):
+    """Short-lived presigned URL the client downloads the file from directly"""
+    resume = Resume.query.get(resume_id)
+    if not resume or resume.user_id != current_user.id:
+        return jsonify({"error": "Resume not found or no permission"}), 404
+
+    try:
+        url = presigned_download_url(resume.file_url)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    if url is None:
+        return jsonify({"error": "File is not in storage"}), 500
+
+    return jsonify({"url": url, "expires_in": PRESIGNED_URL_EXPIRY}), 200
 
 @resume_routes.route('/<int:resume_id>', methods=['PUT'])
 @login_required
@@ -191,29 +319,41 @@ def update_resume(resume_id):
     if not resume or resume.user_id != current_user.id:
         return jsonify({"error": "Resume not found or no permission"}), 404
 
-    title = request.form.get('title')
+    try:
+        form, files = parse_upload(MAX_FILE_SIZE)
+    except FileTooLarge as e:
+        return jsonify({"error": str(e)}), 400
+
+    title = form.get('title')
     if title:
         resume.title = title
 
-    if 'file' in request.files:
-        file = request.files['file']
+    replaced_file = None
+    if 'file' in files:
+        file = files['file']
         if file.filename == '':
             return jsonify({"error": "No selected file"}), 400
         if not allowed_file(file.filename):
             return jsonify({"error": f"File type not allowed. Allowed types: {', '.join(ALLOWED_EXTENSIONS)}"}), 400
-        if not file_size_within_limit(file):
-            return jsonify({"error": f"File size must be less than {MAX_FILE_SIZE // (1024 * 1024)}MB"}), 400
 
-        remove_file_from_s3(resume.file_url)
+        # Re-uploading the same content keeps the stored file and its extracted text
+        file_hash = content_hash(file)
+        if file_hash != resume.content_hash:
+            extracted_text = known_extracted_text(file_hash) or extract_upload_text(file)
 
-        upload_result = upload_file_to_s3(file)
-        if 'url' not in upload_result:
-            return jsonify({"error": upload_result.get('errors', 'Upload failed')}), 500
+            upload_result = store_upload(file)
+            if 'url' not in upload_result:
+                return jsonify({"error": upload_result.get('errors', 'Upload failed')}), 500
 
-        resume.file_url = upload_result['url']
+            replaced_file = (resume.file_url, resume.content_hash)
+            resume.file_url = upload_result['url']
+            resume.extracted_text = extracted_text
+            resume.content_hash = file_hash
 
     db.session.commit()
-    return jsonify({"message": "Resume updated", "resume": resume.to_dict()}), 200
+    if replaced_file:
+        release_file(*replaced_file)
+    return json_response({"message": "Resume updated", "resume": resume.to_dict()})
 
 @resume_routes.route('/<int:resume_id>', methods=['DELETE'])
 @login_required
@@ -222,10 +362,10 @@ def delete_resume(resume_id):
     if not resume or resume.user_id != current_user.id:
         return jsonify({"error": "Resume not found or no permission"}), 404
 
-    remove_file_from_s3(resume.file_url)
-
+    stored_file = (resume.file_url, resume.content_hash)
     db.session.delete(resume)
     db.session.commit()
+    release_file(*stored_file)
 
     return jsonify({"message": "Resume deleted"}), 200
 
@@ -0,0 +1,155 @@
+import os
+import threading
+import time
+
+S3_ENDPOINT_URL = os.environ.get("S3_ENDPOINT_URL")
+S3_REGION = os.environ.get("S3_REGION")
+
+# Connections kept per process. Every thread or greenlet that calls S3 at the
+# same time needs its own, so this covers the request handlers expected to
+# touch S3 at once plus the background AI task workers, which read resumes.
+# botocore's default of 10 makes the eleventh caller wait for a free one.
+S3_REQUEST_CONCURRENCY = int(os.getenv("S3_REQUEST_CONCURRENCY", 16))
+S3_MAX_POOL_CONNECTIONS = int(os.getenv(
+    "S3_MAX_POOL_CONNECTIONS", S3_REQUEST_CONCURRENCY + int(os.getenv("AI_TASK_WORKERS", 4))
+))
+# Total attempts per call; adaptive mode also backs off client-side when S3 throttles
+S3_MAX_ATTEMPTS = int(os.getenv("S3_MAX_ATTEMPTS", 5))
+S3_CONNECT_TIMEOUT = float(os.getenv("S3_CONNECT_TIMEOUT", 5))  # seconds
+S3_READ_TIMEOUT = float(os.getenv("S3_READ_TIMEOUT", 30))  # seconds
+
+# Uploads are capped at 10 MB, so with a 16 MB threshold every document goes
+# up in a single PUT instead of a multipart upload's three or more requests.
+# Larger objects use 8 MB parts, S3_TRANSFER_CONCURRENCY at a time.
+S3_MULTIPART_THRESHOLD = int(os.getenv("S3_MULTIPART_THRESHOLD", 16 * 1024 * 1024))
+S3_MULTIPART_CHUNKSIZE = int(os.getenv("S3_MULTIPART_CHUNKSIZE", 8 * 1024 * 1024))
+S3_TRANSFER_CONCURRENCY = int(os.getenv("S3_TRANSFER_CONCURRENCY", 4))
+
+_client = None
+_transfer_config = None
+_client_lock = threading.Lock()
+
+_stats = {}  # operation -> counters, see _record
+_stats_lock = threading.Lock()
+
+
+def get_s3():
+    """
+    The process-wide S3 client, created on first use so importing the upload
+    routes doesn't load boto3. botocore clients are thread-safe and share one
+    connection pool.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            import boto3
+            from botocore.config import Config
+
+            _client = boto3.client(
+                "s3",
+                aws_access_key_id=os.environ.get("S3_KEY"),
+                aws_secret_access_key=os.environ.get("S3_SECRET"),
+                region_name=S3_REGION,
+                endpoint_url=S3_ENDPOINT_URL,
+                config=Config(
+                    max_pool_connections=S3_MAX_POOL_CONNECTIONS,
+                    retries={"max_attempts": S3_MAX_ATTEMPTS, "mode": "adaptive"},
+                    connect_timeout=S3_CONNECT_TIMEOUT,
+                    read_timeout=S3_READ_TIMEOUT,
+                    tcp_keepalive=True,
+                ),
+            )
+            _register_metrics(_client.meta.events)
+        return _client
+
+
+def get_transfer_config():
+    """TransferConfig for upload_fileobj / download_fileobj on the shared client"""
+    global _transfer_config
+    with _client_lock:
+        if _transfer_config is None:
+            from boto3.s3.transfer import TransferConfig
+
+            _transfer_config = TransferConfig(
+                multipart_threshold=S3_MULTIPART_THRESHOLD,
+                multipart_chunksize=S3_MULTIPART_CHUNKSIZE,
+                max_concurrency=S3_TRANSFER_CONCURRENCY,
+            )
+        return _transfer_config
+
+
+# Metrics: botocore emits before-call / after-call around each operation
+# (retries included) and before-send for every HTTP attempt.
+
+def _register_metrics(events):
+    events.register("before-call.s3", _start_timer)
+    events.register("before-send.s3", _count_sent)
+    events.register("after-call.s3", _finish_call)
+    events.register("after-call-error.s3", _finish_failed_call)
+
+
+def _operation(event_name):
+    return event_name.rsplit(".", 1)[-1]
+
+
+def _start_timer(context, **kwargs):
+    context["s3_started"] = time.perf_counter()
+
+
+def _count_sent(request, event_name, **kwargs):
+    body = request.body
+    if isinstance(body, (bytes, bytearray)):
+        sent = len(body)
+    else:
+        sent = int(request.headers.get("Content-Length") or 0)
+    _record(_operation(event_name), bytes_sent=sent)
+
+
+def _finish_call(http_response, parsed, model, context, event_name, **kwargs):
+    if model.has_streaming_output:
+        # The body hasn't been read yet; the caller streams it
+        received = int(http_response.headers.get("content-length") or 0)
+    else:
+        received = len(http_response.content or b"")
+    retries = parsed.get("ResponseMetadata", {}).get("RetryAttempts", 0)
+    _record(
+        _operation(event_name), calls=1, retries=retries, bytes_received=received,
+        errors=int(http_response.status_code >= 300), seconds=_elapsed(context)
+    )
+
+
+def _finish_failed_call(context, event_name, **kwargs):
+    # Connection errors and timeouts that exhausted the retries
+    _record(_operation(event_name), calls=1, errors=1, seconds=_elapsed(context))
+
+
+def _elapsed(context):
+    started = context.get("s3_started")
+    return time.perf_counter() - started if started is not None else None
+
+
+def _record(operation, calls=0, errors=0, retries=0, bytes_sent=0, bytes_received=0, seconds=None):
+    with _stats_lock:
+        stats = _stats.get(operation)
+        if stats is None:
+            stats = _stats[operation] = {
+                "calls": 0, "errors": 0, "retries": 0, "bytes_sent": 0, "bytes_received": 0,
+                "seconds_total": 0.0, "seconds_max": 0.0,
+            }
+        stats["calls"] += calls
+        stats["errors"] += errors
+        stats["retries"] += retries
+        stats["bytes_sent"] += bytes_sent
+        stats["bytes_received"] += bytes_received
+        if seconds is not None:
+            stats["seconds_total"] += seconds
+            stats["seconds_max"] = max(stats["seconds_max"], seconds)
+
+
+def s3_stats():
+    """Per-operation counters for this process: {"PutObject": {"calls": ..., "seconds_avg": ...}, ...}"""
+    with _stats_lock:
+        stats = {operation: dict(counters) for operation, counters in _stats.items()}
+    for counters in stats.values():
+        counters["seconds_avg"] = counters["seconds_total"] / counters["calls"] if counters["calls"] else 0.0
+    return stats
@@ -0,0 +1,285 @@
+import logging
+import math
+import os
+import re
+import threading
+import time
+import zlib
+from datetime import timedelta
+import numpy as np
+from sqlalchemy import func, or_
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.orm import load_only
+from app.models import db, Job, JobVector
+from .cpu_bound import run_cpu_bound
+
+logger = logging.getLogger(__name__)
+
+# Jobs and resumes are embedded with signed feature hashing of word unigrams and
+# bigrams into a fixed-size, L2-normalised vector, so similarity is a dot product
+# and needs no model download or network call.
+VECTOR_DIM = int(os.getenv('SEMANTIC_VECTOR_DIM', 512))
+# job_vectors is the source of truth; each worker keeps an in-memory copy and
+# merges in rows other workers changed every SYNC_INTERVAL seconds.
+SYNC_INTERVAL = 5  # seconds
+# updated_at is set when the writing transaction starts, so one that commits
+# late can carry a time older than the newest row already merged. Each sync
+# re-reads this far back; re-applying a row is harmless.
+SYNC_OVERLAP = 120  # seconds, longer than any transaction that writes job_vectors
+BUILD_BATCH_SIZE = 1000
+INITIAL_CAPACITY = 1024  # rows preallocated for the in-memory matrix
+
+TITLE_WEIGHT = 3.0
+SKILLS_WEIGHT = 2.0
+DESCRIPTION_WEIGHT = 1.0
+
+STOP_WORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'has', 'have', 'in', 'is',
+    'it', 'its', 'of', 'on', 'or', 'our', 'that', 'the', 'their', 'this', 'to', 'was', 'we',
+    'will', 'with', 'you', 'your',
+}
+
+
+def tokenize(text):
+    return [word for word in re.findall(r'[a-z0-9+#]+', (text or '').lower()) if word not in STOP_WORDS]
+
+
+def add_features(vector, text, weight):
+    words = tokenize(text)
+    counts = {}
+    for feature in words + [f'{a} {b}' for a, b in zip(words, words[1:])]:
+        counts[feature] = counts.get(feature, 0) + 1
+    for feature, count in counts.items():
+        digest = zlib.crc32(feature.encode())
+        sign = 1.0 if digest & 0x80000000 else -1.0
+        vector[digest % VECTOR_DIM] += sign * weight * (1.0 + math.log(count))
+
+
+def normalize(vector):
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def embed_text(text):
+    vector = np.zeros(VECTOR_DIM, dtype=np.float32)
+    add_features(vector, text, 1.0)
+    return normalize(vector)
+
+
+def embed_job(job):
+    return embed_job_fields(job.title, job.skills, job.description)
+
+
+def embed_job_fields(title, skills, description):
+    vector = np.zeros(VECTOR_DIM, dtype=np.float32)
+    add_features(vector, title, TITLE_WEIGHT)
+    add_features(vector, (skills or '').replace(',', ' '), SKILLS_WEIGHT)
+    add_features(vector, description, DESCRIPTION_WEIGHT)
+    return normalize(vector)
+
+
+def _embed_jobs(fields):
+    return [embed_job_fields(*job) for job in fields]
+
+
+def _job_fields(job):
+    # Read on the calling thread, so run_cpu_bound work never lazy-loads from the database
+    return job.title, job.skills, job.description
+
+
+def _score(text, fields):
+    return (np.vstack(_embed_jobs(fields)) @ embed_text(text)).tolist()
+
+
+def score_jobs(text, jobs):
+    """Cosine similarity between a text and each job, in the order given"""
+    if not jobs:
+        return []
+    return run_cpu_bound(_score, text, [_job_fields(job) for job in jobs])
+
+
+class JobVectorIndex:
+    """
+    In-memory matrix of job vectors, one row per job. Rows are preallocated
+    and the capacity doubles when it runs out, so adding a job is amortised
+    O(1) instead of copying the matrix; removing one moves the last row into
+    its place.
+    """
+
+    def __init__(self, capacity=INITIAL_CAPACITY):
+        self.job_ids = np.zeros(capacity, dtype=np.int64)
+        self.matrix = np.zeros((capacity, VECTOR_DIM), dtype=np.float32)
+        self.size = 0
+        self.positions = {}
+        self.synced_until = None  # newest job_vectors.updated_at merged in
+
+    def grow(self):
+        capacity = max(INITIAL_CAPACITY, 2 * len(self.job_ids))
+        job_ids = np.zeros(capacity, dtype=np.int64)
+        matrix = np.zeros((capacity, VECTOR_DIM), dtype=np.float32)
+        job_ids[:self.size] = self.job_ids[:self.size]
+        matrix[:self.size] = self.matrix[:self.size]
+        self.job_ids, self.matrix = job_ids, matrix
+
+    def upsert(self, job_id, vector):
+        row = self.positions.get(job_id)
+        if row is None:
+            if self.size == len(self.job_ids):
+                self.grow()
+            row = self.size
+            self.size += 1
+            self.positions[job_id] = row
+            self.job_ids[row] = job_id
+        self.matrix[row] = vector
+
+    def remove(self, job_id):
+        row = self.positions.pop(job_id, None)
+        if row is None:
+            return
+        last = self.size - 1
+        if row != last:
+            moved = int(self.job_ids[last])
+            self.job_ids[row] = moved
+            self.matrix[row] = self.matrix[last]
+            self.positions[moved] = row
+        self.size = last
+
+    def apply(self, rows):
+        """Merge (job_id, vector, deleted, updated_at) rows read from job_vectors"""
+        for job_id, vector, deleted, updated_at in rows:
+            if deleted:
+                self.remove(job_id)
+            elif len(vector) == VECTOR_DIM * 4:
+                self.upsert(job_id, np.frombuffer(vector, dtype=np.float32))
+            if updated_at is not None and (self.synced_until is None or updated_at > self.synced_until):
+                self.synced_until = updated_at
+
+    def top_k(self, vector, k):
+        """Return up to k (job_id, similarity) pairs, most similar first"""
+        if not self.size:
+            return []
+        scores = self.matrix[:self.size] @ vector
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(self.job_ids[row]), float(scores[row])) for row in top]
+
+
+def store_vectors(items):
+    """Write (job_id, vector) pairs to job_vectors in one transaction; a None vector marks the job deleted"""
+    table = JobVector.__table__
+    for attempt in range(2):
+        try:
+            with db.engine.begin() as conn:
+                for job_id, vector in items:
+                    values = {
+                        'vector': vector.tobytes() if vector is not None else b'',
+                        'deleted': vector is None,
+                        'updated_at': func.now(),
+                    }
+                    if not conn.execute(table.update().where(table.c.job_id == job_id).values(**values)).rowcount:
+                        conn.execute(table.insert().values(job_id=job_id, **values))
+            return
+        except IntegrityError:
+            # Another worker inserted the same job first; the retry updates it
+            if attempt:
+                raise
+
+
+def load_vectors(since=None):
+    """Rows changed since `since` (minus SYNC_OVERLAP), or every live row when since is None"""
+    table = JobVector.__table__
+    query = db.select(table.c.job_id, table.c.vector, table.c.deleted, table.c.updated_at)
+    if since is None:
+        query = query.where(table.c.deleted.is_(False))
+    else:
+        query = query.where(table.c.updated_at >= since - timedelta(seconds=SYNC_OVERLAP))
+    with db.engine.connect() as conn:
+        return conn.execute(query).all()
+
+
+def backfill_vectors():
+    """Embed jobs with no stored vector, or one of another VECTOR_DIM. Only does work once per database."""
+    table = JobVector.__table__
+    missing = Job.query.options(load_only(Job.id, Job.title, Job.description, Job.skills)) \
+        .outerjoin(table, table.c.job_id == Job.id) \
+        .filter(or_(table.c.job_id.is_(None), func.length(table.c.vector) != VECTOR_DIM * 4))
+    batch = []
+    for job in missing.yield_per(BUILD_BATCH_SIZE):
+        batch.append((job.id, _job_fields(job)))
+        if len(batch) >= BUILD_BATCH_SIZE:
+            _store_embedded(batch)
+            batch = []
+    if batch:
+        _store_embedded(batch)
+
+
+def _store_embedded(batch):
+    vectors = run_cpu_bound(_embed_jobs, [fields for _, fields in batch])
+    store_vectors(list(zip([job_id for job_id, _ in batch], vectors)))
+
+
+_index = None
+_synced_at = 0  # time.monotonic() of the last sync
+_lock = threading.Lock()  # guards the index's contents; only held for in-memory work
+_sync_lock = threading.Lock()  # one thread loads or syncs at a time
+
+
+def _current_index():
+    """
+    This process's job index. The first call loads it from job_vectors while
+    other threads wait for it; after that one thread at a time merges in
+    rows other workers changed, and the rest keep using the index meanwhile.
+    """
+    global _index, _synced_at
+    if _index is None:
+        with _sync_lock:
+            if _index is None:
+                backfill_vectors()
+                index = JobVectorIndex()
+                run_cpu_bound(index.apply, load_vectors())
+                _synced_at = time.monotonic()
+                _index = index
+    elif time.monotonic() - _synced_at >= SYNC_INTERVAL and _sync_lock.acquire(blocking=False):
+        try:
+            rows = load_vectors(_index.synced_until)
+            with _lock:
+                run_cpu_bound(_index.apply, rows)
+        except SQLAlchemyError:
+            logger.exception("Could not sync the job vector index")
+        finally:
+            _synced_at = time.monotonic()
+            _sync_lock.release()
+    return _index
+
+
+def _write(job_id, vector):
+    try:
+        store_vectors([(job_id, vector)])
+    except SQLAlchemyError:
+        # Other workers miss this change until the job is saved again; a new job
+        # is still picked up by the next backfill
+        logger.exception("Could not store the vector for job %s", job_id)
+    if _index is not None:
+        with _lock:
+            if vector is None:
+                _index.remove(job_id)
+            else:
+                _index.upsert(job_id, vector)
+
+
+def index_job(job):
+    """Add or refresh a job's vector after it is created or updated"""
+    _write(job.id, embed_job(job))
+
+
+def unindex_job(job_id):
+    _write(job_id, None)
+
+
+def best_matching_job_ids(text, k):
+    """Return up to k (job_id, similarity) pairs for a resume text, best first"""
+    index = _current_index()
+    vector = run_cpu_bound(embed_text, text)
+    with _lock:
+        return run_cpu_bound(index.top_k, vector, k)
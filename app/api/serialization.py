@@ -0,0 +1,169 @@
+import json
+from datetime import date, datetime
+from flask import Response, request
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import case
+from app.models import db, Job, Company, Resume, CoverLetter, Application, Message
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - falls back to the stdlib encoder
+    orjson = None
+
+
+class Schema:
+    """
+    Declares which columns of a model are serialized, plus nested schemas for
+    many-to-one relationships. Queries select only the needed columns and rows
+    are turned into dicts straight from the result tuples, without building
+    ORM objects.
+
+    A field is either a column name or a (name, SQL expression) pair.
+    """
+
+    def __init__(self, model, fields, nested=None):
+        self.model = model
+        self.columns = {}
+        for field in fields:
+            name, column = field if isinstance(field, tuple) else (field, getattr(model, field))
+            self.columns[name] = column
+        self.nested = nested or {}  # name -> (relationship attribute, Schema)
+
+    def resolve(self, requested=None):
+        """Field names to serialize, in declaration order. Raises ValueError for unknown names."""
+        available = list(self.columns) + list(self.nested)
+        if not requested:
+            return available
+        unknown = set(requested) - set(available)
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+        return [name for name in available if name in requested]
+
+    def plan(self, names):
+        """Flat list of (column, path) pairs for the given field names"""
+        plan = []
+        for name in names:
+            if name in self.nested:
+                _, schema = self.nested[name]
+                plan.extend((column, (name,) + path) for column, path in schema.plan(schema.resolve()))
+            else:
+                plan.append((self.columns[name], (name,)))
+        return plan
+
+    def joins(self, names):
+        joins = []
+        for name in names:
+            if name in self.nested:
+                relationship, schema = self.nested[name]
+                joins.append(relationship)
+                joins.extend(schema.joins(schema.resolve()))
+        return joins
+
+    def nested_paths(self, names):
+        """Paths of every nested object, innermost first"""
+        paths = []
+        for name in names:
+            if name in self.nested:
+                _, schema = self.nested[name]
+                paths.extend((name,) + path for path in schema.nested_paths(schema.resolve()))
+                paths.append((name,))
+        return paths
+
+    def query(self, names):
+        """Column query for the given fields; nested relationships are outer joined"""
+        query = db.session.query(*[column for column, _ in self.plan(names)]).select_from(self.model)
+        for relationship in self.joins(names):
+            query = query.outerjoin(relationship)
+        return query
+
+    def serializer(self, names):
+        """Return a function turning one result row into a dict"""
+        paths = [path for _, path in self.plan(names)]
+        nested_paths = self.nested_paths(names)
+
+        def serialize(row):
+            data = {}
+            for path, value in zip(paths, row):
+                target = data
+                for key in path[:-1]:
+                    target = target.setdefault(key, {})
+                target[path[-1]] = value
+            # An outer join that matched nothing yields a nested object of NULLs
+            for path in nested_paths:
+                parent = data
+                for key in path[:-1]:
+                    parent = parent.get(key) or {}
+                nested = parent.get(path[-1])
+                if nested is not None and nested.get('id') is None:
+                    parent[path[-1]] = None
+            return data
+
+        return serialize
+
+    def serialize_rows(self, rows, names):
+        serialize = self.serializer(names)
+        return [serialize(row) for row in rows]
+
+
+def requested_fields():
+    """Sparse fieldset from ?fields=id,title,company"""
+    fields = request.args.get('fields')
+    if not fields:
+        return None
+    return {field.strip() for field in fields.split(',') if field.strip()}
+
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(payload):
+    """JSON text, encoded with orjson when available; datetimes come out as ISO 8601"""
+    if orjson is not None:
+        return orjson.dumps(payload, default=_default, option=orjson.OPT_NON_STR_KEYS).decode()
+    return json.dumps(payload, default=_default, separators=(',', ':'))
+
+
+def json_response(payload, status=200):
+    return Response(dumps(payload), status=status, mimetype='application/json')
+
+
+class JSONProvider(DefaultJSONProvider):
+    """Flask's JSON provider, with dates in ISO 8601 like dumps(), so jsonify and returned dicts agree"""
+
+    @staticmethod
+    def default(value):
+        if isinstance(value, (datetime, date)):
+            return value.isoformat()
+        return DefaultJSONProvider.default(value)
+
+
+COMPANY_SCHEMA = Schema(Company, [
+    'id', 'name', 'website', 'logo_url', 'description', 'location', 'funding_stage', 'created_at',
+])
+
+JOB_SCHEMA = Schema(Job, [
+    'id', 'title', 'description', 'work_experience', 'skills', 'location', 'accept_relocate',
+    'offer_relocate_assistance', 'offer_visa_sponsorship', 'is_remote', 'currency', 'salary_min',
+    'salary_max', 'equity_min', 'equity_max', 'job_type', 'company_id', 'posted_by', 'created_at', 'status',
+], nested={'company': (Job.company, COMPANY_SCHEMA)})
+
+RESUME_SCHEMA = Schema(Resume, [
+    'id', 'user_id', 'file_url', 'title', 'extracted_text', 'uploaded_at',
+])
+
+COVER_LETTER_SCHEMA = Schema(CoverLetter, [
+    'id', 'user_id', 'file_url', 'title', 'extracted_text', 'uploaded_at',
+])
+
+APPLICATION_SCHEMA = Schema(Application, [
+    'id', 'user_id', 'job_id', 'cover_letter', 'status', 'applied_at',
+], nested={'job': (Application.job, JOB_SCHEMA)})
+
+MESSAGE_SCHEMA = Schema(Message, [
+    'id', 'conversation_id', 'sender_id',
+    ('message_body', case((Message.is_recalled, "This message has been recalled"), else_=Message.message_body)),
+    'sent_at', 'read_at', 'is_recalled', 'edited_at', 'updated_at',
+])
@@ -0,0 +1,262 @@
+import mmap
+import os
+import re
+import shutil
+import tempfile
+import time
+from contextlib import contextmanager
+from urllib.parse import quote, unquote
+from flask import current_app
+from itsdangerous import BadSignature, URLSafeSerializer
+from werkzeug.utils import safe_join
+from .s3_client import S3_ENDPOINT_URL, get_s3, get_transfer_config
+
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "s3")  # s3 or local
+
+BUCKET_NAME = os.environ.get("S3_BUCKET")
+if S3_ENDPOINT_URL:
+    S3_LOCATION = f"{S3_ENDPOINT_URL.rstrip('/')}/{BUCKET_NAME}/"
+else:
+    S3_LOCATION = f"https://{BUCKET_NAME}.s3.amazonaws.com/"
+VIRTUAL_HOSTED_URL = re.compile(r"^https://(?P<bucket>[^/]+)\.s3(?:[.-][a-z0-9-]+)?\.amazonaws\.com/(?P<key>.+)$")
+PATH_STYLE_URL = re.compile(r"^https://s3(?:[.-][a-z0-9-]+)?\.amazonaws\.com/(?P<bucket>[^/]+)/(?P<key>.+)$")
+
+LOCAL_STORAGE_DIR = os.path.abspath(os.getenv("LOCAL_STORAGE_DIR", "uploads"))
+# Where file_routes is mounted; stored file URLs start with it
+LOCAL_STORAGE_URL = os.getenv("LOCAL_STORAGE_URL", "/api/files/")
+
+
+# Backends share one interface: url(key) is the file URL stored on a row, and
+# the other methods take that URL back. read() and delete() return None /
+# False for a URL the backend doesn't hold (e.g. an S3 URL left over after
+# switching to local storage); everything else raises on failure.
+
+@contextmanager
+def map_file(f):
+    """A read-only mmap of an open file, or b'' if it is empty (mmap rejects those)"""
+    if os.fstat(f.fileno()).st_size == 0:
+        yield b""
+        return
+    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        yield data
+
+
+def parse_s3_url(file_url):
+    """(bucket, key) for an object URL we stored, or None if it isn't an S3 URL"""
+    if file_url.startswith(S3_LOCATION):
+        return BUCKET_NAME, unquote(file_url[len(S3_LOCATION):])
+    if S3_ENDPOINT_URL and file_url.startswith(S3_ENDPOINT_URL.rstrip("/") + "/"):
+        bucket, _, key = file_url[len(S3_ENDPOINT_URL.rstrip("/")) + 1:].partition("/")
+        return (bucket, unquote(key)) if key else None
+    match = VIRTUAL_HOSTED_URL.match(file_url) or PATH_STYLE_URL.match(file_url)
+    if not match:
+        return None
+    return match.group("bucket"), unquote(match.group("key"))
+
+
+class S3Storage:
+    name = "s3"
+
+    def url(self, key):
+        return f"{S3_LOCATION}{key}"
+
+    def save(self, fileobj, key, content_type):
+        get_s3().upload_fileobj(
+            fileobj,
+            BUCKET_NAME,
+            key,
+            ExtraArgs={
+                "ContentType": content_type,
+                # "ACL": "public-read"
+            },
+            Config=get_transfer_config()
+        )
+        return self.url(key)
+
+    def read(self, file_url):
+        location = parse_s3_url(file_url)
+        if location is None:
+            return None
+        bucket, key = location
+        return get_s3().get_object(Bucket=bucket, Key=key)["Body"].read()
+
+    @contextmanager
+    def open(self, file_url):
+        """
+        Yields the object like LocalStorage.open, or None for a URL that isn't
+        an S3 object. It is downloaded in TransferConfig-sized chunks to a
+        temporary file and memory-mapped, so it is never held in memory whole.
+        """
+        location = parse_s3_url(file_url)
+        if location is None:
+            yield None
+            return
+        bucket, key = location
+        with tempfile.TemporaryFile() as f:
+            get_s3().download_fileobj(bucket, key, f, Config=get_transfer_config())
+            f.flush()
+            with map_file(f) as data:
+                yield data
+
+    def delete(self, file_url):
+        location = parse_s3_url(file_url)
+        if location is None:
+            return False
+        bucket, key = location
+        get_s3().delete_object(Bucket=bucket, Key=key)
+        return True
+
+    def size(self, key):
+        from botocore.exceptions import ClientError
+
+        try:
+            return get_s3().head_object(Bucket=BUCKET_NAME, Key=key)["ContentLength"]
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+
+    def presigned_upload(self, key, content_type, max_size, expires_in):
+        return get_s3().generate_presigned_post(
+            BUCKET_NAME,
+            key,
+            Fields={"Content-Type": content_type},
+            Conditions=[{"Content-Type": content_type}, ["content-length-range", 1, max_size]],
+            ExpiresIn=expires_in
+        )
+
+    def download_url(self, file_url, expires_in):
+        location = parse_s3_url(file_url)
+        if location is None:
+            return None
+        bucket, key = location
+        return get_s3().generate_presigned_url(
+            "get_object", Params={"Bucket": bucket, "Key": key}, ExpiresIn=expires_in
+        )
+
+
+class LocalStorage:
+    """
+    Files in a directory on this machine, served by file_routes. For dev,
+    tests, benchmarks and single-node deployments: no network round trip, and
+    open() memory-maps the file so extraction reads only the pages it touches.
+    Like a private bucket, files are only served through download_url(), which
+    signs the key and an expiry time, the way S3 presigns a GET, and direct
+    uploads post to a URL signed the same way, mirroring a presigned POST.
+    """
+    name = "local"
+
+    def __init__(self, root=LOCAL_STORAGE_DIR, base_url=LOCAL_STORAGE_URL):
+        self.root = root
+        self.base_url = base_url
+        os.makedirs(root, exist_ok=True)
+
+    def url(self, key):
+        return f"{self.base_url}{quote(key)}"
+
+    def path(self, key):
+        """The file's path, or None for a key that would leave the storage directory"""
+        return safe_join(self.root, key)
+
+    def path_for(self, file_url):
+        if not file_url.startswith(self.base_url):
+            return None
+        return self.path(unquote(file_url[len(self.base_url):]))
+
+    def save(self, fileobj, key, content_type):
+        path = self.path(key)
+        if path is None:
+            raise ValueError(f"Invalid key: {key}")
+        # Written under a temporary name and renamed, so readers never see a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix=".upload-")
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                shutil.copyfileobj(fileobj, tmp)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        return self.url(key)
+
+    def read(self, file_url):
+        with self.open(file_url) as data:
+            return bytes(data) if data is not None else None
+
+    @contextmanager
+    def open(self, file_url):
+        """Yields a read-only mmap of the file (b'' if it's empty), or None if it isn't stored here"""
+        path = self.path_for(file_url)
+        if path is None or not os.path.isfile(path):
+            yield None
+            return
+        with open(path, "rb") as f, map_file(f) as data:
+            yield data
+
+    def delete(self, file_url):
+        path = self.path_for(file_url)
+        if path is None:
+            return False
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        return True
+
+    def size(self, key):
+        path = self.path(key)
+        if path is None or not os.path.isfile(path):
+            return None
+        return os.path.getsize(path)
+
+    def presigned_upload(self, key, content_type, max_size, expires_in):
+        """
+        Same shape as S3's presigned POST: the client posts `fields` plus a
+        `file` part to `url`, which file_routes accepts until the token expires.
+        """
+        if self.path(key) is None:
+            raise ValueError(f"Invalid key: {key}")
+        token = _serializer("local-upload").dumps({
+            "key": key, "content_type": content_type, "max_size": max_size,
+            "expires_at": int(time.time() + expires_in),
+        })
+        return {"url": self.url(key), "fields": {"Content-Type": content_type, "token": token}}
+
+    def verify_upload(self, key, token):
+        """The claims of an unexpired presigned_upload() token for `key`, or None"""
+        return _verify("local-upload", key, token)
+
+    def download_url(self, file_url, expires_in):
+        if self.path_for(file_url) is None:
+            return None
+        key = unquote(file_url[len(self.base_url):])
+        token = _serializer("local-download").dumps({"key": key, "expires_at": int(time.time() + expires_in)})
+        return f"{file_url}?token={token}"
+
+    def verify_download(self, key, token):
+        """Whether `token` is an unexpired download_url() signature for `key`"""
+        return _verify("local-download", key, token) is not None
+
+
+def _serializer(salt):
+    return URLSafeSerializer(current_app.config["SECRET_KEY"], salt=salt)
+
+
+def _verify(salt, key, token):
+    if not isinstance(token, str):
+        return None
+    try:
+        claims = _serializer(salt).loads(token)
+    except BadSignature:
+        return None
+    if claims.get("key") != key or claims.get("expires_at", 0) <= time.time():
+        return None
+    return claims
+
+
+def make_storage(backend):
+    if backend == "local":
+        return LocalStorage()
+    return S3Storage()
+
+
+storage = make_storage(STORAGE_BACKEND)
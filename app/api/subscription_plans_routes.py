@@ -1,5 +1,7 @@
 from flask import Blueprint, request, jsonify
 from app.models import SubscriptionPlan, db
+from .serialization import json_response
+from .entitlements import validate_feature_flags
 
 subscriptions_plans_routes = Blueprint('subscriptions', __name__)
 
@@ -7,7 +9,7 @@ subscriptions_plans_routes = Blueprint('subscriptions', __name__)
 @subscriptions_plans_routes.route('/', methods=['GET'])
 def get_plans():
     plans = SubscriptionPlan.query.all()
-    return jsonify([plan.to_dict() for plan in plans]), 200
+    return json_response([plan.to_dict() for plan in plans])
 
 # Get a single subscription plan by id
 @subscriptions_plans_routes.route('/<int:plan_id>', methods=['GET'])
@@ -15,12 +17,16 @@ def get_plan(plan_id):
     plan = SubscriptionPlan.query.get(plan_id)
     if not plan:
         return jsonify({"error": "Plan not found"}), 404
-    return jsonify(plan.to_dict()), 200
+    return json_response(plan.to_dict())
 
 # Create a new subscription plan
 @subscriptions_plans_routes.route('/', methods=['POST'])
 def create_plan():
     data = request.get_json()
+    try:
+        feature_flags = validate_feature_flags(data.get('feature_flags'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     try:
         plan = SubscriptionPlan(
             name=data['name'],
@@ -29,11 +35,11 @@ def create_plan():
             price=data['price'],
             billing_cycle=data['billing_cycle'],
             for_role=data.get('for_role'),
-            feature_flags=data.get('feature_flags')
+            feature_flags=feature_flags
         )
         db.session.add(plan)
         db.session.commit()
-        return jsonify(plan.to_dict()), 201
+        return json_response(plan.to_dict(), 201)
     except Exception as e:
         db.session.rollback()
         return jsonify({"error": str(e)}), 400
@@ -46,6 +52,11 @@ def update_plan(plan_id):
         return jsonify({"error": "Plan not found"}), 404
 
     data = request.get_json()
+    if 'feature_flags' in data:
+        try:
+            data['feature_flags'] = validate_feature_flags(data['feature_flags'])
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
     try:
         plan.name = data.get('name', plan.name)
         plan.tagline = data.get('tagline', plan.tagline)
@@ -56,7 +67,7 @@ def update_plan(plan_id):
         plan.feature_flags = data.get('feature_flags', plan.feature_flags)
 
         db.session.commit()
-        return jsonify(plan.to_dict()), 200
+        return json_response(plan.to_dict())
     except Exception as e:
         db.session.rollback()
         return jsonify({"error": str(e)}), 400
@@ -0,0 +1,196 @@
+import hashlib
+import tempfile
+from contextlib import contextmanager
+from flask import current_app, request
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+from werkzeug.formparser import parse_form_data
+from app.models import db, Resume, CoverLetter
+from .aws_helpers import content_addressed_key, object_url, upload_file_to_s3, remove_file_from_s3
+from .document_helpers import hash_bytes
+from .storage import map_file, storage
+
+MAX_FILE_SIZE = 10 * 1024 * 1024  # 10 MB
+# Room for the multipart boundaries and the other form fields
+MAX_FORM_OVERHEAD = 64 * 1024
+# Werkzeug 2.2 checks max_form_memory_size against its read buffer, file data
+# included, and reads the body in chunks of this size
+PARSER_READ_SIZE = 64 * 1024
+# Uploaded files up to this size stay in memory, larger ones are spooled to disk
+SPOOL_MEMORY_LIMIT = 512 * 1024
+# How long after issuing a direct upload its completion callback is accepted
+UPLOAD_TOKEN_MAX_AGE = 60 * 60  # seconds
+
+
+class FileTooLarge(Exception):
+    def __init__(self, max_size):
+        super().__init__(f"File size must be less than {max_size // (1024 * 1024)}MB")
+        self.max_size = max_size
+
+
+class HashedUpload:
+    """
+    Destination for one uploaded file while the request body is parsed. Hashes
+    the bytes as they arrive and stops the parse as soon as the file passes
+    max_size, so oversized uploads are never read in full.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.size = 0
+        self.sha256 = hashlib.sha256()
+        self.file = tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY_LIMIT, mode='rb+')
+
+    def write(self, data):
+        self.size += len(data)
+        if self.size > self.max_size:
+            raise FileTooLarge(self.max_size)
+        self.sha256.update(data)
+        return self.file.write(data)
+
+    def hexdigest(self):
+        return self.sha256.hexdigest()
+
+    def __getattr__(self, name):
+        return getattr(self.file, name)
+
+
+def parse_upload(max_size=MAX_FILE_SIZE):
+    """
+    Parse the current multipart request in one pass, spooling every file
+    through a HashedUpload. Returns (form, files); each file's stream is its
+    HashedUpload, already rewound. Raises FileTooLarge. Use this instead of
+    request.form / request.files, which would parse the body again.
+    """
+    if request.content_length is not None and request.content_length > max_size + MAX_FORM_OVERHEAD:
+        raise FileTooLarge(max_size)
+
+    def stream_factory(total_content_length, content_type, filename, content_length=None):
+        return HashedUpload(max_size)
+
+    _, form, files = parse_form_data(
+        request.environ, stream_factory=stream_factory, max_form_memory_size=MAX_FORM_OVERHEAD + PARSER_READ_SIZE
+    )
+    return form, files
+
+
+def content_hash(file):
+    """SHA-256 hex digest of a file returned by parse_upload"""
+    return file.stream.hexdigest()
+
+
+@contextmanager
+def upload_contents(file):
+    """
+    The bytes of a file returned by parse_upload: read if it is still in
+    memory, else memory-mapped from its spool file. Leaves the file rewound.
+    """
+    upload = file.stream
+    if upload.size <= SPOOL_MEMORY_LIMIT:
+        data = upload.read()
+        upload.seek(0)
+        yield data
+        return
+    # Past SPOOL_MEMORY_LIMIT the spool has already rolled over to disk
+    upload.flush()
+    with map_file(upload) as data:
+        yield data
+
+
+# Uploaded documents are stored under the SHA-256 of their bytes, so the same
+# file uploaded again, by anyone and under any title, shares one object. An
+# object is only deleted once no resume or cover letter points at it.
+# store_upload and release_file take a per-hash lock, held until the row that
+# uses the object commits, so a release can't count zero references and delete
+# an object that an upload has just decided to reuse.
+
+def lock_content(file_hash):
+    """Lock one content hash until the session's transaction ends (Postgres only)"""
+    if db.session.get_bind().dialect.name == 'postgresql':
+        db.session.execute(db.text("SELECT pg_advisory_xact_lock(hashtext(:hash))"), {"hash": file_hash})
+
+
+def file_references(file_url, file_hash):
+    return sum(
+        model.query.filter_by(content_hash=file_hash, file_url=file_url).count()
+        for model in (Resume, CoverLetter)
+    )
+
+
+def store_upload(file):
+    """
+    Store a file returned by parse_upload under its content hash. Returns
+    upload_file_to_s3's result; a file that is already stored is not sent
+    to S3 again. Commit the row that uses it promptly: that ends the lock.
+    """
+    file_hash = content_hash(file)
+    lock_content(file_hash)
+    key = content_addressed_key(file_hash, file.filename)
+    if file_references(object_url(key), file_hash):
+        return {"url": object_url(key)}
+    return upload_file_to_s3(file, key=key)
+
+
+def release_file(file_url, file_hash):
+    """
+    Delete a stored file unless another row still references it. Call after
+    the row that used it has been deleted or repointed and committed.
+    """
+    is_content_addressed = file_hash is not None and file_url.rsplit('/', 1)[-1].split('.', 1)[0] == file_hash
+    if not is_content_addressed:
+        return remove_file_from_s3(file_url)
+    try:
+        lock_content(file_hash)
+        if file_references(file_url, file_hash):
+            return True
+        return remove_file_from_s3(file_url)
+    finally:
+        db.session.commit()  # releases the lock
+
+
+def known_extracted_text(file_hash):
+    """Text already extracted from a resume with the same content, if any"""
+    return db.session.query(Resume.extracted_text) \
+        .filter(Resume.content_hash == file_hash, Resume.extracted_text.isnot(None)) \
+        .limit(1).scalar()
+
+
+# Direct uploads: the client gets a presigned POST and an upload token naming
+# the object key, uploads to S3, then hands the token back to the completion
+# callback. Signing the token means a client can only register keys issued to it.
+
+def read_direct_upload(file_url, extract=None):
+    """
+    (content hash, extracted text) of a completed direct upload, read from
+    storage once. The object keeps its random key, but the hash lets it reuse
+    the text and analysis of identical files. Text comes from a resume with
+    the same content or else extract(file_bytes); it is None without
+    `extract`. Returns (None, None) if the file isn't stored.
+    """
+    with storage.open(file_url) as file_bytes:
+        if file_bytes is None:
+            return None, None
+        file_hash = hash_bytes(file_bytes)
+        if extract is None:
+            return file_hash, None
+        return file_hash, known_extracted_text(file_hash) or extract(file_bytes)
+
+
+def _upload_serializer():
+    return URLSafeTimedSerializer(current_app.config['SECRET_KEY'], salt='direct-upload')
+
+
+def issue_upload_token(kind, user_id, key):
+    return _upload_serializer().dumps({'kind': kind, 'user_id': user_id, 'key': key})
+
+
+def read_upload_token(token, kind, user_id):
+    """The object key a token was issued for, or None if it is invalid, expired or someone else's"""
+    if not isinstance(token, str):
+        return None
+    try:
+        claims = _upload_serializer().loads(token, max_age=UPLOAD_TOKEN_MAX_AGE)
+    except BadSignature:
+        return None
+    if claims.get('kind') != kind or claims.get('user_id') != user_id:
+        return None
+    return claims.get('key')
@@ -1,6 +1,7 @@
 from flask import Blueprint, jsonify, request
 from flask_login import login_required, current_user
 from app.models import db, User
+from .serialization import json_response
 
 user_routes = Blueprint('users', __name__)
 
@@ -10,7 +11,7 @@ user_routes = Blueprint('users', __name__)
 @login_required
 def get_users():
     users = User.query.all()
-    return jsonify({'users': [user.to_dict() for user in users]}), 200
+    return json_response({'users': [user.to_dict() for user in users]})
 
 
 # Get a single user by id (login required)
@@ -18,7 +19,7 @@ def get_users():
 @login_required
 def get_user(id):
     user = User.query.get_or_404(id)
-    return jsonify(user.to_dict()), 200
+    return json_response(user.to_dict())
 
 
 # Update a user (login required, only self)
@@ -62,7 +63,7 @@ def update_user(id):
 
     db.session.commit()
 
-    return jsonify(user.to_dict()), 200
+    return json_response(user.to_dict())
 
 # Delete a user (login required, only self)
 @user_routes.route('/<int:id>', methods=['DELETE'])
@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
 from flask_login import login_required, current_user
 from app.models import db, WorkExperience
+from .serialization import json_response
 from datetime import datetime
 
 work_routes = Blueprint('work_experiences', __name__)
@@ -28,14 +29,14 @@ def create_work_experience():
 
     db.session.add(work)
     db.session.commit()
-    return jsonify(work.to_dict()), 201
+    return json_response(work.to_dict(), 201)
 
 
 @work_routes.route('/', methods=['GET'])
 @login_required
 def get_all_my_work_experiences():
     works = WorkExperience.query.filter_by(user_id=current_user.id).all()
-    return jsonify({'work_experiences': [w.to_dict() for w in works]}), 200
+    return json_response({'work_experiences': [w.to_dict() for w in works]})
 
 
 @work_routes.route('/<int:id>', methods=['GET'])
@@ -44,7 +45,7 @@ def get_work_experience_by_id(id):
     work = WorkExperience.query.get_or_404(id)
     if work.user_id != current_user.id:
         return jsonify({'error': 'Unauthorized'}), 403
-    return jsonify(work.to_dict()), 200
+    return json_response(work.to_dict())
 
 
 @work_routes.route('/<int:id>', methods=['PUT'])
@@ -67,7 +68,7 @@ def update_work_experience(id):
         work.end_date = parse_date(data['end_date'])
 
     db.session.commit()
-    return jsonify(work.to_dict()), 200
+    return json_response(work.to_dict())
 
 
 @work_routes.route('/<int:id>', methods=['DELETE'])
@@ -1,11 +1,20 @@
 import os
+from sqlalchemy.pool import NullPool
+from app.models.db import MeteredQueuePool
 
 
-class Config:
+def env_bool(name, default=False):
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.lower() in ('1', 'true', 'yes', 'on')
+
+
+class BaseConfig:
     SECRET_KEY = os.environ.get('SECRET_KEY', 'dev-secret-key-for-vercel')
     FLASK_RUN_PORT = os.environ.get('FLASK_RUN_PORT')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
-    
+
     # Handle database URL for both development and production
     database_url = os.environ.get('DATABASE_URL')
     if database_url:
@@ -17,5 +26,104 @@ class Config:
     else:
         # Use SQLite for local development and Vercel deployments without DATABASE_URL
         SQLALCHEMY_DATABASE_URI = 'sqlite:///jobhatch.db'
-    
-    SQLALCHEMY_ECHO = True
+
+    SQLALCHEMY_ECHO = env_bool('SQLALCHEMY_ECHO')
+
+    # Pool settings; each can be overridden with the matching DB_* environment variable
+    DB_POOL_MODE = 'queue'  # 'queue', or 'null' to open a connection per checkout (external pooler)
+    DB_POOL_SIZE = 5
+    DB_MAX_OVERFLOW = 10
+    DB_POOL_TIMEOUT = 30  # seconds to wait for a free connection before failing
+    DB_POOL_RECYCLE = 1800  # seconds before a connection is replaced
+    DB_POOL_PRE_PING = True
+    DB_STATEMENT_TIMEOUT_MS = 30000  # Postgres only, not applied in null pool mode; 0 disables it
+
+    @classmethod
+    def setting(cls, name, cast=str):
+        value = os.environ.get(name)
+        if value is None:
+            return getattr(cls, name)
+        return env_bool(name) if cast is bool else cast(value)
+
+    @classmethod
+    def engine_options(cls):
+        if not cls.SQLALCHEMY_DATABASE_URI.startswith('postgresql'):
+            # Flask-SQLAlchemy picks suitable pools for SQLite itself
+            return {}
+
+        options = {'pool_pre_ping': cls.setting('DB_POOL_PRE_PING', bool)}
+        if cls.setting('DB_POOL_MODE') == 'null':
+            options['poolclass'] = NullPool
+            # Transaction-mode poolers reject the `options` startup parameter,
+            # so the timeout is set on the database role instead (see README)
+            return options
+
+        options.update(
+            poolclass=MeteredQueuePool,
+            pool_size=cls.setting('DB_POOL_SIZE', int),
+            max_overflow=cls.setting('DB_MAX_OVERFLOW', int),
+            pool_timeout=cls.setting('DB_POOL_TIMEOUT', float),
+            pool_recycle=cls.setting('DB_POOL_RECYCLE', int),
+        )
+
+        statement_timeout = cls.setting('DB_STATEMENT_TIMEOUT_MS', int)
+        if statement_timeout:
+            options['connect_args'] = {'options': f'-c statement_timeout={statement_timeout}'}
+        return options
+
+
+class DevelopmentConfig(BaseConfig):
+    SQLALCHEMY_ECHO = env_bool('SQLALCHEMY_ECHO', True)
+
+
+class TestingConfig(BaseConfig):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = os.environ.get('TEST_DATABASE_URL', 'sqlite://')
+    DB_POOL_SIZE = 2
+    DB_MAX_OVERFLOW = 0
+
+
+class ProductionConfig(BaseConfig):
+    DB_POOL_SIZE = 10
+    DB_MAX_OVERFLOW = 5
+    DB_POOL_TIMEOUT = 10
+    DB_STATEMENT_TIMEOUT_MS = 15000
+
+
+class ServerlessConfig(ProductionConfig):
+    # Each function instance serves one request at a time and may be frozen
+    # between invocations, so keep at most one connection and let a
+    # transaction-mode pooler (PgBouncer, Supavisor...) share them.
+    DB_POOL_MODE = 'null'
+    DB_POOL_SIZE = 1
+    DB_MAX_OVERFLOW = 0
+    DB_POOL_RECYCLE = 300
+
+
+CONFIGS = {
+    'development': DevelopmentConfig,
+    'testing': TestingConfig,
+    'production': ProductionConfig,
+    'serverless': ServerlessConfig,
+}
+
+
+def get_config(name=None):
+    """Config class for APP_CONFIG, falling back to the deployment environment"""
+    name = name or os.environ.get('APP_CONFIG')
+    if not name:
+        if os.environ.get('VERCEL'):
+            name = 'serverless'
+        elif os.environ.get('FLASK_ENV') == 'production':
+            name = 'production'
+        else:
+            name = 'development'
+    if name not in CONFIGS:
+        raise ValueError(f"Unknown APP_CONFIG '{name}', expected one of: {', '.join(CONFIGS)}")
+
+    config = CONFIGS[name]
+    config.SQLALCHEMY_ENGINE_OPTIONS = config.engine_options()
+    return config
+
+
+Config = get_config()
@@ -18,4 +18,8 @@ from .cover_letter import CoverLetter
 from .payment_record import PaymentRecord
 from .subscription_plan import SubscriptionPlan
 from .user_subscription import UserSubscription
+from .llm_cache_entry import LLMCacheEntry
+from .ai_task import AITask
+from .ai_usage_record import AIUsageRecord
+from .job_vector import JobVector
 from .db import environment, SCHEMA
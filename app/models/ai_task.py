@@ -0,0 +1,43 @@
+from .db import db, environment, SCHEMA, add_prefix_for_prod
+from sqlalchemy.sql import func
+import json
+
+class AITask(db.Model):
+    __tablename__ = 'ai_tasks'
+
+    if environment == "production":
+        __table_args__ = (
+            db.Index('ix_ai_tasks_status_created_at', 'status', 'created_at'),
+            {'schema': SCHEMA}
+        )
+    else:
+        __table_args__ = (
+            db.Index('ix_ai_tasks_status_created_at', 'status', 'created_at'),
+        )
+
+    id = db.Column(db.String(32), primary_key=True)  # uuid4 hex
+    user_id = db.Column(db.Integer, db.ForeignKey(add_prefix_for_prod('users.id')), nullable=False, index=True)
+    kind = db.Column(db.String(50), nullable=False)  # e.g. analyze_resume, match_resume_to_job
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending, running, succeeded, failed
+    payload = db.Column(db.Text)  # JSON arguments for the task handler
+    result = db.Column(db.Text)  # JSON body the synchronous endpoint would have returned
+    status_code = db.Column(db.Integer)  # HTTP status the synchronous endpoint would have returned
+    created_at = db.Column(db.DateTime(timezone=True), server_default=func.now())
+    started_at = db.Column(db.DateTime(timezone=True), nullable=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # claims so far; the latest one holds the lease
+    finished_at = db.Column(db.DateTime(timezone=True), nullable=True)
+
+    user = db.relationship("User")
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "user_id": self.user_id,
+            "kind": self.kind,
+            "status": self.status,
+            "result": json.loads(self.result) if self.result else None,
+            "status_code": self.status_code,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
@@ -0,0 +1,42 @@
+from .db import db, environment, SCHEMA, add_prefix_for_prod
+from sqlalchemy.sql import func
+
+class AIUsageRecord(db.Model):
+    __tablename__ = 'ai_usage_records'
+
+    if environment == "production":
+        __table_args__ = (
+            db.Index('ix_ai_usage_records_user_id_feature_created_at', 'user_id', 'feature', 'created_at'),
+            {'schema': SCHEMA}
+        )
+    else:
+        __table_args__ = (
+            db.Index('ix_ai_usage_records_user_id_feature_created_at', 'user_id', 'feature', 'created_at'),
+        )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey(add_prefix_for_prod('users.id')), nullable=False)
+    feature = db.Column(db.String(50), nullable=False)  # e.g. resume_analysis, job_match, ai_chat
+    model = db.Column(db.String(50), nullable=False)
+    prompt_tokens = db.Column(db.Integer, nullable=True)  # None for cached replies
+    completion_tokens = db.Column(db.Integer, nullable=True)
+    total_tokens = db.Column(db.Integer, nullable=True)
+    latency_ms = db.Column(db.Integer, nullable=False)
+    cache_hit = db.Column(db.Boolean, nullable=False, default=False)  # served from the LLM cache, not billed
+    created_at = db.Column(db.DateTime(timezone=True), server_default=func.now())
+
+    user = db.relationship("User")
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "user_id": self.user_id,
+            "feature": self.feature,
+            "model": self.model,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "total_tokens": self.total_tokens,
+            "latency_ms": self.latency_ms,
+            "cache_hit": self.cache_hit,
+            "created_at": self.created_at,
+        }
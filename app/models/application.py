@@ -5,11 +5,18 @@ class Application(db.Model):
     __tablename__ = 'applications'
 
     if environment == "production":
-        __table_args__ = {'schema': SCHEMA}
+        __table_args__ = (
+            db.Index('uq_applications_user_id_job_id', 'user_id', 'job_id', unique=True),
+            {'schema': SCHEMA}
+        )
+    else:
+        __table_args__ = (
+            db.Index('uq_applications_user_id_job_id', 'user_id', 'job_id', unique=True),
+        )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey(add_prefix_for_prod('users.id')), nullable=False)
-    job_id = db.Column(db.Integer, db.ForeignKey(add_prefix_for_prod('jobs.id')), nullable=False)
+    job_id = db.Column(db.Integer, db.ForeignKey(add_prefix_for_prod('jobs.id')), nullable=False, index=True)
     cover_letter = db.Column(db.Text)
     status = db.Column(db.String(50), default='pending')
     applied_at = db.Column(db.DateTime(timezone=True), server_default=func.now())
@@ -18,8 +25,9 @@ class Application(db.Model):
     user = db.relationship("User", back_populates="applications")
     job = db.relationship("Job", back_populates="applications")
 
-    def to_dict(self):
-        return {
+    def to_dict(self, include_job=False):
+        # Callers passing include_job should eager-load Application.job (and Job.company)
+        data = {
             'id': self.id,
             'user_id': self.user_id,
             'job_id': self.job_id,
@@ -27,3 +35,6 @@ class Application(db.Model):
             'status': self.status,
             'applied_at': self.applied_at
         }
+        if include_job:
+            data['job'] = self.job.to_dict() if self.job else None
+        return data
@@ -6,13 +6,17 @@ class Conversation(db.Model):
 
     if environment == "production":
         __table_args__ = (
-            db.UniqueConstraint('user_1_id', 'user_2_id', name='unique_conversation_between_users'),
+            db.Index('unique_conversation_between_users', 'user_1_id', 'user_2_id', unique=True),
             {'schema': SCHEMA}
         )
+    else:
+        __table_args__ = (
+            db.Index('unique_conversation_between_users', 'user_1_id', 'user_2_id', unique=True),
+        )
 
     id = db.Column(db.Integer, primary_key=True)
     user_1_id = db.Column(db.Integer, db.ForeignKey(add_prefix_for_prod('users.id')), nullable=False)
-    user_2_id = db.Column(db.Integer, db.ForeignKey(add_prefix_for_prod('users.id')), nullable=False)
+    user_2_id = db.Column(db.Integer, db.ForeignKey(add_prefix_for_prod('users.id')), nullable=False, index=True)
     created_at = db.Column(db.DateTime(timezone=True), server_default=func.now())
     deleted_by_user_1 = db.Column(db.Boolean, nullable=False, server_default='0')
     deleted_by_user_2 = db.Column(db.Boolean, nullable=False, server_default='0')
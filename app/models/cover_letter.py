@@ -5,13 +5,21 @@ class CoverLetter(db.Model):
     __tablename__ = 'cover_letters'
 
     if environment == "production":
-        __table_args__ = {'schema': SCHEMA}
+        __table_args__ = (
+            db.Index('ix_cover_letters_user_id_uploaded_at', 'user_id', 'uploaded_at'),
+            {'schema': SCHEMA}
+        )
+    else:
+        __table_args__ = (
+            db.Index('ix_cover_letters_user_id_uploaded_at', 'user_id', 'uploaded_at'),
+        )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey(add_prefix_for_prod('users.id')), nullable=False)
     file_url = db.Column(db.String(255), nullable=False)
     title = db.Column(db.String(255))
     extracted_text = db.Column(db.Text)
+    content_hash = db.Column(db.String(64), index=True)  # sha256 of the uploaded file
     uploaded_at = db.Column(db.DateTime(timezone=True), server_default=func.now())
 
     user = db.relationship("User", back_populates="cover_letters")
@@ -1,6 +1,11 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import exc
+from sqlalchemy.pool import QueuePool
 
+import logging
 import os
+import threading
+import time
 environment = os.getenv("FLASK_ENV")
 SCHEMA = os.environ.get("SCHEMA")
 
@@ -13,3 +18,51 @@ def add_prefix_for_prod(attr):
         return f"{SCHEMA}.{attr}"
     else:
         return attr
+
+
+logger = logging.getLogger(__name__)
+
+SLOW_CHECKOUT_SECONDS = float(os.getenv('DB_SLOW_CHECKOUT_SECONDS', 0.5))
+
+_pool_stats = {"checkouts": 0, "timeouts": 0, "slow_checkouts": 0, "wait_seconds_total": 0.0, "wait_seconds_max": 0.0}
+_pool_stats_lock = threading.Lock()
+
+
+class MeteredQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a connection"""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            with _pool_stats_lock:
+                _pool_stats['timeouts'] += 1
+            logger.warning("Database pool exhausted: %s", self.status())
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            with _pool_stats_lock:
+                _pool_stats['checkouts'] += 1
+                _pool_stats['wait_seconds_total'] += waited
+                _pool_stats['wait_seconds_max'] = max(_pool_stats['wait_seconds_max'], waited)
+                if waited >= SLOW_CHECKOUT_SECONDS:
+                    _pool_stats['slow_checkouts'] += 1
+            if waited >= SLOW_CHECKOUT_SECONDS:
+                logger.warning("Waited %.2fs for a database connection: %s", waited, self.status())
+
+
+def pool_stats():
+    """Checkout counters for this process, plus the live state of the engine's pool when there is one"""
+    with _pool_stats_lock:
+        stats = dict(_pool_stats)
+    stats['wait_seconds_avg'] = stats['wait_seconds_total'] / stats['checkouts'] if stats['checkouts'] else 0.0
+    try:
+        pool = db.engine.pool
+    except RuntimeError:
+        # Outside an application context
+        return stats
+    stats['pool'] = pool.__class__.__name__
+    if isinstance(pool, QueuePool):
+        stats.update(size=pool.size(), checked_out=pool.checkedout(), overflow=pool.overflow(), idle=pool.checkedin())
+    return stats
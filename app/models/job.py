@@ -1,11 +1,19 @@
 from .db import db, environment, SCHEMA,add_prefix_for_prod
+from sqlalchemy import event, DDL
 from sqlalchemy.sql import func
 
 class Job(db.Model):
     __tablename__ = 'jobs'
 
     if environment == "production":
-        __table_args__ = {'schema': SCHEMA}
+        __table_args__ = (
+            db.Index('ix_jobs_created_at_id', 'created_at', 'id'),
+            {'schema': SCHEMA}
+        )
+    else:
+        __table_args__ = (
+            db.Index('ix_jobs_created_at_id', 'created_at', 'id'),
+        )
 
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(255), nullable=False)
@@ -23,8 +31,8 @@ class Job(db.Model):
     equity_min = db.Column(db.Float)
     equity_max = db.Column(db.Float)
     job_type = db.Column(db.String(50))
-    company_id = db.Column(db.Integer, db.ForeignKey(add_prefix_for_prod('companies.id')), nullable=True)
-    posted_by = db.Column(db.Integer, db.ForeignKey(add_prefix_for_prod('users.id')), nullable=True)
+    company_id = db.Column(db.Integer, db.ForeignKey(add_prefix_for_prod('companies.id')), nullable=True, index=True)
+    posted_by = db.Column(db.Integer, db.ForeignKey(add_prefix_for_prod('users.id')), nullable=True, index=True)
     created_at = db.Column(db.DateTime(timezone=True), server_default=func.now())
     status = db.Column(db.String(50), default='open')
 
@@ -60,3 +68,36 @@ class Job(db.Model):
             "status": self.status,
             "company": self.company.to_dict() if self.company else None
         }
+
+
+# Full-text search index over title, description and skills.
+# Postgres keeps a generated tsvector column with a GIN index; SQLite keeps an
+# external-content FTS5 table synced by triggers. Both stay current on every
+# insert/update/delete without application code. The same DDL is applied to
+# existing databases by the add_job_search_index migration.
+for statement in [
+    "ALTER TABLE %(fullname)s ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(skills, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'C')) STORED",
+    "CREATE INDEX ix_jobs_search_vector ON %(fullname)s USING GIN (search_vector)",
+]:
+    event.listen(Job.__table__, 'after_create', DDL(statement).execute_if(dialect='postgresql'))
+
+for statement in [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS jobs_fts USING fts5("
+    "title, description, skills, content='jobs', content_rowid='id', tokenize='porter unicode61')",
+    "CREATE TRIGGER IF NOT EXISTS jobs_fts_ai AFTER INSERT ON jobs BEGIN "
+    "INSERT INTO jobs_fts(rowid, title, description, skills) "
+    "VALUES (new.id, new.title, new.description, new.skills); END",
+    "CREATE TRIGGER IF NOT EXISTS jobs_fts_ad AFTER DELETE ON jobs BEGIN "
+    "INSERT INTO jobs_fts(jobs_fts, rowid, title, description, skills) "
+    "VALUES ('delete', old.id, old.title, old.description, old.skills); END",
+    "CREATE TRIGGER IF NOT EXISTS jobs_fts_au AFTER UPDATE OF title, description, skills ON jobs BEGIN "
+    "INSERT INTO jobs_fts(jobs_fts, rowid, title, description, skills) "
+    "VALUES ('delete', old.id, old.title, old.description, old.skills); "
+    "INSERT INTO jobs_fts(rowid, title, description, skills) "
+    "VALUES (new.id, new.title, new.description, new.skills); END",
+]:
+    event.listen(Job.__table__, 'after_create', DDL(statement).execute_if(dialect='sqlite'))
+event.listen(Job.__table__, 'before_drop', DDL("DROP TABLE IF EXISTS jobs_fts").execute_if(dialect='sqlite'))
@@ -0,0 +1,18 @@
+from .db import db, environment, SCHEMA
+from sqlalchemy.sql import func
+
+class JobVector(db.Model):
+    """
+    Stored embedding of a job, shared by every worker's in-memory index. A
+    deleted job keeps its row with deleted=True so other workers see the
+    removal when they sync.
+    """
+    __tablename__ = 'job_vectors'
+
+    if environment == "production":
+        __table_args__ = {'schema': SCHEMA}
+
+    job_id = db.Column(db.Integer, primary_key=True)  # no foreign key: the row outlives a deleted job
+    vector = db.Column(db.LargeBinary, nullable=False)  # float32 bytes, empty when deleted
+    deleted = db.Column(db.Boolean, nullable=False, default=False)
+    updated_at = db.Column(db.DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), index=True)
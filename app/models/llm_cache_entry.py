@@ -0,0 +1,21 @@
+from .db import db, environment, SCHEMA
+from sqlalchemy.sql import func
+
+class LLMCacheEntry(db.Model):
+    __tablename__ = 'llm_cache_entries'
+
+    if environment == "production":
+        __table_args__ = {'schema': SCHEMA}
+
+    key = db.Column(db.String(64), primary_key=True)  # sha256 of (model, temperature, messages)
+    response = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime(timezone=True), server_default=func.now())
+    expires_at = db.Column(db.DateTime(timezone=True), nullable=False, index=True)
+
+    def to_dict(self):
+        return {
+            "key": self.key,
+            "response": self.response,
+            "created_at": self.created_at,
+            "expires_at": self.expires_at,
+        }
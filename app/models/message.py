@@ -5,16 +5,27 @@ class Message(db.Model):
     __tablename__ = 'messages'
 
     if environment == "production":
-        __table_args__ = {'schema': SCHEMA}
+        __table_args__ = (
+            db.Index('ix_messages_conversation_id_sent_at_id', 'conversation_id', 'sent_at', 'id'),
+            db.Index('ix_messages_conversation_id_updated_at_id', 'conversation_id', 'updated_at', 'id'),
+            {'schema': SCHEMA}
+        )
+    else:
+        __table_args__ = (
+            db.Index('ix_messages_conversation_id_sent_at_id', 'conversation_id', 'sent_at', 'id'),
+            db.Index('ix_messages_conversation_id_updated_at_id', 'conversation_id', 'updated_at', 'id'),
+        )
 
     id = db.Column(db.Integer, primary_key=True)
     conversation_id = db.Column(db.Integer, db.ForeignKey(add_prefix_for_prod('conversations.id')), nullable=False)
-    sender_id = db.Column(db.Integer, db.ForeignKey(add_prefix_for_prod('users.id')), nullable=False)
+    sender_id = db.Column(db.Integer, db.ForeignKey(add_prefix_for_prod('users.id')), nullable=False, index=True)
     message_body = db.Column(db.Text, nullable=False)
     sent_at = db.Column(db.DateTime(timezone=True), server_default=func.now())
     read_at = db.Column(db.DateTime(timezone=True), nullable=True)
     is_recalled = db.Column(db.Boolean, nullable=False, server_default='0')
     edited_at = db.Column(db.DateTime(timezone=True), nullable=True)
+    # Bumped by every change (edit, recall, read) so clients can sync deltas
+    updated_at = db.Column(db.DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
     conversation = db.relationship("Conversation", back_populates="messages")
     sender = db.relationship("User", back_populates="messages_sent", foreign_keys=[sender_id])
@@ -28,5 +39,6 @@ class Message(db.Model):
             'sent_at': self.sent_at,
             'read_at': self.read_at,
             'is_recalled': self.is_recalled,
-            'edited_at': self.edited_at
+            'edited_at': self.edited_at,
+            'updated_at': self.updated_at
         }
@@ -8,8 +8,8 @@ class PaymentRecord(db.Model):
         __table_args__ = {'schema': SCHEMA}
 
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey(add_prefix_for_prod('users.id')), nullable=False)
-    subscription_id = db.Column(db.Integer, db.ForeignKey(add_prefix_for_prod('user_subscriptions.id')), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey(add_prefix_for_prod('users.id')), nullable=False, index=True)
+    subscription_id = db.Column(db.Integer, db.ForeignKey(add_prefix_for_prod('user_subscriptions.id')), nullable=False, index=True)
     amount = db.Column(db.Float, nullable=False)
     currency = db.Column(db.String(10), server_default='USD')
     payment_method = db.Column(db.String(50))
@@ -5,11 +5,18 @@ class ResumeJobMatch(db.Model):
     __tablename__ = 'resume_job_matches'
 
     if environment == "production":
-        __table_args__ = {'schema': SCHEMA}
+        __table_args__ = (
+            db.Index('uq_resume_job_matches_resume_id_job_id', 'resume_id', 'job_id', unique=True),
+            {'schema': SCHEMA}
+        )
+    else:
+        __table_args__ = (
+            db.Index('uq_resume_job_matches_resume_id_job_id', 'resume_id', 'job_id', unique=True),
+        )
 
     id = db.Column(db.Integer, primary_key=True)
     resume_id = db.Column(db.Integer, db.ForeignKey(add_prefix_for_prod('resumes.id')), nullable=False)
-    job_id = db.Column(db.Integer, db.ForeignKey(add_prefix_for_prod('jobs.id')), nullable=False)
+    job_id = db.Column(db.Integer, db.ForeignKey(add_prefix_for_prod('jobs.id')), nullable=False, index=True)
     match_score = db.Column(db.Float)
     match_summary = db.Column(db.Text)
     matched_at = db.Column(db.DateTime(timezone=True), server_default=func.now())
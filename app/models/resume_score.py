@@ -5,7 +5,14 @@ class ResumeScore(db.Model):
     __tablename__ = 'resume_scores'
 
     if environment == "production":
-        __table_args__ = {'schema': SCHEMA}
+        __table_args__ = (
+            db.Index('ix_resume_scores_resume_id_evaluated_at', 'resume_id', 'evaluated_at'),
+            {'schema': SCHEMA}
+        )
+    else:
+        __table_args__ = (
+            db.Index('ix_resume_scores_resume_id_evaluated_at', 'resume_id', 'evaluated_at'),
+        )
 
     id = db.Column(db.Integer, primary_key=True)
     resume_id = db.Column(db.Integer, db.ForeignKey(add_prefix_for_prod('resumes.id')), nullable=False)
@@ -0,0 +1,89 @@
+"""
+Import-time profile of the blueprints, from `python -X importtime`.
+
+    python benchmarks/import_time.py            # every app/api/*_routes.py
+    python benchmarks/import_time.py job_routes auth_routes --top 15
+
+Each blueprint is imported in a fresh interpreter (median of --repeat runs),
+which is what a cold start pays for it. The report lists the cumulative
+import time per blueprint and which of the heavy optional packages the
+import pulled in, then the top-level packages that cost the most when every
+blueprint is imported together, as the full app does.
+"""
+import argparse
+import glob
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+HEAVY = ('openai', 'boto3', 'botocore', 'fitz', 'docx', 'reportlab', 'fpdf', 'numpy')
+LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+
+def profile(modules):
+    """{package: (self us, cumulative us, depth)} for one interpreter importing `modules`"""
+    code = ';'.join(f'import app.api.{module}' for module in modules)
+    env = dict(os.environ, OPENAI_API_KEY=os.getenv('OPENAI_API_KEY', 'benchmark'))
+    env.pop('FLASK_ENV', None)
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=ROOT, env=env, capture_output=True, text=True
+    )
+    if result.returncode:
+        raise ImportError(result.stderr.strip().splitlines()[-1])
+    packages = {}
+    for match in LINE.finditer(result.stderr):
+        self_us, cumulative_us, indent, name = match.groups()
+        packages[name] = (int(self_us), int(cumulative_us), len(indent) // 2)
+    return packages
+
+
+def total_ms(packages):
+    return sum(cumulative for _, cumulative, depth in packages.values() if depth == 0) / 1000
+
+
+def median_profile(modules, repeat):
+    runs = [profile(modules) for _ in range(repeat)]
+    return sorted(runs, key=total_ms)[len(runs) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('modules', nargs='*', help='modules in app/api (default: every *_routes module)')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--top', type=int, default=10, help='heaviest top-level packages to list')
+    args = parser.parse_args()
+
+    modules = args.modules or sorted(
+        os.path.basename(path)[:-3] for path in glob.glob(os.path.join(ROOT, 'app', 'api', '*_routes.py'))
+    )
+    profile([])  # warm the bytecode cache
+
+    print(f"{'blueprint':<32} {'import ms':>10}  heavy packages loaded")
+    importable = []
+    for module in modules:
+        try:
+            packages = median_profile([module], args.repeat)
+        except ImportError as e:
+            print(f"{module:<32} {'failed':>10}  {e}")
+            continue
+        importable.append(module)
+        loaded = [name for name in HEAVY if name in packages]
+        print(f"{module:<32} {total_ms(packages):>10.0f}  {', '.join(loaded) or '-'}")
+
+    packages = median_profile(importable, args.repeat)
+    print(f"\nAll {len(importable)} importable blueprints: {total_ms(packages):.0f} ms")
+    top_level = {}
+    for name, (_, cumulative, _) in packages.items():
+        root = name.split('.')[0]
+        # A root package's own line covers its submodules; keep the largest line seen
+        top_level[root] = max(top_level.get(root, 0), cumulative)
+    for root, cumulative in sorted(top_level.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {root:<30} {cumulative / 1000:>8.0f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+"""
+Time the per-user and per-conversation queries the routes run, on tables
+filled with a large number of synthetic rows, and print each query plan so
+it is visible which index serves it.
+
+    python benchmarks/index_queries.py --rows 2000000
+    BENCH_DATABASE_URL=postgresql://... python benchmarks/index_queries.py
+
+Uses a throwaway SQLite file unless BENCH_DATABASE_URL is set. Never point it
+at a database holding real data: it drops and recreates every table.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+os.environ.pop('FLASK_ENV', None)  # keep tables out of the production schema
+
+from flask import Flask
+from sqlalchemy import text
+from app.models import (
+    db, User, Job, Resume, CoverLetter, Application, ResumeJobMatch, Conversation, Message
+)
+
+BATCH_SIZE = 50000
+JOBS = 10000
+
+
+def make_app(url):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = url
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    return app
+
+
+def insert(table, rows):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == BATCH_SIZE:
+            db.session.execute(table.insert(), batch)
+            batch = []
+    if batch:
+        db.session.execute(table.insert(), batch)
+    db.session.commit()
+
+
+def populate(rows, per_user):
+    users = max(rows // per_user, 2)
+    started = time.perf_counter()
+    insert(User.__table__, ({'id': u, 'username': f'user{u}', 'email': f'user{u}@example.com',
+                             'hashed_password': 'x'} for u in range(1, users + 1)))
+    insert(Job.__table__, ({'id': j, 'title': f'Job {j}'} for j in range(1, JOBS + 1)))
+    insert(Resume.__table__, ({'user_id': 1 + i % users, 'file_url': f'r{i}', 'title': f'Resume {i}'}
+                              for i in range(rows)))
+    insert(CoverLetter.__table__, ({'user_id': 1 + i % users, 'file_url': f'c{i}'} for i in range(rows)))
+    insert(Application.__table__, ({'user_id': 1 + i % users, 'job_id': 1 + (i // users * 7 + i % users) % JOBS}
+                                   for i in range(rows)))
+    insert(ResumeJobMatch.__table__, ({'resume_id': 1 + i % rows, 'job_id': 1 + (i * 13) % JOBS, 'match_score': 50}
+                                      for i in range(rows)))
+    conversations = users
+    insert(Conversation.__table__, ({'id': c, 'user_1_id': c, 'user_2_id': c % users + 1}
+                                    for c in range(1, conversations + 1)))
+    insert(Message.__table__, ({'conversation_id': 1 + i % conversations, 'sender_id': 1 + i % users,
+                                'message_body': 'hello'} for i in range(rows)))
+    print(f"Inserted {rows:,} rows per table for {users:,} users in {time.perf_counter() - started:.1f}s\n")
+    return users
+
+
+def explain(statement, params):
+    prefix = 'EXPLAIN QUERY PLAN ' if db.engine.dialect.name == 'sqlite' else 'EXPLAIN '
+    return [' '.join(str(column) for column in row) for row in db.session.execute(text(prefix + statement), params)]
+
+
+def benchmark(name, statement, params, repeat):
+    db.session.execute(text(statement), params).fetchall()  # warm the cache
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        db.session.execute(text(statement), params).fetchall()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+    print(f"{name:<32} median {statistics.median(timings):7.3f} ms   p99 {p99:7.3f} ms")
+    for line in explain(statement, params):
+        print(f"    {line}")
+
+
+QUERIES = [
+    ('resumes by user', "SELECT * FROM resumes WHERE user_id = :user_id ORDER BY uploaded_at DESC"),
+    ('cover letters by user', "SELECT * FROM cover_letters WHERE user_id = :user_id ORDER BY uploaded_at DESC"),
+    ('applications by user', "SELECT * FROM applications WHERE user_id = :user_id"),
+    ('application by user and job', "SELECT * FROM applications WHERE user_id = :user_id AND job_id = :job_id"),
+    ('match by resume and job', "SELECT * FROM resume_job_matches WHERE resume_id = :resume_id AND job_id = :job_id"),
+    ('conversations by user', "SELECT * FROM conversations WHERE user_1_id = :user_id OR user_2_id = :user_id"),
+    ('latest messages in conversation',
+     "SELECT * FROM messages WHERE conversation_id = :conversation_id ORDER BY sent_at DESC, id DESC LIMIT 50"),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1000000, help='rows in each large table')
+    parser.add_argument('--per-user', type=int, default=20, help='rows per user in each large table')
+    parser.add_argument('--repeat', type=int, default=200, help='timed runs per query')
+    args = parser.parse_args()
+
+    url = os.environ.get('BENCH_DATABASE_URL')
+    path = None
+    if not url:
+        path = os.path.join(tempfile.gettempdir(), 'jobhatch_index_benchmark.db')
+        url = f'sqlite:///{path}'
+
+    app = make_app(url)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        users = populate(args.rows, args.per_user)
+        db.session.execute(text('ANALYZE'))
+        db.session.commit()
+
+        user_id = users // 2
+        params = {'user_id': user_id, 'job_id': 1 + (user_id - 1) % JOBS, 'resume_id': user_id,
+                  'conversation_id': user_id}
+        for name, statement in QUERIES:
+            benchmark(name, statement, params, args.repeat)
+        db.drop_all()
+
+    if path and os.path.exists(path):
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,202 @@
+"""
+Hold many idle server-sent event connections open against one gevent worker
+process, then send a message and time how long the event takes to reach
+every connection.
+
+    python benchmarks/sse_connections.py --connections 5000 --hold 30
+
+With --busy SECONDS the message is sent while another request runs that long
+of CPU-bound work through run_cpu_bound, as text extraction and embedding do;
+add --inline to run it on the event loop instead and see the streams stall.
+
+Starts its own server (gevent WSGI server, throwaway SQLite database) in a
+child process and reports the server's memory use with all connections open.
+"""
+import argparse
+import asyncio
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+EVENTS_PATH = '/api/messages/events'
+
+
+def spin(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        sum(range(1000))
+
+
+def serve(port, database, inline):
+    from gevent import monkey
+    monkey.patch_all()
+
+    sys.path.insert(0, ROOT)
+    os.environ.pop('FLASK_ENV', None)
+    from flask import Flask
+    from flask_login import LoginManager, login_user
+    from gevent.pywsgi import WSGIServer
+    from app.models import db, User, Conversation
+    from app.api.message_routes import message_routes
+    from app.api.cpu_bound import run_cpu_bound
+
+    app = Flask(__name__)
+    app.config.update(SQLALCHEMY_DATABASE_URI=f'sqlite:///{database}', SECRET_KEY='benchmark')
+    db.init_app(app)
+    login_manager = LoginManager(app)
+    login_manager.user_loader(lambda user_id: User.query.get(int(user_id)))
+    app.register_blueprint(message_routes, url_prefix='/api/messages')
+
+    # Benchmark-only shortcut; the real app logs in through /api/auth
+    @app.route('/login/<int:user_id>')
+    def login(user_id):
+        login_user(User.query.get(user_id))
+        return 'ok'
+
+    @app.route('/busy/<float:seconds>')
+    def busy(seconds):
+        spin(seconds) if inline else run_cpu_bound(spin, seconds)
+        return 'ok'
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        db.session.add_all([User(username=f'user{i}', email=f'user{i}@example.com', password='x') for i in (1, 2)])
+        db.session.commit()
+        Conversation.get_or_create(1, 2)
+
+    WSGIServer(('127.0.0.1', port), app, log=None).serve_forever()
+
+
+def session_cookie(base_url, user_id):
+    with urllib.request.urlopen(f'{base_url}/login/{user_id}') as response:
+        return response.headers['Set-Cookie'].split(';', 1)[0]
+
+
+def server_rss_mb(pid):
+    with open(f'/proc/{pid}/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+    return None
+
+
+async def open_stream(port, cookie):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write((
+        f'GET {EVENTS_PATH} HTTP/1.1\r\nHost: 127.0.0.1\r\nAccept: text/event-stream\r\n'
+        f'Cookie: {cookie}\r\n\r\n'
+    ).encode())
+    await writer.drain()
+    buffer = b''
+    while b'event: ready' not in buffer:
+        chunk = await reader.read(4096)
+        if not chunk:
+            raise ConnectionError('stream closed before it was ready')
+        buffer += chunk
+    return reader, writer
+
+
+async def wait_for_message(reader):
+    buffer = b''
+    while b'event: message.created' not in buffer:
+        chunk = await reader.read(4096)
+        if not chunk:
+            raise ConnectionError('stream closed before the message arrived')
+        buffer = buffer[-64:] + chunk
+    return time.perf_counter()
+
+
+def send_message(base_url, cookie):
+    request = urllib.request.Request(
+        f'{base_url}/api/messages/', data=b'{"conversation_id": 1, "message_body": "ping"}',
+        headers={'Content-Type': 'application/json', 'Cookie': cookie}, method='POST'
+    )
+    urllib.request.urlopen(request).read()
+
+
+async def run(args, server_pid):
+    base_url = f'http://127.0.0.1:{args.port}'
+    receiver, sender = session_cookie(base_url, 2), session_cookie(base_url, 1)
+    rss_before = server_rss_mb(server_pid)
+
+    started = time.perf_counter()
+    streams = []
+    for offset in range(0, args.connections, args.batch):
+        batch = range(offset, min(offset + args.batch, args.connections))
+        streams += await asyncio.gather(*(open_stream(args.port, receiver) for _ in batch))
+    print(f"Opened {len(streams):,} streams in {time.perf_counter() - started:.1f}s")
+
+    await asyncio.sleep(args.hold)
+    rss_after = server_rss_mb(server_pid)
+    print(f"Server RSS {rss_before:.0f} MB idle, {rss_after:.0f} MB with {len(streams):,} streams "
+          f"({(rss_after - rss_before) * 1024 / len(streams):.1f} KB per stream) after holding {args.hold}s")
+
+    waiters = [asyncio.ensure_future(wait_for_message(reader)) for reader, _ in streams]
+    if args.busy:
+        loop = asyncio.get_running_loop()
+        busy = loop.run_in_executor(None, lambda: urllib.request.urlopen(f'{base_url}/busy/{args.busy}').read())
+        await asyncio.sleep(0.1)
+    sent_at = time.perf_counter()
+    await asyncio.get_running_loop().run_in_executor(None, send_message, base_url, sender)
+    received = await asyncio.gather(*waiters)
+    latencies = sorted((at - sent_at) * 1000 for at in received)
+    if args.busy:
+        await busy
+    print(f"Fan-out to {len(latencies):,} streams: median {latencies[len(latencies) // 2]:.0f} ms, "
+          f"p99 {latencies[int(len(latencies) * 0.99)]:.0f} ms, max {latencies[-1]:.0f} ms")
+
+    for _, writer in streams:
+        writer.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--connections', type=int, default=2000)
+    parser.add_argument('--hold', type=int, default=10, help='seconds to keep the streams idle')
+    parser.add_argument('--batch', type=int, default=500, help='streams opened concurrently')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--busy', type=float, default=0, help='seconds of CPU-bound work running during the send')
+    parser.add_argument('--inline', action='store_true', help='run the --busy work on the event loop')
+    parser.add_argument('--serve', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--database', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    # Every stream is a file descriptor on both ends
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    wanted = min(hard, args.connections * 2 + 256)
+    if soft < wanted:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (wanted, hard))
+
+    if args.serve:
+        serve(args.port, args.database, args.inline)
+        return
+
+    database = os.path.join(tempfile.gettempdir(), 'jobhatch_sse_benchmark.db')
+    env = dict(os.environ, MESSAGE_STREAM_TIMEOUT=str(args.hold + 120))
+    server = subprocess.Popen(
+        [sys.executable, __file__, '--serve', '--port', str(args.port), '--database', database]
+        + (['--inline'] if args.inline else []), env=env
+    )
+    try:
+        for _ in range(100):
+            try:
+                urllib.request.urlopen(f'http://127.0.0.1:{args.port}/login/1').read()
+                break
+            except OSError:
+                time.sleep(0.1)
+        asyncio.run(run(args, server.pid))
+    finally:
+        server.terminate()
+        server.wait()
+        if os.path.exists(database):
+            os.remove(database)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+Time text extraction from a stored resume: the file read in full into bytes
+(what the S3 backend hands to extract_text) against the local backend's
+memory-mapped open(), on a synthetic PDF of --pages pages.
+
+    python benchmarks/storage_read.py --pages 200 --repeat 50
+
+Uses a throwaway LOCAL_STORAGE_DIR; needs PyMuPDF.
+"""
+import argparse
+import io
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+
+def make_pdf(pages):
+    import fitz
+
+    doc = fitz.open()
+    for number in range(pages):
+        page = doc.new_page()
+        page.insert_text((72, 72), f"Page {number}: " + "experience with Python and SQL " * 20)
+    return doc.tobytes()
+
+
+def median_ms(run, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pages', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    from app.api.storage import LocalStorage
+    from app.api.document_helpers import extract_text
+
+    with tempfile.TemporaryDirectory() as root:
+        storage = LocalStorage(root=root)
+        pdf = make_pdf(args.pages)
+        url = storage.save(io.BytesIO(pdf), 'resume.pdf', 'application/pdf')
+
+        def read_in_full():
+            extract_text(storage.read(url), 'pdf')
+
+        def memory_mapped():
+            with storage.open(url) as data:
+                extract_text(data, 'pdf')
+
+        print(f"{args.pages}-page PDF, {len(pdf) / 1024:.0f} KB")
+        print(f"  {'read in full':<16} {median_ms(read_in_full, args.repeat):>8.2f} ms")
+        print(f"  {'memory-mapped':<16} {median_ms(memory_mapped, args.repeat):>8.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
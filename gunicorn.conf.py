@@ -0,0 +1,25 @@
+import os
+
+# gevent workers hold thousands of idle keep-alive and server-sent event
+# connections each; set GUNICORN_WORKER_CLASS=sync to go back to one request
+# per worker.
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gevent')
+# Message events only reach other workers with MESSAGE_EVENTS_BACKEND=postgres
+workers = int(os.getenv('GUNICORN_WORKERS', 1))
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', 5000))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 60))
+graceful_timeout = 30
+
+
+def post_fork(server, worker):
+    if worker_class == 'gevent':
+        # Let psycopg2 yield to other greenlets while it waits on Postgres
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()
+
+
+def post_worker_init(worker):
+    # Recover AI tasks left pending or running by a worker that died
+    from app.api.ai_task_queue import AI_TASK_INLINE, start_task_workers
+    if not AI_TASK_INLINE:
+        start_task_workers(worker.wsgi)
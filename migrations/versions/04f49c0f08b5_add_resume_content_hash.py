@@ -0,0 +1,30 @@
+"""Add content hash for cached resume text
+
+Revision ID: 04f49c0f08b5
+Revises: 44922a69ab4b
+Create Date: 2026-10-18 17:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+import os
+environment = os.getenv("FLASK_ENV")
+SCHEMA = os.environ.get("SCHEMA")
+
+
+# revision identifiers, used by Alembic.
+revision = '04f49c0f08b5'
+down_revision = '44922a69ab4b'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('resumes', schema=SCHEMA if environment == "production" else None) as batch_op:
+        batch_op.add_column(sa.Column('content_hash', sa.String(length=64), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('resumes', schema=SCHEMA if environment == "production" else None) as batch_op:
+        batch_op.drop_column('content_hash')
@@ -0,0 +1,43 @@
+"""Add messages.updated_at for incremental message sync
+
+Revision ID: 342cb63b0c8a
+Revises: 5183eda061f2
+Create Date: 2026-10-18 20:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+import os
+environment = os.getenv("FLASK_ENV")
+SCHEMA = os.environ.get("SCHEMA")
+
+
+# revision identifiers, used by Alembic.
+revision = '342cb63b0c8a'
+down_revision = '5183eda061f2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    schema = SCHEMA if environment == "production" else None
+    messages = f"{SCHEMA}.messages" if schema else "messages"
+
+    # SQLite can't add a column with a non-constant default, so add it bare,
+    # backfill, then set the default
+    with op.batch_alter_table('messages', schema=schema) as batch_op:
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True))
+    op.execute(f"UPDATE {messages} SET updated_at = COALESCE(edited_at, sent_at)")
+    with op.batch_alter_table('messages', schema=schema) as batch_op:
+        batch_op.alter_column('updated_at', existing_type=sa.DateTime(timezone=True), server_default=sa.func.now())
+
+    op.create_index('ix_messages_conversation_id_updated_at_id', 'messages',
+                    ['conversation_id', 'updated_at', 'id'], unique=False, schema=schema)
+
+
+def downgrade():
+    schema = SCHEMA if environment == "production" else None
+    op.drop_index('ix_messages_conversation_id_updated_at_id', table_name='messages', schema=schema)
+    with op.batch_alter_table('messages', schema=schema) as batch_op:
+        batch_op.drop_column('updated_at')
@@ -0,0 +1,70 @@
+"""Add full-text search index on jobs
+
+Revision ID: 44922a69ab4b
+Revises: 2e91cae4197e
+Create Date: 2026-10-18 17:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+import os
+environment = os.getenv("FLASK_ENV")
+SCHEMA = os.environ.get("SCHEMA")
+
+
+# revision identifiers, used by Alembic.
+revision = '44922a69ab4b'
+down_revision = '2e91cae4197e'
+branch_labels = None
+depends_on = None
+
+JOBS_TABLE = f"{SCHEMA}.jobs" if environment == "production" else "jobs"
+
+
+def upgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute(
+            f"ALTER TABLE {JOBS_TABLE} ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+            "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+            "setweight(to_tsvector('english', coalesce(skills, '')), 'B') || "
+            "setweight(to_tsvector('english', coalesce(description, '')), 'C')) STORED"
+        )
+        op.execute(f"CREATE INDEX ix_jobs_search_vector ON {JOBS_TABLE} USING GIN (search_vector)")
+        return
+
+    op.execute(
+        "CREATE VIRTUAL TABLE jobs_fts USING fts5("
+        "title, description, skills, content='jobs', content_rowid='id', tokenize='porter unicode61')"
+    )
+    op.execute(
+        "CREATE TRIGGER jobs_fts_ai AFTER INSERT ON jobs BEGIN "
+        "INSERT INTO jobs_fts(rowid, title, description, skills) "
+        "VALUES (new.id, new.title, new.description, new.skills); END"
+    )
+    op.execute(
+        "CREATE TRIGGER jobs_fts_ad AFTER DELETE ON jobs BEGIN "
+        "INSERT INTO jobs_fts(jobs_fts, rowid, title, description, skills) "
+        "VALUES ('delete', old.id, old.title, old.description, old.skills); END"
+    )
+    op.execute(
+        "CREATE TRIGGER jobs_fts_au AFTER UPDATE OF title, description, skills ON jobs BEGIN "
+        "INSERT INTO jobs_fts(jobs_fts, rowid, title, description, skills) "
+        "VALUES ('delete', old.id, old.title, old.description, old.skills); "
+        "INSERT INTO jobs_fts(rowid, title, description, skills) "
+        "VALUES (new.id, new.title, new.description, new.skills); END"
+    )
+    # Index the jobs that already exist
+    op.execute("INSERT INTO jobs_fts(jobs_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        # Dropping the column also drops its GIN index
+        op.execute(f"ALTER TABLE {JOBS_TABLE} DROP COLUMN search_vector")
+        return
+
+    op.execute("DROP TRIGGER IF EXISTS jobs_fts_au")
+    op.execute("DROP TRIGGER IF EXISTS jobs_fts_ad")
+    op.execute("DROP TRIGGER IF EXISTS jobs_fts_ai")
+    op.execute("DROP TABLE IF EXISTS jobs_fts")
@@ -0,0 +1,119 @@
+"""Add indexes for per-user lookups, foreign keys and uniqueness the routes assume
+
+Revision ID: 5183eda061f2
+Revises: a0685c03f3c3
+Create Date: 2026-10-18 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+import os
+environment = os.getenv("FLASK_ENV")
+SCHEMA = os.environ.get("SCHEMA")
+
+
+# revision identifiers, used by Alembic.
+revision = '5183eda061f2'
+down_revision = 'a0685c03f3c3'
+branch_labels = None
+depends_on = None
+
+# (name, table, columns, unique)
+INDEXES = [
+    ('uq_applications_user_id_job_id', 'applications', ['user_id', 'job_id'], True),
+    ('ix_applications_job_id', 'applications', ['job_id'], False),
+    ('uq_resume_job_matches_resume_id_job_id', 'resume_job_matches', ['resume_id', 'job_id'], True),
+    ('ix_resume_job_matches_job_id', 'resume_job_matches', ['job_id'], False),
+    ('unique_conversation_between_users', 'conversations', ['user_1_id', 'user_2_id'], True),
+    ('ix_conversations_user_2_id', 'conversations', ['user_2_id'], False),
+    ('ix_messages_conversation_id_sent_at_id', 'messages', ['conversation_id', 'sent_at', 'id'], False),
+    ('ix_messages_sender_id', 'messages', ['sender_id'], False),
+    ('ix_resumes_user_id_uploaded_at', 'resumes', ['user_id', 'uploaded_at'], False),
+    ('ix_cover_letters_user_id_uploaded_at', 'cover_letters', ['user_id', 'uploaded_at'], False),
+    ('ix_resume_scores_resume_id_evaluated_at', 'resume_scores', ['resume_id', 'evaluated_at'], False),
+    ('ix_jobs_created_at_id', 'jobs', ['created_at', 'id'], False),
+    ('ix_jobs_company_id', 'jobs', ['company_id'], False),
+    ('ix_jobs_posted_by', 'jobs', ['posted_by'], False),
+    ('ix_work_experiences_user_id', 'work_experiences', ['user_id'], False),
+    ('ix_education_experiences_user_id', 'education_experiences', ['user_id'], False),
+    ('ix_payment_records_user_id', 'payment_records', ['user_id'], False),
+    ('ix_payment_records_subscription_id', 'payment_records', ['subscription_id'], False),
+]
+
+
+def table(name):
+    return f"{SCHEMA}.{name}" if environment == "production" else name
+
+
+def find_duplicates(table_name, columns):
+    """[(column values..., ids)] for every group of rows sharing `columns`"""
+    key = ", ".join(columns)
+    rows = op.get_bind().execute(sa.text(
+        f"SELECT {key}, COUNT(*) FROM {table(table_name)} GROUP BY {key} HAVING COUNT(*) > 1"
+    )).fetchall()
+    return [tuple(row) for row in rows]
+
+
+def check_no_duplicates():
+    """
+    Applications and matches are user data with no safe way to merge them, so
+    duplicates stop the upgrade with a report for someone to resolve by hand.
+    """
+    problems = []
+    for table_name, columns in (
+        ("applications", ["user_id", "job_id"]),
+        ("resume_job_matches", ["resume_id", "job_id"]),
+    ):
+        for row in find_duplicates(table_name, columns):
+            values = ", ".join(f"{column}={value}" for column, value in zip(columns, row))
+            problems.append(f"{table_name}: {row[-1]} rows with {values}")
+    if problems:
+        raise RuntimeError(
+            "Duplicate rows would violate the new unique indexes; resolve them and re-run:\n  "
+            + "\n  ".join(problems)
+        )
+
+
+def merge_duplicate_conversations():
+    """Fold each duplicate conversation into the oldest one between the same two users"""
+    conversations = table("conversations")
+    messages = table("messages")
+    duplicate_ids = (
+        f"SELECT id FROM {conversations} WHERE id NOT IN "
+        f"(SELECT MIN(id) FROM {conversations} GROUP BY user_1_id, user_2_id)"
+    )
+    op.execute(
+        f"UPDATE {messages} SET conversation_id = ("
+        f"SELECT MIN(keep.id) FROM {conversations} keep "
+        f"JOIN {conversations} dup "
+        f"ON keep.user_1_id = dup.user_1_id AND keep.user_2_id = dup.user_2_id "
+        f"WHERE dup.id = {messages}.conversation_id) "
+        f"WHERE conversation_id IN ({duplicate_ids})"
+    )
+    # The merged conversation stays visible to a participant who hadn't deleted every copy
+    for flag in ("deleted_by_user_1", "deleted_by_user_2"):
+        op.execute(
+            f"UPDATE {conversations} SET {flag} = FALSE "
+            f"WHERE {flag} AND EXISTS (SELECT 1 FROM {conversations} other "
+            f"WHERE other.user_1_id = {conversations}.user_1_id "
+            f"AND other.user_2_id = {conversations}.user_2_id AND NOT other.{flag})"
+        )
+    op.execute(f"DELETE FROM {conversations} WHERE id IN ({duplicate_ids})")
+
+
+def upgrade():
+    schema = SCHEMA if environment == "production" else None
+    check_no_duplicates()
+    merge_duplicate_conversations()
+    # CREATE INDEX CONCURRENTLY doesn't block writes but can't run in a transaction
+    with op.get_context().autocommit_block():
+        for name, table_name, columns, unique in INDEXES:
+            op.create_index(name, table_name, columns, unique=unique, schema=schema, postgresql_concurrently=True)
+
+
+def downgrade():
+    schema = SCHEMA if environment == "production" else None
+    with op.get_context().autocommit_block():
+        for name, table_name, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table_name, schema=schema, postgresql_concurrently=True)
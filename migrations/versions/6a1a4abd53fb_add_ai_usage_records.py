@@ -0,0 +1,47 @@
+"""Add AI usage metering table
+
+Revision ID: 6a1a4abd53fb
+Revises: 342cb63b0c8a
+Create Date: 2026-10-18 21:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+import os
+environment = os.getenv("FLASK_ENV")
+SCHEMA = os.environ.get("SCHEMA")
+
+
+# revision identifiers, used by Alembic.
+revision = '6a1a4abd53fb'
+down_revision = '342cb63b0c8a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    schema = SCHEMA if environment == "production" else None
+    op.create_table('ai_usage_records',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('feature', sa.String(length=50), nullable=False),
+    sa.Column('model', sa.String(length=50), nullable=False),
+    sa.Column('prompt_tokens', sa.Integer(), nullable=True),
+    sa.Column('completion_tokens', sa.Integer(), nullable=True),
+    sa.Column('total_tokens', sa.Integer(), nullable=True),
+    sa.Column('latency_ms', sa.Integer(), nullable=False),
+    sa.Column('cache_hit', sa.Boolean(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], [f'{schema}.users.id' if schema else 'users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    schema=schema
+    )
+    op.create_index('ix_ai_usage_records_user_id_feature_created_at', 'ai_usage_records',
+                    ['user_id', 'feature', 'created_at'], unique=False, schema=schema)
+
+
+def downgrade():
+    schema = SCHEMA if environment == "production" else None
+    op.drop_index('ix_ai_usage_records_user_id_feature_created_at', table_name='ai_usage_records', schema=schema)
+    op.drop_table('ai_usage_records', schema=schema)
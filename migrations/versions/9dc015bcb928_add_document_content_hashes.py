@@ -0,0 +1,36 @@
+"""Add cover_letters.content_hash and index document content hashes
+
+Revision ID: 9dc015bcb928
+Revises: 6a1a4abd53fb
+Create Date: 2026-10-18 22:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+import os
+environment = os.getenv("FLASK_ENV")
+SCHEMA = os.environ.get("SCHEMA")
+
+
+# revision identifiers, used by Alembic.
+revision = '9dc015bcb928'
+down_revision = '6a1a4abd53fb'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    schema = SCHEMA if environment == "production" else None
+    with op.batch_alter_table('cover_letters', schema=schema) as batch_op:
+        batch_op.add_column(sa.Column('content_hash', sa.String(length=64), nullable=True))
+    op.create_index('ix_cover_letters_content_hash', 'cover_letters', ['content_hash'], unique=False, schema=schema)
+    op.create_index('ix_resumes_content_hash', 'resumes', ['content_hash'], unique=False, schema=schema)
+
+
+def downgrade():
+    schema = SCHEMA if environment == "production" else None
+    op.drop_index('ix_resumes_content_hash', table_name='resumes', schema=schema)
+    op.drop_index('ix_cover_letters_content_hash', table_name='cover_letters', schema=schema)
+    with op.batch_alter_table('cover_letters', schema=schema) as batch_op:
+        batch_op.drop_column('content_hash')
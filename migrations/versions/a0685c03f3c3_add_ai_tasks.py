@@ -0,0 +1,48 @@
+"""Add background AI task table
+
+Revision ID: a0685c03f3c3
+Revises: bb5a8c7ddf3a
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+import os
+environment = os.getenv("FLASK_ENV")
+SCHEMA = os.environ.get("SCHEMA")
+
+
+# revision identifiers, used by Alembic.
+revision = 'a0685c03f3c3'
+down_revision = 'bb5a8c7ddf3a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    schema = SCHEMA if environment == "production" else None
+    op.create_table('ai_tasks',
+    sa.Column('id', sa.String(length=32), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=50), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('payload', sa.Text(), nullable=True),
+    sa.Column('result', sa.Text(), nullable=True),
+    sa.Column('status_code', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.Column('started_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], [f'{schema}.users.id' if schema else 'users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    schema=schema
+    )
+    op.create_index('ix_ai_tasks_status_created_at', 'ai_tasks', ['status', 'created_at'], unique=False, schema=schema)
+    op.create_index('ix_ai_tasks_user_id', 'ai_tasks', ['user_id'], unique=False, schema=schema)
+
+
+def downgrade():
+    schema = SCHEMA if environment == "production" else None
+    op.drop_index('ix_ai_tasks_user_id', table_name='ai_tasks', schema=schema)
+    op.drop_index('ix_ai_tasks_status_created_at', table_name='ai_tasks', schema=schema)
+    op.drop_table('ai_tasks', schema=schema)
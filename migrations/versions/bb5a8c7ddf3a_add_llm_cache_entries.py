@@ -0,0 +1,39 @@
+"""Add shared LLM response cache table
+
+Revision ID: bb5a8c7ddf3a
+Revises: 04f49c0f08b5
+Create Date: 2026-10-18 17:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+import os
+environment = os.getenv("FLASK_ENV")
+SCHEMA = os.environ.get("SCHEMA")
+
+
+# revision identifiers, used by Alembic.
+revision = 'bb5a8c7ddf3a'
+down_revision = '04f49c0f08b5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('llm_cache_entries',
+    sa.Column('key', sa.String(length=64), nullable=False),
+    sa.Column('response', sa.Text(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('key'),
+    schema=SCHEMA if environment == "production" else None
+    )
+    op.create_index('ix_llm_cache_entries_expires_at', 'llm_cache_entries', ['expires_at'], unique=False,
+                    schema=SCHEMA if environment == "production" else None)
+
+
+def downgrade():
+    op.drop_index('ix_llm_cache_entries_expires_at', table_name='llm_cache_entries',
+                  schema=SCHEMA if environment == "production" else None)
+    op.drop_table('llm_cache_entries', schema=SCHEMA if environment == "production" else None)
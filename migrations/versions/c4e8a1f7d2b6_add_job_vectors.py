@@ -0,0 +1,39 @@
+"""Add stored job vectors for the semantic matcher
+
+Revision ID: c4e8a1f7d2b6
+Revises: 9dc015bcb928
+Create Date: 2026-10-18 23:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+import os
+environment = os.getenv("FLASK_ENV")
+SCHEMA = os.environ.get("SCHEMA")
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4e8a1f7d2b6'
+down_revision = '9dc015bcb928'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    schema = SCHEMA if environment == "production" else None
+    op.create_table('job_vectors',
+    sa.Column('job_id', sa.Integer(), nullable=False),
+    sa.Column('vector', sa.LargeBinary(), nullable=False),
+    sa.Column('deleted', sa.Boolean(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.PrimaryKeyConstraint('job_id'),
+    schema=schema
+    )
+    op.create_index('ix_job_vectors_updated_at', 'job_vectors', ['updated_at'], unique=False, schema=schema)
+
+
+def downgrade():
+    schema = SCHEMA if environment == "production" else None
+    op.drop_index('ix_job_vectors_updated_at', table_name='job_vectors', schema=schema)
+    op.drop_table('job_vectors', schema=schema)
@@ -0,0 +1,32 @@
+"""Add ai_tasks.attempts for task leases
+
+Revision ID: d7b3f0a9e5c1
+Revises: c4e8a1f7d2b6
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+import os
+environment = os.getenv("FLASK_ENV")
+SCHEMA = os.environ.get("SCHEMA")
+
+
+# revision identifiers, used by Alembic.
+revision = 'd7b3f0a9e5c1'
+down_revision = 'c4e8a1f7d2b6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    schema = SCHEMA if environment == "production" else None
+    with op.batch_alter_table('ai_tasks', schema=schema) as batch_op:
+        batch_op.add_column(sa.Column('attempts', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade():
+    schema = SCHEMA if environment == "production" else None
+    with op.batch_alter_table('ai_tasks', schema=schema) as batch_op:
+        batch_op.drop_column('attempts')
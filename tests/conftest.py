@@ -0,0 +1,79 @@
+import os
+from contextlib import contextmanager
+
+os.environ.pop('FLASK_ENV', None)  # keep tables out of the production schema
+
+import pytest
+from flask import Flask
+from flask_login import LoginManager, login_user
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.models import db, User
+from app.api.serialization import JSONProvider
+
+
+@pytest.fixture
+def make_app():
+    """Build an app on an in-memory SQLite database with the given (blueprint, url_prefix) pairs"""
+    apps = []
+
+    def factory(*blueprints):
+        app = Flask(__name__)
+        app.json = JSONProvider(app)
+        app.config.update(SQLALCHEMY_DATABASE_URI='sqlite://', SECRET_KEY='test', TESTING=True)
+        db.init_app(app)
+        login_manager = LoginManager(app)
+        login_manager.user_loader(lambda user_id: User.query.get(int(user_id)))
+        for blueprint, url_prefix in blueprints:
+            app.register_blueprint(blueprint, url_prefix=url_prefix)
+
+        @app.route('/test-login/<int:user_id>')
+        def test_login(user_id):
+            login_user(User.query.get(user_id))
+            return ''
+
+        with app.app_context():
+            db.create_all()
+        apps.append(app)
+        return app
+
+    yield factory
+    for app in apps:
+        with app.app_context():
+            db.drop_all()
+
+
+@pytest.fixture
+def create_user():
+    def factory(app, username='user'):
+        with app.app_context():
+            user = User(username=username, email=f'{username}@example.com', password='password')
+            db.session.add(user)
+            db.session.commit()
+            return user.id
+    return factory
+
+
+@contextmanager
+def count_queries():
+    """Collect the SQL statements executed inside the block"""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(Engine, 'before_cursor_execute', record)
+    try:
+        yield statements
+    finally:
+        event.remove(Engine, 'before_cursor_execute', record)
+
+
+@pytest.fixture
+def query_count():
+    """query_count(run) -> how many SQL statements run() executes"""
+    def measure(run):
+        with count_queries() as statements:
+            run()
+        return len(statements)
+    return measure
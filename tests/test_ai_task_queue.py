@@ -0,0 +1,71 @@
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from app.models import db, AITask
+from app.api import ai_task_queue
+from app.api.ai_task_queue import recover_tasks, run_task
+
+
+@pytest.fixture
+def app(make_app, create_user, monkeypatch):
+    app = make_app()
+    app.user_id = create_user(app)
+    monkeypatch.setitem(ai_task_queue.TASK_HANDLERS, 'echo', lambda user, **payload: (payload, 200))
+    return app
+
+
+def add_task(app, status, started_minutes_ago=None, attempts=0, created_minutes_ago=0):
+    with app.app_context():
+        now = datetime.now(timezone.utc)
+        started_at = None
+        if started_minutes_ago is not None:
+            started_at = now - timedelta(minutes=started_minutes_ago)
+        task = AITask(id=f'{status}{started_minutes_ago}{attempts}{created_minutes_ago}', user_id=app.user_id,
+                      kind='echo', status=status, payload=json.dumps({'n': 1}), started_at=started_at,
+                      attempts=attempts, created_at=now - timedelta(minutes=created_minutes_ago))
+        db.session.add(task)
+        db.session.commit()
+        return task.id
+
+
+def status_of(app, task_id):
+    with app.app_context():
+        return AITask.query.get(task_id).status
+
+
+def test_expired_running_tasks_are_reclaimed_and_rerun(app):
+    stuck = add_task(app, 'running', started_minutes_ago=60, attempts=1)
+    busy = add_task(app, 'running', started_minutes_ago=1, attempts=1)
+    orphaned = add_task(app, 'pending', created_minutes_ago=10)
+    add_task(app, 'pending')  # just enqueued, still in its worker's queue
+
+    with app.app_context():
+        recovered = recover_tasks()
+    assert sorted(recovered) == sorted([stuck, orphaned])
+    assert status_of(app, busy) == 'running'
+
+    run_task(app, stuck)
+    assert status_of(app, stuck) == 'succeeded'
+
+
+def test_task_is_failed_after_max_attempts(app):
+    task_id = add_task(app, 'running', started_minutes_ago=60, attempts=ai_task_queue.AI_TASK_MAX_ATTEMPTS)
+    with app.app_context():
+        assert recover_tasks() == []
+    assert status_of(app, task_id) == 'failed'
+
+
+def test_result_of_a_lost_lease_is_discarded(app, monkeypatch):
+    task_id = add_task(app, 'pending')
+
+    def handler(user, **payload):
+        # Meanwhile the lease expires and another worker claims the task
+        with app.app_context():
+            AITask.query.filter_by(id=task_id).update({'attempts': AITask.attempts + 1})
+            db.session.commit()
+        return {'stale': True}, 200
+
+    monkeypatch.setitem(ai_task_queue.TASK_HANDLERS, 'echo', handler)
+    run_task(app, task_id)
+    assert status_of(app, task_id) == 'running'
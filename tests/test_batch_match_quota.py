@@ -0,0 +1,53 @@
+import json
+
+import pytest
+from app.models import db, Job, Resume
+from app.api import ai_resume_routes, entitlements
+from app.api.ai_usage import rate_limiter, usage_store
+
+
+@pytest.fixture
+def client(make_app, create_user, monkeypatch):
+    app = make_app((ai_resume_routes.ai_resume_routes, '/api/ai'))
+    user_id = create_user(app)
+    with app.app_context():
+        db.session.add(Resume(user_id=user_id, file_url='/api/files/resume.pdf', title='CV',
+                              extracted_text='Python developer with ten years of Flask and SQL experience'))
+        db.session.add_all([Job(title=f'Engineer {i}', description='Python Flask SQL') for i in range(5)])
+        db.session.commit()
+
+    calls = []
+
+    def fake_job_match(prompt, meter):
+        calls.append(prompt)
+        meter.record('gpt-4', 0.01)
+        return 0.5, 'Good fit'
+
+    monkeypatch.setattr(ai_resume_routes, 'request_job_match', fake_job_match)
+    # Users without a membership get the free plan's flags
+    monkeypatch.setattr(entitlements, 'FREE_PLAN_FLAGS', json.dumps({'job_match': 2}))
+    usage_store.entries.clear()
+    rate_limiter.windows.clear()
+
+    client = app.test_client()
+    client.get(f'/test-login/{user_id}')
+    client.calls = calls
+    return client
+
+
+def test_batch_match_is_capped_to_remaining_quota(client):
+    response = client.post('/api/ai/resumes/1/jobs/match', json={'filters': {}, 'max_candidates': 5})
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.data.decode().splitlines()]
+
+    assert len(client.calls) == 2
+    assert len(lines[-1]['ranked']) == 2
+
+
+def test_batch_match_is_rejected_once_quota_is_used(client):
+    client.post('/api/ai/resumes/1/jobs/match', json={'filters': {}})
+    response = client.post('/api/ai/resumes/1/jobs/match', json={'filters': {}})
+
+    assert response.status_code == 429
+    assert response.json['limit'] == 2
+    assert len(client.calls) == 2
@@ -0,0 +1,13 @@
+from app.config import ServerlessConfig, ProductionConfig
+
+
+def test_pooler_mode_sends_no_startup_options(monkeypatch):
+    monkeypatch.setattr(ServerlessConfig, 'SQLALCHEMY_DATABASE_URI', 'postgresql://pooler/db')
+    options = ServerlessConfig.engine_options()
+    assert 'connect_args' not in options
+
+
+def test_direct_connections_set_the_statement_timeout(monkeypatch):
+    monkeypatch.setattr(ProductionConfig, 'SQLALCHEMY_DATABASE_URI', 'postgresql://db/db')
+    options = ProductionConfig.engine_options()
+    assert options['connect_args'] == {'options': '-c statement_timeout=15000'}
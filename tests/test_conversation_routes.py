@@ -0,0 +1,75 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from app.models import db, Conversation, Message
+from app.api.conversation_routes import conversation_routes
+
+
+@pytest.fixture
+def app(make_app, create_user):
+    app = make_app((conversation_routes, '/api/conversations'))
+    app.reader_id = create_user(app, 'reader')
+    app.sender_id = create_user(app, 'sender')
+    with app.app_context():
+        conversation = Conversation(user_1_id=app.reader_id, user_2_id=app.sender_id)
+        db.session.add(conversation)
+        db.session.commit()
+        app.conversation_id = conversation.id
+    return app
+
+
+def add_message(app, body, seconds_ago):
+    at = datetime.now(timezone.utc) - timedelta(seconds=seconds_ago)
+    with app.app_context():
+        message = Message(conversation_id=app.conversation_id, sender_id=app.sender_id,
+                          message_body=body, sent_at=at, updated_at=at)
+        db.session.add(message)
+        db.session.commit()
+        return message.id
+
+
+def login(app):
+    client = app.test_client()
+    client.get(f'/test-login/{app.reader_id}')
+    return client
+
+
+def test_sync_returns_changes_that_commit_after_newer_ones(app):
+    add_message(app, 'old', seconds_ago=600)
+    add_message(app, 'recent', seconds_ago=2)
+    client = login(app)
+    url = f'/api/conversations/{app.conversation_id}/messages'
+    cursor = client.get(url).get_json()['sync_cursor']
+
+    # Its transaction started before 'recent' was written but committed after the poll
+    late_id = add_message(app, 'late', seconds_ago=5)
+
+    synced = client.get(url, query_string={'since': cursor}).get_json()
+    assert late_id in [m['id'] for m in synced['messages']]
+    assert 'old' not in [m['message_body'] for m in synced['messages']]
+
+
+def test_mark_read_up_to_validates_and_treats_naive_timestamps_as_utc(app):
+    earlier = add_message(app, 'earlier', seconds_ago=3600)
+    add_message(app, 'later', seconds_ago=60)
+    client = login(app)
+    url = f'/api/conversations/{app.conversation_id}/read'
+
+    assert client.patch(url, json={'up_to': 'yesterday'}).status_code == 400
+    assert client.patch(url, json={'up_to': 5}).status_code == 400
+
+    naive = (datetime.now(timezone.utc) - timedelta(minutes=30)).replace(tzinfo=None).isoformat()
+    response = client.patch(url, json={'up_to': naive})
+    assert response.status_code == 200
+    assert response.get_json()['read_count'] == 1
+    with app.app_context():
+        assert Message.query.get(earlier).read_at is not None
+
+
+def test_detail_and_list_routes_format_timestamps_the_same_way(app):
+    add_message(app, 'hello', seconds_ago=60)
+    client = login(app)
+    detail = client.get(f'/api/conversations/{app.conversation_id}').get_json()
+    history = client.get(f'/api/conversations/{app.conversation_id}/messages').get_json()
+    assert detail['messages'][0]['sent_at'] == history['messages'][0]['sent_at']
+    datetime.fromisoformat(detail['created_at'])
@@ -0,0 +1,14 @@
+import threading
+
+from app.api import cpu_bound
+from app.api.cpu_bound import run_cpu_bound
+
+
+def test_runs_inline_without_gevent():
+    assert run_cpu_bound(threading.get_ident) == threading.get_ident()
+
+
+def test_runs_on_a_real_thread_under_gevent(monkeypatch):
+    monkeypatch.setattr(cpu_bound, '_on_event_loop', lambda: True)
+    assert run_cpu_bound(threading.get_ident) != threading.get_ident()
+    assert run_cpu_bound(divmod, 7, 2) == (3, 1)
@@ -0,0 +1,41 @@
+import io
+
+import pytest
+from app.models import db, Resume
+from app.api import aws_helpers, upload_helper
+from app.api.document_helpers import hash_bytes
+from app.api.resume_upload_aws_routes import resume_routes
+from app.api.storage import LocalStorage
+from app.api.upload_helper import issue_upload_token
+
+
+@pytest.fixture
+def app(make_app, create_user, tmp_path, monkeypatch):
+    storage = LocalStorage(root=str(tmp_path), base_url='/api/files/')
+    monkeypatch.setattr(aws_helpers, 'storage', storage)
+    monkeypatch.setattr(upload_helper, 'storage', storage)
+    app = make_app((resume_routes, '/api/resumes'))
+    app.storage = storage
+    app.user_id = create_user(app)
+    return app
+
+
+def test_completed_direct_upload_records_its_hash_and_reuses_known_text(app):
+    content = b'%PDF same resume'
+    with app.app_context():
+        db.session.add(Resume(user_id=app.user_id, file_url='/api/files/earlier.pdf', title='Earlier',
+                              extracted_text='Python, SQL', content_hash=hash_bytes(content)))
+        db.session.commit()
+        token = issue_upload_token('resume', app.user_id, 'direct.pdf')
+    app.storage.save(io.BytesIO(content), 'direct.pdf', 'application/pdf')
+
+    client = app.test_client()
+    client.get(f'/test-login/{app.user_id}')
+    response = client.post('/api/resumes/upload-complete', json={'upload_token': token, 'title': 'Direct'})
+
+    assert response.status_code == 201
+    resume_id = response.get_json()['resume']['id']
+    with app.app_context():
+        resume = Resume.query.get(resume_id)
+        assert resume.content_hash == hash_bytes(content)
+        assert resume.extracted_text == 'Python, SQL'
@@ -0,0 +1,56 @@
+import io
+
+import pytest
+from app.api import file_routes
+from app.api.storage import LocalStorage
+
+
+@pytest.fixture
+def app(make_app, tmp_path, monkeypatch):
+    storage = LocalStorage(root=str(tmp_path), base_url='/api/files/')
+    monkeypatch.setattr(file_routes, 'storage', storage)
+    app = make_app((file_routes.file_routes, '/api/files'))
+    app.storage = storage
+    return app
+
+
+def test_local_file_needs_a_signed_download_url(app):
+    file_url = app.storage.save(io.BytesIO(b'%PDF resume'), 'resume.pdf', 'application/pdf')
+    client = app.test_client()
+
+    assert client.get(file_url).status_code == 403
+    assert client.get(f'{file_url}?token=forged').status_code == 403
+
+    with app.test_request_context():
+        download_url = app.storage.download_url(file_url, 60)
+    response = client.get(download_url)
+    assert response.status_code == 200
+    assert response.data == b'%PDF resume'
+
+
+def test_download_token_is_bound_to_its_file_and_expires(app):
+    resume_url = app.storage.save(io.BytesIO(b'one'), 'one.pdf', 'application/pdf')
+    other_url = app.storage.save(io.BytesIO(b'two'), 'two.pdf', 'application/pdf')
+    client = app.test_client()
+
+    with app.test_request_context():
+        token = app.storage.download_url(resume_url, 60).split('token=', 1)[1]
+        expired = app.storage.download_url(resume_url, -1)
+
+    assert client.get(f'{other_url}?token={token}').status_code == 403
+    assert client.get(expired).status_code == 403
+
+
+def test_direct_upload_posts_the_signed_form(app):
+    client = app.test_client()
+    with app.test_request_context():
+        upload = app.storage.presigned_upload('direct.pdf', 'application/pdf', 1024, 60)
+
+    forged = {**upload['fields'], 'token': 'forged', 'file': (io.BytesIO(b'%PDF'), 'resume.pdf')}
+    assert client.post(upload['url'], data=forged).status_code == 403
+    too_big = {**upload['fields'], 'file': (io.BytesIO(b'x' * 2048), 'resume.pdf')}
+    assert client.post(upload['url'], data=too_big).status_code == 400
+
+    response = client.post(upload['url'], data={**upload['fields'], 'file': (io.BytesIO(b'%PDF'), 'resume.pdf')})
+    assert response.status_code == 204
+    assert app.storage.read(app.storage.url('direct.pdf')) == b'%PDF'
@@ -0,0 +1,35 @@
+import pytest
+from app.models import db, Resume, ResumeScore
+from app.api.ai_resume_routes import copy_known_score
+
+
+@pytest.fixture
+def app(make_app, create_user):
+    app = make_app()
+    app.owner_id = create_user(app, 'owner')
+    app.other_id = create_user(app, 'other')
+    with app.app_context():
+        scored = Resume(user_id=app.owner_id, file_url='/api/files/a.pdf', content_hash='abc')
+        db.session.add(scored)
+        db.session.flush()
+        db.session.add(ResumeScore(resume_id=scored.id, ai_model='gpt-4', score_overall=0.9))
+        db.session.commit()
+    return app
+
+
+def add_resume(user_id):
+    resume = Resume(user_id=user_id, file_url='/api/files/b.pdf', content_hash='abc')
+    db.session.add(resume)
+    db.session.commit()
+    return resume
+
+
+def test_score_is_copied_from_the_owners_identical_resume(app):
+    with app.app_context():
+        score = copy_known_score(add_resume(app.owner_id))
+        assert score is not None and score.score_overall == 0.9
+
+
+def test_another_users_score_is_never_copied(app):
+    with app.app_context():
+        assert copy_known_score(add_resume(app.other_id)) is None
@@ -0,0 +1,32 @@
+import time
+
+import pytest
+from app.models import db, LLMCacheEntry
+from app.api.llm_cache import DatabaseCache, MemoryCache, TieredCache
+
+
+@pytest.fixture
+def app(make_app):
+    app = make_app()
+    with app.app_context():
+        yield app
+
+
+def test_database_hit_is_kept_in_memory_only_as_long_as_it_has_left(app):
+    database = DatabaseCache()
+    database.set('key', 'response', expires_at=time.time() + 5)
+    memory = MemoryCache(ttl=3600)
+    cache = TieredCache(memory, database)
+
+    assert cache.get('key') == 'response'
+    value, expires_at = memory.get_entry('key')
+    assert value == 'response'
+    assert expires_at == pytest.approx(time.time() + 5, abs=2)
+
+
+def test_prune_failure_is_logged_not_raised(app, caplog):
+    database = DatabaseCache()
+    LLMCacheEntry.__table__.drop(db.engine)
+    database.prune()
+    assert 'Pruning the LLM cache table failed' in caplog.text
+    LLMCacheEntry.__table__.create(db.engine)
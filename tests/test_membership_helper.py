@@ -0,0 +1,35 @@
+import pytest
+from flask import g
+from app.models import db, Company, SubscriptionPlan, UserSubscription
+from app.api import membership_helper
+from app.api.membership_helper import get_membership
+
+
+@pytest.fixture
+def app(make_app, create_user):
+    app = make_app()
+    app.user_id = create_user(app)
+    with app.app_context():
+        plan = SubscriptionPlan(name='Pro', price=10, billing_cycle='monthly')
+        db.session.add(plan)
+        db.session.commit()
+        app.plan_id = plan.id
+    membership_helper.cache.invalidate()
+    return app
+
+
+def test_unrelated_commit_keeps_the_request_memo(app):
+    with app.test_request_context():
+        membership = get_membership(app.user_id)
+        db.session.add(Company(name='Acme'))
+        db.session.commit()
+        assert g.memberships[app.user_id] is membership
+
+
+def test_subscription_change_evicts_the_user_after_commit(app):
+    with app.test_request_context():
+        assert get_membership(app.user_id).status() == 'none'
+        db.session.add(UserSubscription(user_id=app.user_id, plan_id=app.plan_id))
+        db.session.commit()
+        assert app.user_id not in g.memberships
+        assert get_membership(app.user_id).status() == 'active'
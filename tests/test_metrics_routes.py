@@ -0,0 +1,23 @@
+import pytest
+from app.api import metrics_routes
+
+
+@pytest.fixture
+def app(make_app, monkeypatch):
+    monkeypatch.setattr(metrics_routes, 'METRICS_TOKEN', 'secret')
+    return make_app((metrics_routes.metrics_routes, '/api/metrics'))
+
+
+def test_metrics_need_the_token(app):
+    client = app.test_client()
+    assert client.get('/api/metrics').status_code == 401
+    assert client.get('/api/metrics', headers={'Authorization': 'Bearer wrong'}).status_code == 401
+
+
+def test_metrics_report_pool_s3_and_cache_counters(app):
+    response = app.test_client().get('/api/metrics', headers={'Authorization': 'Bearer secret'})
+    assert response.status_code == 200
+    metrics = response.get_json()
+    assert {'checkouts', 'wait_seconds_avg'} <= set(metrics['db_pool'])
+    assert isinstance(metrics['s3'], dict)
+    assert 'hits' in metrics['llm_cache']
@@ -0,0 +1,60 @@
+"""List endpoints run a fixed number of queries however many rows they return"""
+import pytest
+from app.models import db, Company, Conversation, Job, Message
+from app.api.conversation_routes import conversation_routes
+from app.api.job_routes import job_routes
+
+
+@pytest.fixture
+def app(make_app, create_user):
+    app = make_app((job_routes, '/api/jobs'), (conversation_routes, '/api/conversations'))
+    app.user_id = create_user(app)
+    return app
+
+
+def login(app):
+    client = app.test_client()
+    client.get(f'/test-login/{app.user_id}')
+    return client
+
+
+def add_jobs(app, count):
+    with app.app_context():
+        for _ in range(count):
+            company = Company(name=f'Company {Company.query.count()}')
+            db.session.add(company)
+            db.session.flush()
+            db.session.add(Job(title='Engineer', company_id=company.id, posted_by=app.user_id))
+        db.session.commit()
+
+
+def add_conversations(app, create_user, count):
+    with app.app_context():
+        for _ in range(count):
+            other_id = create_user(app, f'other{Conversation.query.count()}')
+            conversation = Conversation(user_1_id=app.user_id, user_2_id=other_id)
+            db.session.add(conversation)
+            db.session.flush()
+            for body in ('hi', 'there'):
+                db.session.add(Message(conversation_id=conversation.id, sender_id=other_id, message_body=body))
+        db.session.commit()
+
+
+def test_job_list_query_count_is_constant(app, query_count):
+    client = app.test_client()
+    add_jobs(app, 2)
+    few = query_count(lambda: client.get('/api/jobs/?limit=50'))
+    add_jobs(app, 20)
+    many = query_count(lambda: client.get('/api/jobs/?limit=50'))
+    assert len(client.get('/api/jobs/?limit=50').get_json()['jobs']) == 22
+    assert many == few == 1
+
+
+def test_inbox_query_count_is_constant(app, create_user, query_count):
+    client = login(app)
+    add_conversations(app, create_user, 2)
+    few = query_count(lambda: client.get('/api/conversations/inbox'))
+    add_conversations(app, create_user, 10)
+    many = query_count(lambda: client.get('/api/conversations/inbox'))
+    assert len(client.get('/api/conversations/inbox').get_json()['conversations']) == 12
+    assert many == few
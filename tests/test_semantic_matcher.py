@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+from app.models import db, Job
+from app.api import semantic_matcher
+from app.api.semantic_matcher import JobVectorIndex, VECTOR_DIM, embed_job, store_vectors
+
+
+def unit_vector(position):
+    vector = np.zeros(VECTOR_DIM, dtype=np.float32)
+    vector[position] = 1.0
+    return vector
+
+
+def test_index_grows_past_its_capacity_and_removes_in_place():
+    index = JobVectorIndex(capacity=2)
+    for job_id in range(1, 6):
+        index.upsert(job_id, unit_vector(job_id))
+    index.remove(2)
+    index.upsert(3, unit_vector(4))
+
+    assert index.size == 4
+    assert [job_id for job_id, _ in index.top_k(unit_vector(5), 1)] == [5]
+    assert sorted(job_id for job_id, score in index.top_k(unit_vector(4), 4) if score > 0.5) == [3, 4]
+
+
+@pytest.fixture
+def app(make_app, monkeypatch):
+    monkeypatch.setattr(semantic_matcher, '_index', None)
+    app = make_app()
+    with app.app_context():
+        yield app
+
+
+def add_job(title):
+    job = Job(title=title, description=f'{title} role', skills='')
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+def test_first_use_backfills_jobs_and_later_syncs_merge_other_workers_changes(app, monkeypatch):
+    python = add_job('Python developer')
+    designer = add_job('Graphic designer')
+
+    assert semantic_matcher.best_matching_job_ids('python developer', 1)[0][0] == python.id
+
+    # Another worker adds a job and deletes one; this worker only sees job_vectors
+    nurse = Job(title='Nurse', description='Nurse role', skills='')
+    db.session.add(nurse)
+    db.session.commit()
+    store_vectors([(nurse.id, embed_job(nurse)), (designer.id, None)])
+    monkeypatch.setattr(semantic_matcher, '_synced_at', 0)
+
+    ranked = dict(semantic_matcher.best_matching_job_ids('nurse', 10))
+    assert nurse.id in ranked
+    assert designer.id not in ranked
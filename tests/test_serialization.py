@@ -0,0 +1,33 @@
+from datetime import datetime, timezone
+
+import pytest
+from flask import jsonify
+from app.models import db, Company
+from app.api.company_routes import company_routes
+
+
+@pytest.fixture
+def app(make_app, create_user):
+    app = make_app((company_routes, '/api/companies'))
+    app.user_id = create_user(app)
+    with app.app_context():
+        company = Company(name='Acme', created_at=datetime(2026, 10, 18, 12, 30, tzinfo=timezone.utc))
+        db.session.add(company)
+        db.session.commit()
+        app.company_id = company.id
+    return app
+
+
+def test_company_routes_send_iso_8601(app):
+    client = app.test_client()
+    client.get(f'/test-login/{app.user_id}')
+    listed = client.get('/api/companies/').get_json()['companies'][0]
+    detail = client.get(f'/api/companies/{app.company_id}').get_json()
+    assert listed['created_at'] == detail['created_at']
+    assert detail['created_at'].startswith('2026-10-18T12:30:00')
+
+
+def test_jsonify_uses_the_same_datetime_format(app):
+    with app.test_request_context():
+        when = datetime(2026, 10, 18, 12, 30, tzinfo=timezone.utc)
+        assert jsonify({'at': when}).get_json()['at'] == when.isoformat()
@@ -0,0 +1,26 @@
+import io
+import mmap
+
+import pytest
+from flask import Flask
+from app.api.upload_helper import SPOOL_MEMORY_LIMIT, content_hash, parse_upload, upload_contents
+from app.api.document_helpers import hash_bytes
+
+
+def parsed_upload(data):
+    app = Flask(__name__)
+    body = {'file': (io.BytesIO(data), 'resume.pdf')}
+    with app.test_request_context('/', method='POST', data=body, content_type='multipart/form-data'):
+        _, files = parse_upload()
+        return files['file']
+
+
+@pytest.mark.parametrize('size', [1024, SPOOL_MEMORY_LIMIT * 3])
+def test_upload_contents_leave_the_file_rewound(size):
+    data = bytes(range(256)) * (size // 256)
+    file = parsed_upload(data)
+    with upload_contents(file) as contents:
+        assert isinstance(contents, mmap.mmap) == (size > SPOOL_MEMORY_LIMIT)
+        assert bytes(contents) == data
+    assert content_hash(file) == hash_bytes(data)
+    assert file.stream.read() == data